@@ -21,6 +21,15 @@ def create_app():
     # Cache de archivos estaticos por 1 año (en produccion)
     app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 31536000
 
+    # Latencia por ruta, consultas SQLite por solicitud y Server-Timing (/metrics).
+    # Se instala primero para que la medicion abarque los demas hooks.
+    from middleware.metricas import instalar_metricas
+    instalar_metricas(app)
+
+    # Perfilado cProfile bajo demanda (?_perfil=1 con acceso de administracion)
+    from middleware.perfilador import instalar_perfilador
+    instalar_perfilador(app)
+
     # Filtro para formatear fechas a DD/MES/AAAA (ej: 01/ENE/2024)
     app.jinja_env.filters['fecha'] = format_fecha
 
@@ -56,7 +65,9 @@ def create_app():
         response.headers['Referrer-Policy'] = 'strict-origin-when-cross-origin'
 
         # Evitar cache en respuestas HTML para que cada dispositivo tenga su sesion
-        if response.content_type and 'text/html' in response.content_type:
+        # (salvo las que definen su propia politica, ej. fragmentos con ETag)
+        if (response.content_type and 'text/html' in response.content_type
+                and 'Cache-Control' not in response.headers):
             response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
             response.headers['Pragma'] = 'no-cache'
             response.headers['Expires'] = '0'
@@ -85,6 +96,28 @@ def create_app():
             </div></div></body></html>
         '''), 500
 
+    # Sesion ocupada por otras escrituras (models/escritura.py): se puede reintentar
+    from models.escritura import EscrituraOcupada
+
+    @app.errorhandler(EscrituraOcupada)
+    def sesion_ocupada(e):
+        from flask import request, jsonify, render_template_string
+        if request.is_json or request.accept_mimetypes.best == 'application/json':
+            resp = jsonify({'success': False, 'error': 'La sesion esta ocupada, intente nuevamente.'})
+        else:
+            resp = render_template_string('''
+                <!DOCTYPE html>
+                <html><head><title>Sesion ocupada</title>
+                <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.3/dist/css/bootstrap.min.css" rel="stylesheet">
+                </head><body class="bg-light">
+                <div class="container mt-5"><div class="alert alert-warning">
+                <h4>Sesion ocupada</h4>
+                <p>Otros dispositivos estan guardando en esta sesion. Intente nuevamente en unos segundos.</p>
+                <a href="javascript:history.back()" class="btn btn-primary">Volver</a>
+                </div></div></body></html>
+            ''')
+        return resp, 503, {'Retry-After': '1'}
+
     # Register blueprints
     from routes.main import bp as main_bp
     from routes.upload import bp as upload_bp
@@ -93,6 +126,35 @@ def create_app():
     app.register_blueprint(upload_bp)
     app.register_blueprint(principal_bp)
 
+    # Compresion gzip/brotli de HTML, JSON y estaticos
+    from middleware.compresion import CompresionMiddleware
+    app.wsgi_app = CompresionMiddleware(
+        app.wsgi_app,
+        nivel=config.COMPRESION_NIVEL,
+        nivel_brotli=config.COMPRESION_NIVEL_BROTLI,
+        minimo=config.COMPRESION_MINIMO,
+    )
+
+    # Mantenimiento periodico de las bases de sesion (sin cron externo)
+    from services.mantenimiento import instalar_mantenimiento
+    instalar_mantenimiento(app)
+
+    # Ultimo acceso de cada sesion, para archivar las que quedan frias
+    from services.archivo import instalar_archivo
+    instalar_archivo(app)
+
+    # Respaldo periodico de las sesiones servidas desde RAM-disk
+    from services.caliente import instalar_caliente
+    instalar_caliente(app)
+
+    # Estadisticas del cache compartido entre procesos
+    from services.cache import instalar_cache
+    instalar_cache(app)
+
+    # Comandos de mantenimiento (flask verificar-planes, ...)
+    from cli import register_commands
+    register_commands(app)
+
     return app
 
 
@@ -0,0 +1,21 @@
+"""
+asgi.py
+Entrada ASGI alternativa a passenger_wsgi.py / app.cgi, para servidores
+asincronos (requieren instalar uvicorn o hypercorn aparte):
+
+    uvicorn asgi:application --host 0.0.0.0 --port 8000 --workers 2
+
+La API JSON de Captura, la importacion/exportacion y el resto de las paginas
+corren en pools de hilos separados (middleware/asgi.py), asi una exportacion
+larga no frena a los dispositivos que estan capturando.
+"""
+import config
+from app import create_app
+from middleware.asgi import PuenteASGI
+
+application = PuenteASGI(
+    create_app(),
+    hilos_api=config.ASGI_HILOS_API,
+    hilos_general=config.ASGI_HILOS_GENERAL,
+    hilos_pesadas=config.ASGI_HILOS_PESADAS,
+)
@@ -0,0 +1,172 @@
+"""
+bench/asgi.py
+Concurrencia de la entrada WSGI (Passenger: N procesos de un hilo que
+comparten la fila de solicitudes) contra la entrada ASGI (asgi.py: pools de
+hilos por tipo de ruta). Mientras --exportaciones clientes descargan la
+exportacion DBF sin parar, --dispositivos dispositivos alternan la API de
+animal y el auto-guardar de ordeños; se reporta la latencia de la API
+(p50/p95/p99), solicitudes por segundo y exportaciones completadas.
+
+Las dos entradas se llaman en el mismo proceso, sin servidor HTTP (no hace
+falta instalar uvicorn).
+
+    python -m bench.asgi [--dispositivos 8] [--exportaciones 2] [--trabajadores 2] [--duracion 10]
+"""
+import argparse
+import asyncio
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.test import EnvironBuilder, run_wsgi_app
+
+from bench.comun import crear_sesion_sintetica, cliente
+from bench.carga import _percentil
+import config
+from middleware.asgi import PuenteASGI
+
+
+def _cookie(app, session_id, device_id):
+    firmante = app.session_interface.get_signing_serializer(app)
+    valor = firmante.dumps({'device_id': device_id, 'active_session_id': session_id})
+    return f'{app.config["SESSION_COOKIE_NAME"]}={valor}'
+
+
+def _solicitud(rnd, total):
+    """(metodo, ruta, json) de una solicitud de API de un dispositivo."""
+    if rnd.random() < 0.5:
+        return 'GET', f'/principal/api/animal/{rnd.randrange(total)}', None
+    return 'POST', '/principal/ordenos/auto-guardar', {
+        'animal_id': rnd.randint(1, total), 'campo': 'ord1', 'valor': f'{rnd.uniform(2, 30):.1f}'}
+
+
+class Resultado:
+    def __init__(self):
+        self.latencias = []
+        self.errores = 0
+        self.exportaciones = 0
+
+
+def medir_wsgi(app, session_id, args, total):
+    """Fila compartida por `trabajadores` procesos de un hilo, como Passenger."""
+    resultado = Resultado()
+    fin = time.monotonic() + args.duracion
+    trabajadores = ThreadPoolExecutor(args.trabajadores)
+
+    def llamar(metodo, ruta, datos, cookie):
+        entorno = EnvironBuilder(path=ruta, method=metodo, json=datos,
+                                 headers={'Cookie': cookie}).get_environ()
+        iterable, status, _ = run_wsgi_app(app, entorno, buffered=True)
+        return int(status.split(' ', 1)[0])
+
+    def dispositivo(i):
+        rnd = random.Random(i)
+        cookie = _cookie(app, session_id, f'asgi-{i}')
+        while time.monotonic() < fin:
+            inicio = time.perf_counter()
+            status = trabajadores.submit(llamar, *_solicitud(rnd, total), cookie).result()
+            resultado.latencias.append(time.perf_counter() - inicio)
+            resultado.errores += status >= 400
+
+    def exportador(i):
+        cookie = _cookie(app, session_id, f'export-{i}')
+        while time.monotonic() < fin:
+            trabajadores.submit(llamar, 'GET', '/export', None, cookie).result()
+            resultado.exportaciones += 1
+
+    hilos = [threading.Thread(target=dispositivo, args=(i,)) for i in range(args.dispositivos)]
+    hilos += [threading.Thread(target=exportador, args=(i,)) for i in range(args.exportaciones)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    trabajadores.shutdown()
+    return resultado
+
+
+async def _llamar_asgi(puente, metodo, ruta, datos, cookie):
+    entorno = EnvironBuilder(path=ruta, method=metodo, json=datos)
+    cuerpo = entorno.get_environ()['wsgi.input'].read()
+    headers = [(b'cookie', cookie.encode())]
+    if datos is not None:
+        headers.append((b'content-type', b'application/json'))
+    scope = {'type': 'http', 'method': metodo, 'path': ruta, 'query_string': b'',
+             'headers': headers, 'scheme': 'http', 'server': ('localhost', 80),
+             'client': ('127.0.0.1', 0), 'http_version': '1.1', 'root_path': ''}
+    enviado = False
+    status = []
+
+    async def receive():
+        nonlocal enviado
+        if enviado:
+            await asyncio.Event().wait()  # sin desconexion
+        enviado = True
+        return {'type': 'http.request', 'body': cuerpo, 'more_body': False}
+
+    async def send(mensaje):
+        if mensaje['type'] == 'http.response.start':
+            status.append(mensaje['status'])
+
+    await puente(scope, receive, send)
+    return status[0]
+
+
+async def _medir_asgi(puente, app, session_id, args, total):
+    resultado = Resultado()
+    fin = time.monotonic() + args.duracion
+
+    async def dispositivo(i):
+        rnd = random.Random(i)
+        cookie = _cookie(app, session_id, f'asgi-{i}')
+        while time.monotonic() < fin:
+            inicio = time.perf_counter()
+            status = await _llamar_asgi(puente, *_solicitud(rnd, total), cookie)
+            resultado.latencias.append(time.perf_counter() - inicio)
+            resultado.errores += status >= 400
+
+    async def exportador(i):
+        cookie = _cookie(app, session_id, f'export-{i}')
+        while time.monotonic() < fin:
+            await _llamar_asgi(puente, 'GET', '/export', None, cookie)
+            resultado.exportaciones += 1
+
+    await asyncio.gather(*[dispositivo(i) for i in range(args.dispositivos)],
+                         *[exportador(i) for i in range(args.exportaciones)])
+    return resultado
+
+
+def medir_asgi(app, session_id, args, total):
+    puente = PuenteASGI(app, config.ASGI_HILOS_API, config.ASGI_HILOS_GENERAL, config.ASGI_HILOS_PESADAS)
+    try:
+        return asyncio.run(_medir_asgi(puente, app, session_id, args, total))
+    finally:
+        puente.cerrar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[1])
+    parser.add_argument('--dispositivos', type=int, default=8, help='dispositivos usando la API')
+    parser.add_argument('--exportaciones', type=int, default=2, help='clientes exportando sin parar')
+    parser.add_argument('--trabajadores', type=int, default=2, help='procesos WSGI (Passenger)')
+    parser.add_argument('--duracion', type=float, default=10, help='segundos por entrada')
+    parser.add_argument('--animales', type=int, default=2000, help='animales en tabla2')
+    args = parser.parse_args()
+
+    sid = crear_sesion_sintetica(n_tabla2=args.animales, n_tabla3=args.animales // 3)
+    app, _ = cliente(sid)
+
+    print(f'# {args.dispositivos} dispositivos, {args.exportaciones} exportando, '
+          f'WSGI con {args.trabajadores} trabajadores, ASGI con hilos api/general/pesadas = '
+          f'{config.ASGI_HILOS_API}/{config.ASGI_HILOS_GENERAL}/{config.ASGI_HILOS_PESADAS}')
+    print(f"{'entrada':>8}{'sol/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errores':>9}{'exports':>9}")
+    for nombre, medir in (('wsgi', medir_wsgi), ('asgi', medir_asgi)):
+        r = medir(app, sid, args, args.animales)
+        lat = sorted(r.latencias)
+        print(f'{nombre:>8}{len(lat) / args.duracion:>9.1f}{_percentil(lat, 50) * 1000:>9.2f}'
+              f'{_percentil(lat, 95) * 1000:>9.2f}{_percentil(lat, 99) * 1000:>9.2f}'
+              f'{r.errores:>9}{r.exportaciones:>9}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+bench/caliente.py
+Latencia de escritura con la sesion en disco (WAL, el modo por defecto)
+contra la sesion caliente en RAM-disk (services/caliente.py): cada
+dispositivo repite auto-guardados de ordeño, como en una prueba de ordeño, y
+se reporta p50/p95/p99 por modo mas la duracion del respaldo a disco.
+
+    python -m bench.caliente [--escrituras 500] [--dispositivos 1,4] [--ram /dev/shm]
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+from bench.comun import crear_sesion_sintetica, cliente
+from bench.carga import Hato, _percentil
+import config
+from services import caliente
+
+
+def _escribir(app, session_id, hato, semilla, n, latencias):
+    rnd = random.Random(semilla)
+    c = app.test_client()
+    with c.session_transaction() as s:
+        s['device_id'] = f'caliente-{semilla}'
+        s['active_session_id'] = session_id
+    for _ in range(n):
+        inicio = time.perf_counter()
+        r = c.post('/principal/ordenos/auto-guardar', json={
+            'animal_id': rnd.choice(hato.ids), 'campo': rnd.choice(('ord1', 'ord2', 'ord3')),
+            'valor': f'{rnd.uniform(2, 30):.1f}',
+        })
+        r.close()
+        latencias.append(time.perf_counter() - inicio)
+
+
+def medir(app, session_id, hato, dispositivos, escrituras):
+    """Latencias (s) de `escrituras` auto-guardados repartidos entre dispositivos."""
+    latencias = []
+    hilos = [threading.Thread(target=_escribir, args=(
+        app, session_id, hato, i, escrituras // dispositivos, latencias)) for i in range(dispositivos)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    return sorted(latencias)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[1])
+    parser.add_argument('--escrituras', type=int, default=500, help='auto-guardados por medicion')
+    parser.add_argument('--dispositivos', default='1,4', help='cantidades de dispositivos, separadas por coma')
+    parser.add_argument('--animales', type=int, default=800, help='animales en tabla2')
+    parser.add_argument('--ram', default='/dev/shm', help='RAM-disk para la copia caliente')
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.ram):
+        print(f'{args.ram} no existe: la copia "caliente" queda en el disco temporal')
+        args.ram = None
+    config.SESION_CALIENTE_DIR = tempfile.mkdtemp(prefix='capre-caliente-', dir=args.ram)
+    # El respaldo se mide aparte, no durante las escrituras
+    config.SESION_CALIENTE_RESPALDO_SEG = 1e9
+    config.SESION_CALIENTE_INACTIVIDAD_MIN = 1e9
+
+    sid = crear_sesion_sintetica(n_tabla2=args.animales, n_tabla3=args.animales // 3)
+    app, _ = cliente(sid)
+    hato = Hato(sid)
+
+    print(f"{'modo':>8}{'dispositivos':>14}{'escrituras':>12}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'media ms':>10}")
+    for modo in ('disco', 'caliente'):
+        if modo == 'caliente':
+            print(f'# copia a {config.SESION_CALIENTE_DIR}: {caliente.promover(sid) * 1000:.1f} ms')
+        for n in (int(x) for x in args.dispositivos.split(',')):
+            lat = medir(app, sid, hato, n, args.escrituras)
+            print(f"{modo:>8}{n:>14}{len(lat):>12}{_percentil(lat, 50) * 1000:>9.2f}"
+                  f"{_percentil(lat, 95) * 1000:>9.2f}{_percentil(lat, 99) * 1000:>9.2f}"
+                  f"{sum(lat) / len(lat) * 1000:>10.2f}")
+    print(f'# respaldo a disco (API de backup): {caliente.respaldar(sid) * 1000:.1f} ms')
+    print(f'# enfriar (respaldo final y borrado): {caliente.enfriar(sid) * 1000:.1f} ms')
+    os.rmdir(config.SESION_CALIENTE_DIR)
+
+
+if __name__ == '__main__':
+    main()
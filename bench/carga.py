@@ -0,0 +1,225 @@
+"""
+bench/carga.py
+Prueba de carga con varios dispositivos trabajando la misma sesion, como en
+campo: cada dispositivo virtual tiene su propia cookie (device_id) y repite
+una mezcla de navegacion y capturas segun su perfil (ordeños con
+auto-guardar, servicios, novillas, supervisor con resumen y exportacion).
+
+Por cada cantidad de dispositivos reporta solicitudes por segundo, latencia
+p50/p95/p99, errores HTTP 5xx y, entre ellos, las respuestas 503 por
+escrituras que no obtuvieron el bloqueo de la sesion a tiempo
+(EscrituraOcupada, models/escritura.py).
+
+    python -m bench.carga [--dispositivos 1,2,4,8] [--duracion 10] [--modo servidor|cliente]
+
+--modo servidor levanta un servidor WSGI local con hilos y los dispositivos
+hablan HTTP; --modo cliente usa el cliente de pruebas de Flask (sin red).
+"""
+import argparse
+import http.cookiejar
+import json
+import logging
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from werkzeug.serving import make_server
+
+from bench.comun import crear_sesion_sintetica, cliente
+from models.database import get_db
+from services.novillas import total_novillas
+
+PERFILES = ('ordenos', 'servicios', 'novillas', 'supervisor')
+
+
+class Hato:
+    """Ids y totales de la sesion sintetica para armar las solicitudes."""
+
+    def __init__(self, session_id):
+        conn = get_db(session_id)
+        try:
+            self.ids = [r['id'] for r in conn.execute('SELECT id FROM tabla2')]
+            self.total = len(self.ids)
+            self.novillas = total_novillas(conn)
+        finally:
+            conn.close()
+
+
+def _solicitudes(perfil, hato, rnd):
+    """Genera indefinidamente (metodo, ruta, cuerpo, extra) segun el perfil;
+    extra es 'json' para cuerpos JSON o los headers del formulario."""
+    ajax = {'X-Requested-With': 'XMLHttpRequest'}
+    while True:
+        if perfil == 'ordenos':
+            yield 'GET', '/principal/ordenos', None, None
+            for _ in range(20):
+                yield 'POST', '/principal/ordenos/auto-guardar', {
+                    'animal_id': rnd.choice(hato.ids), 'campo': rnd.choice(('ord1', 'ord2', 'ord3')),
+                    'valor': f'{rnd.uniform(2, 30):.1f}',
+                }, 'json'
+        elif perfil == 'servicios':
+            idx = rnd.randrange(hato.total)
+            animal_id = rnd.choice(hato.ids)
+            yield 'GET', f'/principal?idx={idx}', None, None
+            yield 'GET', f'/principal/api/animal/{idx}', None, None
+            yield 'GET', f'/principal/tab/servicios/{animal_id}', None, None
+            yield 'POST', f'/principal/animal/{animal_id}/servicios', {
+                'idx': idx, 'fecser': '2024-01-20', 'toro': rnd.choice(('HOLSTAR', 'MOGUL')), 'calor': '',
+            }, ajax
+        elif perfil == 'novillas':
+            idx = rnd.randrange(max(hato.novillas, 1))
+            yield 'GET', f'/principal/novillas?idx={idx}', None, None
+            yield 'GET', f'/principal/api/novilla/{idx}', None, None
+            yield 'GET', f"/principal/api/buscar?q={rnd.choice(('luna', 'rosa', 'miel', '12'))}", None, None
+        else:
+            yield 'GET', '/principal/indicadores', None, None
+            yield 'GET', '/principal/resumen', None, None
+            yield 'GET', '/principal/api/grid/tabla2?limite=100', None, None
+            yield 'GET', '/api/validar-exportacion', None, None
+            if rnd.random() < 0.2:
+                yield 'GET', '/export', None, None
+
+
+class DispositivoHttp:
+    """Dispositivo que habla HTTP con el servidor local (cookies propias)."""
+
+    def __init__(self, base, session_id, numero):
+        self.base = base
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+        # El primer GET asigna device_id; luego se activa la sesion
+        self.opener.open(f'{base}/').read()
+        self.opener.open(f'{base}/session/{session_id}/select').read()
+
+    def solicitar(self, metodo, ruta, cuerpo, extra):
+        headers = {}
+        datos = None
+        if extra == 'json':
+            datos = json.dumps(cuerpo).encode()
+            headers['Content-Type'] = 'application/json'
+        elif cuerpo is not None:
+            datos = urllib.parse.urlencode(cuerpo).encode()
+            headers.update(extra or {})
+        req = urllib.request.Request(self.base + ruta, data=datos, headers=headers, method=metodo)
+        try:
+            with self.opener.open(req) as resp:
+                resp.read()
+                return resp.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+
+class DispositivoCliente:
+    """Dispositivo sobre el cliente de pruebas de Flask."""
+
+    def __init__(self, app, session_id, numero):
+        self.c = app.test_client()
+        with self.c.session_transaction() as s:
+            s['device_id'] = f'carga-{numero}'
+            s['active_session_id'] = session_id
+
+    def solicitar(self, metodo, ruta, cuerpo, extra):
+        if extra == 'json':
+            r = self.c.open(ruta, method=metodo, json=cuerpo)
+        else:
+            r = self.c.open(ruta, method=metodo, data=cuerpo, headers=extra or {})
+        r.close()
+        return r.status_code
+
+
+def _trabajar(dispositivo, perfil, hato, semilla, hasta, pausa, resultados):
+    rnd = random.Random(semilla)
+    latencias, errores, ocupadas = [], 0, 0
+    for metodo, ruta, cuerpo, extra in _solicitudes(perfil, hato, rnd):
+        if time.perf_counter() >= hasta:
+            break
+        inicio = time.perf_counter()
+        try:
+            estado = dispositivo.solicitar(metodo, ruta, cuerpo, extra)
+        except OSError:
+            estado = 599
+        latencias.append(time.perf_counter() - inicio)
+        errores += estado >= 500
+        ocupadas += estado == 503
+        if pausa:
+            time.sleep(rnd.uniform(0, 2 * pausa))
+    resultados.append((latencias, errores, ocupadas))
+
+
+def _percentil(ordenadas, p):
+    if not ordenadas:
+        return 0.0
+    return ordenadas[min(len(ordenadas) - 1, int(round(p / 100 * (len(ordenadas) - 1))))]
+
+
+def ejecutar_paso(crear_dispositivo, hato, n, duracion, pausa):
+    """Corre n dispositivos durante `duracion` segundos y retorna sus metricas."""
+    dispositivos = [crear_dispositivo(i) for i in range(n)]
+    resultados = []
+    hasta = time.perf_counter() + duracion
+    hilos = [threading.Thread(target=_trabajar, args=(
+        d, PERFILES[i % len(PERFILES)], hato, i, hasta, pausa, resultados)) for i, d in enumerate(dispositivos)]
+    inicio = time.perf_counter()
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    transcurrido = time.perf_counter() - inicio
+
+    latencias = sorted(l for lat, _, _ in resultados for l in lat)
+    return {
+        'dispositivos': n,
+        'solicitudes': len(latencias),
+        'por_segundo': len(latencias) / transcurrido,
+        'p50': _percentil(latencias, 50) * 1000,
+        'p95': _percentil(latencias, 95) * 1000,
+        'p99': _percentil(latencias, 99) * 1000,
+        'errores': sum(e for _, e, _ in resultados),
+        'ocupadas': sum(o for _, _, o in resultados),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[1])
+    parser.add_argument('--dispositivos', default='1,2,4,8', help='cantidades de dispositivos, separadas por coma')
+    parser.add_argument('--duracion', type=float, default=10, help='segundos por cada cantidad')
+    parser.add_argument('--pausa', type=float, default=0, help='pausa media entre solicitudes (s)')
+    parser.add_argument('--animales', type=int, default=800, help='animales en tabla2')
+    parser.add_argument('--modo', choices=('servidor', 'cliente'), default='servidor')
+    args = parser.parse_args()
+
+    sid = crear_sesion_sintetica(n_tabla2=args.animales, n_tabla3=args.animales // 3)
+    app, _ = cliente(sid)
+    app.logger.setLevel(logging.ERROR)
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    hato = Hato(sid)
+
+    servidor = None
+    if args.modo == 'servidor':
+        servidor = make_server('127.0.0.1', 0, app, threaded=True)
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        base = f'http://127.0.0.1:{servidor.server_port}'
+
+        def crear(i):
+            return DispositivoHttp(base, sid, i)
+    else:
+        def crear(i):
+            return DispositivoCliente(app, sid, i)
+
+    print(f"{'dispositivos':>12}{'solicitudes':>12}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}"
+          f"{'p99 ms':>9}{'5xx':>6}{'503':>6}")
+    try:
+        for n in (int(x) for x in args.dispositivos.split(',')):
+            r = ejecutar_paso(crear, hato, n, args.duracion, args.pausa)
+            print(f"{r['dispositivos']:>12}{r['solicitudes']:>12}{r['por_segundo']:>9.1f}{r['p50']:>9.1f}"
+                  f"{r['p95']:>9.1f}{r['p99']:>9.1f}{r['errores']:>6}{r['ocupadas']:>6}")
+    finally:
+        if servidor is not None:
+            servidor.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""
+bench/compresion.py
+Bytes enviados por las paginas y APIs principales, sin comprimir y con cada
+codificacion que negocia middleware/compresion.py.
+
+    python -m bench.compresion [--animales 800]
+"""
+import argparse
+
+from bench.comun import crear_sesion_sintetica, cliente
+from middleware import compresion
+
+RUTAS = [
+    ('Captura', '/principal'),
+    ('Captura (tab partos)', '/principal?tab=partos'),
+    ('Novillas', '/principal/novillas'),
+    ('Ordeños grupal', '/principal/ordenos'),
+    ('Ver tabla', '/principal/ver-tabla'),
+    ('API animal', '/principal/api/animal/0'),
+    ('API buscar', '/principal/api/buscar?q=luna'),
+    ('API grilla', '/principal/api/grid/tabla2?limite=100'),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[1])
+    parser.add_argument('--animales', type=int, default=800, help='animales en tabla2')
+    args = parser.parse_args()
+
+    sid = crear_sesion_sintetica(n_tabla2=args.animales, n_tabla3=args.animales // 3)
+    _, c = cliente(sid)
+    codificaciones = ['gzip'] + (['br'] if compresion.brotli is not None else [])
+
+    print(f"{'ruta':<24}{'identity':>12}" + ''.join(f'{e:>12}{"%":>7}' for e in codificaciones))
+    for nombre, ruta in RUTAS:
+        base = c.get(ruta, headers={'Accept-Encoding': 'identity'})
+        linea = f'{nombre:<24}{len(base.data):>12,}'
+        for enc in codificaciones:
+            r = c.get(ruta, headers={'Accept-Encoding': enc})
+            enviados = len(r.data)  # el cliente de pruebas no descomprime
+            linea += f'{enviados:>12,}{100 * enviados / max(len(base.data), 1):>6.0f}%'
+        print(linea)
+    if compresion.brotli is None:
+        print('\n(brotli no instalado: solo gzip)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+bench/comun.py
+Utilidades de los benchmarks: sesion sintetica en un directorio temporal y
+cliente de pruebas de Flask con la sesion activa.
+
+Se ejecutan desde la raiz del proyecto, p. ej.: python -m bench.compresion
+"""
+import os
+import random
+import tempfile
+
+os.environ.setdefault('SECRET_KEY', 'bench')
+
+import config  # noqa: E402
+
+# Las sesiones sinteticas nunca tocan data/ del servidor
+_TMP = tempfile.mkdtemp(prefix='capre-bench-')
+config.DATA_FOLDER = os.path.join(_TMP, 'data')
+config.UPLOAD_FOLDER = os.path.join(_TMP, 'uploads')
+os.makedirs(config.DATA_FOLDER, exist_ok=True)
+
+from models.database import init_db  # noqa: E402
+
+NOMBRES = ['LUNA', 'ROSA', 'MIEL', 'ESTRELLA', 'PALOMA', 'CANELA', 'NIEVE', 'BONITA']
+TOROS = ['HOLSTAR', 'GOLDWYN', 'SHOTTLE', 'MOGUL', 'DELTA']
+
+
+def crear_sesion_sintetica(session_id='bench', n_tabla2=800, n_tabla3=300, semilla=1):
+    """Crea una sesion con un hato sintetico de n_tabla2 + n_tabla3 animales."""
+    rnd = random.Random(semilla)
+    conn = init_db(session_id)
+    conn.execute(
+        "INSERT INTO session_meta (id, prefix_code, farm_name, device_id) VALUES (1, '05_0001', 'BENCH', 'bench')"
+    )
+    conn.execute(
+        "INSERT INTO tabla1 (hato, nombre, propieta, fecultprb, fecprbact, sumlec)"
+        " VALUES ('05_0001', 'HATO BENCH', 'PROPIETARIO', '2024-01-01', '2024-02-01', 0)"
+    )
+    for tabla, n in (('tabla2', n_tabla2), ('tabla3', n_tabla3)):
+        filas = []
+        for i in range(n):
+            estado = rnd.choice('0123456') if tabla == 'tabla2' else rnd.choice('0001')
+            filas.append((
+                f'{tabla[-1]}{i:05d}', str(i + 1), f'{rnd.choice(NOMBRES)} {i}', f'REG{i:06d}',
+                estado, f'202{rnd.randint(0, 3)}-0{rnd.randint(1, 9)}-1{rnd.randint(0, 9)}',
+                round(rnd.uniform(5, 40), 1), rnd.randint(5, 300), rnd.randint(0, 4),
+                rnd.choice(['P', 'V', None]), rnd.choice(TOROS), rnd.randint(0, 5),
+                rnd.choice([None, '2023-11-0' + str(rnd.randint(1, 9))]),
+            ))
+        conn.executemany(f'''
+            INSERT INTO {tabla} (codint, orejera, nombre, registro, estado, fecest,
+                ultlec, dialec, numser, pac, codtor, numreb, fecparto)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', filas)
+    conn.commit()
+    conn.close()
+    return session_id
+
+
+def cliente(session_id='bench'):
+    """Retorna (app, cliente) con la sesion activa en la cookie."""
+    from app import create_app
+    app = create_app()
+    app.config['SESSION_COOKIE_SECURE'] = False
+    c = app.test_client()
+    with c.session_transaction() as s:
+        s['device_id'] = 'bench'
+        s['active_session_id'] = session_id
+    return app, c
@@ -0,0 +1,86 @@
+"""
+bench/perfiles_io.py
+Rutas de lectura (navegacion de captura, novillas, resumen general y
+exportacion) con cada perfil de E/S de config.PERFILES_IO. Cada perfil usa su
+propia sesion sintetica, creada con su page_size. Reporta la mediana por ruta
+y recomienda el perfil con menor tiempo total; si ninguno mejora al estandar
+en mas de --margen %, se queda con el estandar, que usa menos memoria.
+
+    python -m bench.perfiles_io [--animales 2000] [--repeticiones 15] [--perfiles estandar,mmap]
+"""
+import argparse
+import os
+import statistics
+import time
+
+from bench.comun import crear_sesion_sintetica, cliente
+import config
+
+
+def rutas(total):
+    """(nombre, [urls]) de las rutas de lectura; la navegacion recorre el hato."""
+    pasos = [i * total // 10 for i in range(10)]
+    return [
+        ('Captura', [f'/principal?idx={i}' for i in pasos]),
+        ('API animal', [f'/principal/api/animal/{i}' for i in pasos]),
+        ('Novillas', ['/principal/novillas']),
+        ('Resumen general', ['/principal/resumen']),
+        ('Exportar DBF', ['/export']),
+    ]
+
+
+def medir(c, urls, repeticiones):
+    """Mediana en segundos de recorrer todas las urls, tras una pasada de calentamiento."""
+    tiempos = []
+    for vuelta in range(repeticiones + 1):
+        inicio = time.perf_counter()
+        for url in urls:
+            r = c.get(url)
+            r.close()
+        if vuelta:
+            tiempos.append(time.perf_counter() - inicio)
+    return statistics.median(tiempos)
+
+
+def _memoria_equipo():
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[1])
+    parser.add_argument('--animales', type=int, default=2000, help='animales en tabla2')
+    parser.add_argument('--repeticiones', type=int, default=15, help='mediciones por ruta')
+    parser.add_argument('--perfiles', default=','.join(config.PERFILES_IO), help='perfiles a comparar')
+    parser.add_argument('--margen', type=float, default=5, help='mejora minima (%%) para dejar el estandar')
+    args = parser.parse_args()
+
+    perfiles = args.perfiles.split(',')
+    memoria = _memoria_equipo()
+    print(f"# {os.cpu_count()} CPU, {memoria / 2 ** 30:.1f} GiB RAM" if memoria else f'# {os.cpu_count()} CPU')
+
+    resultados = {}
+    for perfil in perfiles:
+        config.PERFIL_IO = perfil
+        sid = crear_sesion_sintetica(f'io_{perfil}', n_tabla2=args.animales, n_tabla3=args.animales // 3)
+        _, c = cliente(sid)
+        resultados[perfil] = {nombre: medir(c, urls, args.repeticiones)
+                              for nombre, urls in rutas(args.animales)}
+
+    nombres = [nombre for nombre, _ in rutas(args.animales)]
+    print(f"{'ruta (ms)':<18}" + ''.join(f'{p:>14}' for p in perfiles))
+    for nombre in nombres:
+        print(f'{nombre:<18}' + ''.join(f'{resultados[p][nombre] * 1000:>14.2f}' for p in perfiles))
+    totales = {p: sum(resultados[p].values()) for p in perfiles}
+    print(f"{'TOTAL':<18}" + ''.join(f'{totales[p] * 1000:>14.2f}' for p in perfiles))
+
+    mejor = min(totales, key=totales.get)
+    if 'estandar' in totales and totales[mejor] > totales['estandar'] * (1 - args.margen / 100):
+        mejor = 'estandar'
+    print(f'\nRecomendado para este equipo: PERFIL_IO={mejor}  {config.PERFILES_IO[mejor]}')
+
+
+if __name__ == '__main__':
+    main()
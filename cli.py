@@ -0,0 +1,268 @@
+"""
+cli.py
+Comandos de mantenimiento de CAPRE para la linea de comandos de Flask:
+
+    FLASK_APP=app:create_app flask verificar-planes [SESION ...]
+    FLASK_APP=app:create_app flask recalcular-indicadores [--corregir] [SESION ...]
+    FLASK_APP=app:create_app flask sql-lentas [--top N] [--orden total|max|veces] [--log RUTA]
+    FLASK_APP=app:create_app flask mantenimiento [--todas] [SESION ...]
+    FLASK_APP=app:create_app flask archivar [SESION ...]
+    FLASK_APP=app:create_app flask restaurar SESION ...
+    FLASK_APP=app:create_app flask sesion-caliente [--respaldar | --enfriar] [SESION ...]
+    FLASK_APP=app:create_app flask cache [--purgar | --vaciar]
+    FLASK_APP=app:create_app flask importar-fincas DIRECTORIO [--dispositivo ID] [--asignar PREFIJO=ID ...] [--procesos N]
+    FLASK_APP=app:create_app flask exportar-fincas DESTINO [--todas | --dispositivo ID | --prefijos P1,P2 | SESION ...] [--forzar]
+"""
+import os
+import sqlite3
+import time
+
+import click
+
+import config
+from models.database import get_db, crear_esquema
+from models import sql_lenta
+from services.produccion import verificar_planes
+from services.indicadores import recalcular_indicadores
+from services.mantenimiento import ejecutar_mantenimiento, sesiones_en_disco
+from services.archivo import archivar_sesion, archivar_inactivas, restaurar_sesion, resumen_archivo
+from services import cache, caliente
+from services.importacion_masiva import importar_directorio, escribir_resumen
+from services.exportacion_masiva import seleccionar_sesiones, exportar_sesiones
+
+
+def _conexion_vacia():
+    conn = sqlite3.connect(':memory:')
+    conn.row_factory = sqlite3.Row
+    crear_esquema(conn)
+    return conn
+
+
+def register_commands(app):
+    @app.cli.command('verificar-planes')
+    @click.argument('sesiones', nargs=-1)
+    def verificar_planes_cmd(sesiones):
+        """Comprueba con EXPLAIN QUERY PLAN que las consultas de la cohorte en
+        produccion usan sus indices parciales y no ordenan con B-tree temporal.
+        Sin SESIONES, verifica sobre un esquema vacio en memoria."""
+        objetivos = [(s, lambda s=s: get_db(s)) for s in sesiones] or [('(esquema)', _conexion_vacia)]
+        fallos = 0
+        for nombre_base, abrir in objetivos:
+            conn = abrir()
+            try:
+                for nombre, detalle, ok in verificar_planes(conn):
+                    click.echo(f"{'OK   ' if ok else 'FALLO'} {nombre_base} {nombre}: {' | '.join(detalle)}")
+                    fallos += not ok
+            finally:
+                conn.close()
+        if fallos:
+            raise SystemExit(1)
+
+    @app.cli.command('recalcular-indicadores')
+    @click.argument('sesiones', nargs=-1)
+    @click.option('--corregir', is_flag=True, help='Reescribe los indicadores con el calculo completo.')
+    def recalcular_indicadores_cmd(sesiones, corregir):
+        """Compara los indicadores del hato mantenidos por triggers contra un
+        calculo completo sobre tabla2. Sin SESIONES, revisa todas."""
+        sesiones = sesiones or sesiones_en_disco()
+        inconsistentes = 0
+        for session_id in sesiones:
+            conn = get_db(session_id)
+            try:
+                diferencias = recalcular_indicadores(conn, corregir=corregir)
+            finally:
+                conn.close()
+            if not diferencias:
+                click.echo(f'OK    {session_id}')
+                continue
+            inconsistentes += 1
+            click.echo(f"{'CORREGIDO' if corregir else 'FALLO'} {session_id}")
+            for clave, guardado, calculado in diferencias:
+                click.echo(f'      {clave}: guardado={guardado} calculado={calculado}')
+        if inconsistentes and not corregir:
+            raise SystemExit(1)
+
+    @app.cli.command('sql-lentas')
+    @click.option('--top', default=15, show_default=True, help='Sentencias a mostrar.')
+    @click.option('--orden', type=click.Choice(['total', 'max', 'veces']), default='total', show_default=True)
+    @click.option('--log', 'ruta', default=None, help='Log a resumir (por defecto el de DATA_FOLDER).')
+    def sql_lentas_cmd(top, orden, ruta):
+        """Resume el log de consultas lentas por sentencia normalizada: las
+        que mas tiempo acumulan, con su plan y las rutas que las ejecutan."""
+        grupos = sql_lenta.resumir(sql_lenta.leer(ruta), orden=orden)
+        if not grupos:
+            click.echo('Sin consultas lentas registradas.')
+            return
+        for g in grupos[:top]:
+            marca = ' [SIN INDICE]' if g['sin_indice'] else ''
+            click.echo(f"{g['total_ms']:10.1f} ms total  {g['veces']:5d} veces  "
+                       f"max {g['max_ms']:.1f} ms  prom {g['promedio_ms']:.1f} ms{marca}")
+            click.echo(f"    {g['normalizada'][:300]}")
+            if g['rutas']:
+                click.echo(f"    rutas: {', '.join(g['rutas'])}")
+            for detalle in g['plan'] or []:
+                click.echo(f'    plan: {detalle}')
+
+    @app.cli.command('mantenimiento')
+    @click.argument('sesiones', nargs=-1)
+    @click.option('--todas', is_flag=True, help='Mantiene todas las sesiones, no solo las pendientes.')
+    def mantenimiento_cmd(sesiones, todas):
+        """Ejecuta ahora el mantenimiento de las sesiones indicadas, de todas
+        (--todas) o de las pendientes, y muestra los tamaños antes y despues."""
+        if todas:
+            sesiones = sesiones_en_disco()
+        resultados = ejecutar_mantenimiento(sesiones or None)
+        if not resultados:
+            click.echo('Nada que mantener (o hay otro mantenimiento en curso).')
+        for session_id, r in resultados.items():
+            if r.get('archivada'):
+                click.echo(f"{session_id}: archivada, {r['bytes_db']:,} -> {r['bytes_gz']:,} B")
+                continue
+            click.echo(f"{session_id}: base {r['db_antes']:,} -> {r['db_despues']:,} B, "
+                       f"WAL {r['wal_antes']:,} -> {r['wal_despues']:,} B, "
+                       f"{r['paginas_libres']} paginas libres, "
+                       f"{r.get('bitacora_compactada', 0)} entradas de bitacora compactadas, {r['segundos']} s")
+
+    @app.cli.command('archivar')
+    @click.argument('sesiones', nargs=-1)
+    def archivar_cmd(sesiones):
+        """Comprime en DATA_FOLDER/archivo las sesiones indicadas o, sin
+        SESIONES, las que no tienen accesos en ARCHIVO_INACTIVIDAD_DIAS."""
+        if sesiones:
+            resultados = {}
+            for session_id in sesiones:
+                estadisticas = archivar_sesion(session_id)
+                if estadisticas:
+                    resultados[session_id] = estadisticas
+        else:
+            resultados = archivar_inactivas()
+        for session_id, r in resultados.items():
+            click.echo(f"{session_id}: {r['bytes_db']:,} -> {r['bytes_gz']:,} B "
+                       f"(ultimo acceso {r['ultimo_acceso']})")
+        if sesiones and len(resultados) < len(sesiones):
+            click.echo('Algunas sesiones no se archivaron (en uso o sin datos).')
+        r = resumen_archivo()
+        click.echo(f"Archivo: {r['sesiones']} sesiones, {r['bytes_db']:,} -> {r['bytes_gz']:,} B "
+                   f"({r['ahorro']:,} B ahorrados); {r['restauraciones']} restauraciones, "
+                   f"media {r['restauracion_media']:.3f} s, max {r['restauracion_max']:.3f} s")
+
+    @app.cli.command('restaurar')
+    @click.argument('sesiones', nargs=-1, required=True)
+    def restaurar_cmd(sesiones):
+        """Descomprime sesiones archivadas sin esperar a que se activen."""
+        for session_id in sesiones:
+            segundos = restaurar_sesion(session_id)
+            if segundos is None:
+                click.echo(f'{session_id}: no esta archivada')
+            else:
+                click.echo(f'{session_id}: restaurada en {segundos:.3f} s')
+
+    @app.cli.command('sesion-caliente')
+    @click.argument('sesiones', nargs=-1)
+    @click.option('--respaldar', is_flag=True, help='Respalda ahora la copia caliente en DATA_FOLDER.')
+    @click.option('--enfriar', is_flag=True, help='Respalda y vuelve a servir la sesion desde disco.')
+    def sesion_caliente_cmd(sesiones, respaldar, enfriar):
+        """Sirve las sesiones indicadas desde SESION_CALIENTE_DIR (RAM-disk).
+        Sin SESIONES, lista las sesiones calientes y su ultimo respaldo."""
+        if not sesiones:
+            for session_id in caliente.sesiones_calientes():
+                respaldo = time.time() - caliente.ultimo_respaldo(session_id)
+                escritura = time.time() - caliente.ultima_escritura(session_id)
+                click.echo(f'{session_id}: ultima escritura hace {escritura:.0f} s, '
+                           f'ultimo respaldo hace {respaldo:.0f} s')
+            return
+        for session_id in sesiones:
+            if respaldar or enfriar:
+                if session_id not in caliente.sesiones_calientes():
+                    click.echo(f'{session_id}: no esta caliente')
+                    continue
+                segundos = caliente.enfriar(session_id) if enfriar else caliente.respaldar(session_id)
+                click.echo(f"{session_id}: {'enfriada' if enfriar else 'respaldada'} ({segundos:.3f} s)")
+                continue
+            segundos = caliente.promover(session_id)
+            if segundos is None:
+                click.echo(f'{session_id}: ya estaba caliente')
+            else:
+                click.echo(f'{session_id}: copiada a {config.SESION_CALIENTE_DIR} en {segundos:.3f} s')
+
+    @app.cli.command('cache')
+    @click.option('--purgar', is_flag=True, help='Elimina las entradas vencidas y las que sobran.')
+    @click.option('--vaciar', is_flag=True, help='Elimina todas las entradas y estadisticas.')
+    def cache_cmd(purgar, vaciar):
+        """Aciertos, fallos e invalidaciones del cache compartido por espacio."""
+        if vaciar:
+            cache.vaciar()
+            click.echo('Cache vaciado.')
+            return
+        if purgar:
+            click.echo(f'{cache.purgar()} entradas eliminadas.')
+        click.echo(f"{'espacio':<28}{'aciertos':>10}{'fallos':>10}{'invalid.':>10}{'tasa':>8}{'entradas':>10}")
+        for e in cache.estadisticas():
+            click.echo(f"{e['espacio']:<28}{e['aciertos']:>10}{e['fallos']:>10}{e['invalidados']:>10}"
+                       f"{e['tasa']:>8.1%}{e['entradas']:>10}")
+
+    @app.cli.command('importar-fincas')
+    @click.argument('directorio', type=click.Path(exists=True, file_okay=False))
+    @click.option('--dispositivo', default=None, help='device_id dueño de las sesiones importadas.')
+    @click.option('--asignar', multiple=True, metavar='PREFIJO=ID', help='Dueño de una finca en particular.')
+    @click.option('--procesos', type=int, default=None, help='Importaciones en paralelo (por defecto, CPUs).')
+    @click.option('--resumen', 'ruta_resumen', default=None,
+                  help='JSON con el resumen (por defecto DIRECTORIO/importacion_<fecha>.json).')
+    def importar_fincas_cmd(directorio, dispositivo, asignar, procesos, ruta_resumen):
+        """Importa todas las fincas (tabla1, tabla2 y tabla3 .dbf de cada
+        prefijo) de DIRECTORIO en paralelo."""
+        asignaciones = {}
+        for par in asignar:
+            prefijo, _, device_id = par.partition('=')
+            if not device_id:
+                raise click.BadParameter(f'{par}: se espera PREFIJO=ID', param_hint='--asignar')
+            asignaciones[prefijo] = device_id
+        inicio = time.perf_counter()
+        resumenes = importar_directorio(directorio, dispositivo, asignaciones, procesos)
+        segundos = time.perf_counter() - inicio
+        for r in resumenes:
+            if r['error']:
+                click.echo(f"{r['prefijo']}: {r['error']}")
+            else:
+                click.echo(f"{r['prefijo']}: {r['finca']} -> {r['session_id']} "
+                           f"({r['tabla1']}/{r['tabla2']}/{r['tabla3']} reg, {r['segundos']:.2f} s)")
+        ruta_resumen = ruta_resumen or os.path.join(
+            directorio, f"importacion_{time.strftime('%Y%m%d_%H%M%S')}.json")
+        escribir_resumen(resumenes, ruta_resumen, segundos)
+        importadas = sum(1 for r in resumenes if r['session_id'])
+        click.echo(f'{importadas} de {len(resumenes)} fincas importadas en {segundos:.1f} s. '
+                   f'Resumen: {ruta_resumen}')
+
+    @app.cli.command('exportar-fincas')
+    @click.argument('destino', type=click.Path(file_okay=False))
+    @click.argument('sesiones', nargs=-1)
+    @click.option('--todas', is_flag=True, help='Exporta todas las sesiones.')
+    @click.option('--dispositivo', default=None, help='Solo las sesiones visibles para este device_id.')
+    @click.option('--prefijos', default=None, help='Solo estos codigos de hato, separados por coma.')
+    @click.option('--archivadas', is_flag=True, help='Incluye sesiones archivadas (las restaura).')
+    @click.option('--forzar', is_flag=True, help='Exporta aunque los datos no cambiaron.')
+    @click.option('--procesos', type=int, default=None, help='Exportaciones en paralelo (por defecto, CPUs).')
+    def exportar_fincas_cmd(destino, sesiones, todas, dispositivo, prefijos, archivadas, forzar, procesos):
+        """Exporta a DESTINO un ZIP con los DBF de cada sesion elegida,
+        omitiendo las que no cambiaron desde su ultima exportacion."""
+        if not (todas or dispositivo or prefijos or sesiones):
+            raise click.UsageError('Indique --todas, --dispositivo, --prefijos o las SESIONES a exportar.')
+        catalogos = seleccionar_sesiones(
+            dispositivo, prefijos.split(',') if prefijos else None, set(sesiones), archivadas)
+        if not catalogos:
+            click.echo('Ninguna sesion coincide con la seleccion.')
+            return
+        inicio = time.perf_counter()
+        resumenes = exportar_sesiones(catalogos, destino, procesos, forzar)
+        for r in resumenes:
+            if r['error']:
+                click.echo(f"{r['prefijo']} ({r['session_id']}): {r['error']}")
+            elif r['omitida']:
+                click.echo(f"{r['prefijo']} ({r['session_id']}): sin cambios, {r['zip']}")
+            else:
+                click.echo(f"{r['prefijo']} ({r['session_id']}): {r['zip']} "
+                           f"({r['bytes']:,} B, {r['segundos']:.2f} s)")
+        exportadas = sum(1 for r in resumenes if r['zip'] and not r['omitida'])
+        omitidas = sum(1 for r in resumenes if r['omitida'])
+        click.echo(f'{exportadas} exportadas, {omitidas} sin cambios, '
+                   f"{sum(1 for r in resumenes if r['error'])} con error en {time.perf_counter() - inicio:.1f} s.")
@@ -35,3 +35,96 @@ DEBUG = os.environ.get('FLASK_DEBUG', 'False').lower() in ('true', '1', 'yes')
 
 # Limite de tamaño de archivos (16 MB)
 MAX_CONTENT_LENGTH = 16 * 1024 * 1024
+
+# Dias minimos despues del parto para un servicio (services/helpers.py). Los
+# triggers de indicadores (models/database.py) lo fijan al crear la base: las
+# sesiones existentes conservan el valor con que se crearon.
+DIAS_MIN_SERVICIO = 125
+
+# Compresion de respuestas (middleware/compresion.py)
+# Nivel gzip 1-9 y calidad brotli 0-11 (brotli solo si el paquete esta instalado).
+# Respuestas menores a COMPRESION_MINIMO bytes se envian sin comprimir.
+COMPRESION_NIVEL = int(os.environ.get('COMPRESION_NIVEL', '6'))
+COMPRESION_NIVEL_BROTLI = int(os.environ.get('COMPRESION_NIVEL_BROTLI', '5'))
+COMPRESION_MINIMO = int(os.environ.get('COMPRESION_MINIMO', '1024'))
+
+# Token de administracion para /metrics y otras rutas de diagnostico.
+# Sin token, esas rutas solo responden a solicitudes locales.
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN') or None
+
+# Registro de consultas lentas (models/sql_lenta.py): sentencias que tardan al
+# menos SQL_LENTA_MS milisegundos quedan en DATA_FOLDER/logs/sql_lenta.log con
+# su EXPLAIN QUERY PLAN. 0 lo desactiva.
+SQL_LENTA_MS = float(os.environ.get('SQL_LENTA_MS', '100'))
+SQL_LENTA_MAX_BYTES = 5 * 1024 * 1024
+SQL_LENTA_RESPALDOS = 3
+
+# Perfiles cProfile bajo demanda (middleware/perfilador.py): se conservan los
+# mas recientes en DATA_FOLDER/perfiles.
+PERFILES_MAXIMO = int(os.environ.get('PERFILES_MAXIMO', '200'))
+
+# Mantenimiento de bases de sesion (services/mantenimiento.py), lanzado en un
+# hilo al cerrar respuestas: checkpoint del WAL, PRAGMA optimize e
+# incremental_vacuum sobre sesiones sin escrituras recientes, y archivo de
+# sesiones frias. Cada pasada dura a lo sumo MANTENIMIENTO_PRESUPUESTO_SEG
+# (mas el paso en curso) y libera paginas de a MANTENIMIENTO_PAGINAS_TANDA.
+MANTENIMIENTO_ACTIVO = os.environ.get('MANTENIMIENTO_ACTIVO', 'True').lower() in ('true', '1', 'yes')
+MANTENIMIENTO_REVISION_MIN = float(os.environ.get('MANTENIMIENTO_REVISION_MIN', '15'))
+MANTENIMIENTO_INTERVALO_HORAS = float(os.environ.get('MANTENIMIENTO_INTERVALO_HORAS', '24'))
+MANTENIMIENTO_INACTIVIDAD_MIN = float(os.environ.get('MANTENIMIENTO_INACTIVIDAD_MIN', '30'))
+MANTENIMIENTO_LOTE = int(os.environ.get('MANTENIMIENTO_LOTE', '5'))
+MANTENIMIENTO_PRESUPUESTO_SEG = float(os.environ.get('MANTENIMIENTO_PRESUPUESTO_SEG', '20'))
+MANTENIMIENTO_PAGINAS_TANDA = int(os.environ.get('MANTENIMIENTO_PAGINAS_TANDA', '500'))
+
+# Archivo de sesiones frias (services/archivo.py): sesiones sin accesos en
+# ARCHIVO_INACTIVIDAD_DIAS se comprimen en DATA_FOLDER/archivo en la pasada de
+# mantenimiento (o con `flask archivar`) y se restauran al activarlas.
+# 0 desactiva el archivo automatico.
+ARCHIVO_INACTIVIDAD_DIAS = float(os.environ.get('ARCHIVO_INACTIVIDAD_DIAS', '60'))
+
+# Modo caliente (services/caliente.py): una sesion promovida con
+# `flask sesion-caliente` se sirve desde una copia en SESION_CALIENTE_DIR
+# (un RAM-disk como /dev/shm/capre; vacio lo desactiva) y se respalda en
+# DATA_FOLDER con la API de backup de SQLite cada SESION_CALIENTE_RESPALDO_SEG
+# segundos. Tras SESION_CALIENTE_INACTIVIDAD_MIN minutos sin escrituras se
+# respalda por ultima vez y vuelve a servirse desde disco.
+SESION_CALIENTE_DIR = os.environ.get('SESION_CALIENTE_DIR', '')
+SESION_CALIENTE_RESPALDO_SEG = float(os.environ.get('SESION_CALIENTE_RESPALDO_SEG', '60'))
+SESION_CALIENTE_INACTIVIDAD_MIN = float(os.environ.get('SESION_CALIENTE_INACTIVIDAD_MIN', '10'))
+
+# Perfiles de E/S de las bases de sesion (models/database.py). page_size solo
+# se aplica al crear la base; cache_size sigue la convencion de SQLite
+# (positivo en paginas, negativo en KiB). `python -m bench.perfiles_io` mide
+# las rutas de lectura con cada perfil y recomienda uno para el equipo.
+PERFILES_IO = {
+    'estandar': {'page_size': 4096, 'cache_size': 10000, 'mmap_size': 0, 'temp_store': 'MEMORY'},
+    'mmap': {'page_size': 4096, 'cache_size': -16000, 'mmap_size': 256 * 1024 * 1024, 'temp_store': 'MEMORY'},
+    'lectura': {'page_size': 8192, 'cache_size': -32000, 'mmap_size': 256 * 1024 * 1024, 'temp_store': 'MEMORY'},
+    'memoria_baja': {'page_size': 4096, 'cache_size': -2000, 'mmap_size': 0, 'temp_store': 'DEFAULT'},
+}
+PERFIL_IO = os.environ.get('PERFIL_IO', 'estandar')
+
+# Cache compartido entre procesos (services/cache.py) en DATA_FOLDER/.cache.db:
+# fragmentos de Captura y resultados federados, invalidados por la version de
+# datos de cada sesion y por TTL.
+CACHE_ACTIVO = os.environ.get('CACHE_ACTIVO', 'True').lower() in ('true', '1', 'yes')
+CACHE_TTL_SEG = float(os.environ.get('CACHE_TTL_SEG', '3600'))
+CACHE_MAX_ENTRADAS = int(os.environ.get('CACHE_MAX_ENTRADAS', '5000'))
+# Cada proceso suma sus aciertos/fallos a la base del cache cada
+# CACHE_ESTADISTICAS_SEG segundos o CACHE_ESTADISTICAS_SOLICITUDES solicitudes
+CACHE_ESTADISTICAS_SEG = float(os.environ.get('CACHE_ESTADISTICAS_SEG', '30'))
+CACHE_ESTADISTICAS_SOLICITUDES = int(os.environ.get('CACHE_ESTADISTICAS_SOLICITUDES', '200'))
+
+# Transacciones de escritura por turnos (models/escritura.py): fila FIFO por
+# sesion dentro del proceso y BEGIN IMMEDIATE con reintentos aleatorios entre
+# procesos. Pasado ESCRITURA_ESPERA_MAX_SEG la solicitud responde 503.
+# ESCRITURA_INTENTO_MS es tambien el busy_timeout de las conexiones de get_db.
+ESCRITURA_ESPERA_MAX_SEG = float(os.environ.get('ESCRITURA_ESPERA_MAX_SEG', '8'))
+ESCRITURA_INTENTO_MS = int(os.environ.get('ESCRITURA_INTENTO_MS', '20'))
+ESCRITURA_BACKOFF_MIN_MS = float(os.environ.get('ESCRITURA_BACKOFF_MIN_MS', '5'))
+ESCRITURA_BACKOFF_MAX_MS = float(os.environ.get('ESCRITURA_BACKOFF_MAX_MS', '250'))
+
+# Entrada ASGI (asgi.py): hilos de cada pool de middleware/asgi.py
+ASGI_HILOS_API = int(os.environ.get('ASGI_HILOS_API', '8'))
+ASGI_HILOS_GENERAL = int(os.environ.get('ASGI_HILOS_GENERAL', '4'))
+ASGI_HILOS_PESADAS = int(os.environ.get('ASGI_HILOS_PESADAS', '2'))
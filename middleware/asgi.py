@@ -0,0 +1,198 @@
+"""
+middleware/asgi.py
+Puente ASGI para servir la app Flask con un servidor asincrono (uvicorn o
+hypercorn, opcionales: no estan en requirements.txt). Ver asgi.py.
+
+El ciclo de eventos solo atiende conexiones: recibe el cuerpo de la
+solicitud sin bloquear (una subida lenta no ocupa un hilo) y envia la
+respuesta por partes. La vista de Flask, y con ella todo el trabajo de
+SQLite, corre en uno de tres pools de hilos acotados segun la ruta:
+
+- 'api': la API JSON de Captura (animal, novilla, auto-guardar y
+  validar-exportacion), ASGI_HILOS_API hilos;
+- 'pesadas': importacion y exportacion de DBF, ASGI_HILOS_PESADAS hilos;
+- 'general': el resto de las paginas, ASGI_HILOS_GENERAL hilos.
+
+Asi una exportacion o importacion larga ocupa un hilo de 'pesadas' y nunca
+deja a los dispositivos sin respuesta de la API. El cuerpo de la respuesta
+se lee del iterable WSGI en el mismo pool, de a un bloque, y al terminar se
+llama close() (los hooks call_on_close de mantenimiento, respaldo y cache).
+"""
+import asyncio
+import logging
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.exceptions import HTTPException
+from werkzeug.routing import RequestRedirect
+
+logger = logging.getLogger(__name__)
+
+RUTAS_API = frozenset({
+    'principal.api_get_animal',
+    'principal.api_get_novilla',
+    'principal.auto_guardar_ordeno',
+    'principal.validar_exportacion',
+})
+RUTAS_PESADAS = frozenset({'upload.upload_files', 'upload.export_files'})
+
+# Cuerpos de solicitud mas grandes pasan de memoria a un archivo temporal
+CUERPO_EN_MEMORIA = 1024 * 1024
+
+_FIN = object()
+
+
+class PuenteASGI:
+    """Aplicacion ASGI que ejecuta una aplicacion WSGI en pools de hilos."""
+
+    def __init__(self, app, hilos_api=8, hilos_general=4, hilos_pesadas=2):
+        self.app = app
+        self.pools = {
+            'api': ThreadPoolExecutor(hilos_api, thread_name_prefix='asgi-api'),
+            'general': ThreadPoolExecutor(hilos_general, thread_name_prefix='asgi-general'),
+            'pesadas': ThreadPoolExecutor(hilos_pesadas, thread_name_prefix='asgi-pesadas'),
+        }
+
+    def clasificar(self, metodo, ruta):
+        """Pool que atiende la ruta: 'api', 'pesadas' o 'general'."""
+        try:
+            endpoint, _ = self.app.url_map.bind('').match(ruta, method=metodo)
+        except (HTTPException, RequestRedirect):
+            return 'general'
+        if endpoint in RUTAS_API:
+            return 'api'
+        if endpoint in RUTAS_PESADAS:
+            return 'pesadas'
+        return 'general'
+
+    def cerrar(self):
+        for pool in self.pools.values():
+            pool.shutdown(wait=False)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._ciclo_de_vida(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, receive, send)
+        # websocket: no se usa
+
+    async def _ciclo_de_vida(self, receive, send):
+        while True:
+            mensaje = await receive()
+            if mensaje['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif mensaje['type'] == 'lifespan.shutdown':
+                self.cerrar()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _http(self, scope, receive, send):
+        cuerpo = tempfile.SpooledTemporaryFile(max_size=CUERPO_EN_MEMORIA)
+        try:
+            while True:
+                mensaje = await receive()
+                if mensaje['type'] == 'http.disconnect':
+                    return
+                cuerpo.write(mensaje.get('body', b''))
+                if not mensaje.get('more_body'):
+                    break
+            largo = cuerpo.tell()
+            cuerpo.seek(0)
+            pool = self.pools[self.clasificar(scope['method'], scope['path'])]
+            await self._responder(pool, _entorno(scope, cuerpo, largo), send)
+        finally:
+            cuerpo.close()
+
+    async def _responder(self, pool, entorno, send):
+        loop = asyncio.get_running_loop()
+        estado = []
+
+        def start_response(status, headers, exc_info=None):
+            estado[:] = [status, headers]
+
+        def iniciar():
+            # Vista y primer bloque en un solo salto al pool
+            iterable = self.app(entorno, start_response)
+            try:
+                iterador = iter(iterable)
+                return iterable, iterador, next(iterador, _FIN)
+            except BaseException:
+                # Sin iterable no lo cierra el finally de _responder
+                if hasattr(iterable, 'close'):
+                    iterable.close()
+                raise
+
+        iterable = None
+        iniciada = terminada = False
+        try:
+            iterable, iterador, bloque = await loop.run_in_executor(pool, iniciar)
+            status, headers = estado
+            await send({
+                'type': 'http.response.start',
+                'status': int(status.split(' ', 1)[0]),
+                'headers': [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers],
+            })
+            iniciada = True
+            while bloque is not _FIN:
+                if bloque:
+                    await send({'type': 'http.response.body', 'body': bloque, 'more_body': True})
+                bloque = await loop.run_in_executor(pool, next, iterador, _FIN)
+            await send({'type': 'http.response.body', 'body': b''})
+            terminada = True
+        except Exception:
+            logger.exception('Error en %s %s', entorno['REQUEST_METHOD'], entorno['PATH_INFO'])
+            if not iniciada:
+                await send({'type': 'http.response.start', 'status': 500,
+                            'headers': [(b'content-type', b'text/plain; charset=utf-8')]})
+                await send({'type': 'http.response.body', 'body': b'Error del servidor'})
+                terminada = True
+        finally:
+            if iniciada and not terminada:
+                # La respuesta se corto despues de enviar los encabezados:
+                # cerrar el cuerpo para que el cliente no espere al timeout
+                # del servidor (con Content-Length el servidor corta la
+                # conexion al ver el cuerpo incompleto)
+                try:
+                    await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+                except Exception:
+                    logger.debug('No se pudo cerrar la respuesta', exc_info=True)
+            if hasattr(iterable, 'close'):
+                await loop.run_in_executor(pool, iterable.close)
+
+
+def _entorno(scope, cuerpo, largo):
+    """environ WSGI (PEP 3333) para una solicitud ASGI http."""
+    servidor = scope.get('server') or ('localhost', 80)
+    cliente = scope.get('client') or ('', 0)
+    entorno = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': str(servidor[0]),
+        'SERVER_PORT': str(servidor[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': cliente[0],
+        'REMOTE_PORT': str(cliente[1]),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': cuerpo,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for nombre, valor in scope.get('headers', []):
+        nombre = nombre.decode('latin-1').upper().replace('-', '_')
+        valor = valor.decode('latin-1')
+        if nombre in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            entorno[nombre] = valor
+            continue
+        clave = f'HTTP_{nombre}'
+        if clave in entorno:
+            valor = entorno[clave] + ('; ' if clave == 'HTTP_COOKIE' else ',') + valor
+        entorno[clave] = valor
+    if largo and 'CONTENT_LENGTH' not in entorno:
+        entorno['CONTENT_LENGTH'] = str(largo)  # cuerpo enviado por partes
+    return entorno
@@ -0,0 +1,190 @@
+"""
+middleware/compresion.py
+Middleware WSGI de compresion gzip/brotli para HTML, JSON, CSS y JS.
+
+- Negocia la codificacion con Accept-Encoding (brotli solo si el paquete
+  esta instalado).
+- Respuestas con Content-Length menor al minimo se envian tal cual.
+- Respuestas con Content-Length se comprimen completas y salen con su nuevo
+  Content-Length.
+- Respuestas sin Content-Length (generadores/streaming) se comprimen por
+  fragmento con flush, sin acumular el cuerpo en memoria.
+- Si la aplicacion llama a start_response recien al iterar su cuerpo, se lee
+  el primer fragmento antes de decidir.
+"""
+import zlib
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional
+    brotli = None
+
+TIPOS_COMPRIMIBLES = (
+    'text/html', 'text/plain', 'text/css', 'text/csv',
+    'application/json', 'application/javascript', 'text/javascript',
+    'application/manifest+json', 'image/svg+xml',
+)
+
+
+def _aceptadas(accept_encoding):
+    """Codificaciones aceptadas por el cliente (q > 0) segun Accept-Encoding."""
+    aceptadas = set()
+    for parte in (accept_encoding or '').split(','):
+        nombre, _, params = parte.strip().partition(';')
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if nombre and q > 0:
+            aceptadas.add(nombre.lower())
+    return aceptadas
+
+
+class _Compresor:
+    """Compresor incremental con la misma interfaz para gzip y brotli."""
+
+    def __init__(self, codificacion, nivel, nivel_brotli):
+        self.codificacion = codificacion
+        if codificacion == 'br':
+            self._c = brotli.Compressor(quality=nivel_brotli)
+        else:
+            # wbits 16 + MAX_WBITS = formato gzip
+            self._c = zlib.compressobj(nivel, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def comprimir(self, datos, flush=False):
+        if self.codificacion == 'br':
+            salida = self._c.process(datos)
+            return salida + self._c.flush() if flush else salida
+        salida = self._c.compress(datos)
+        return salida + self._c.flush(zlib.Z_SYNC_FLUSH) if flush else salida
+
+    def terminar(self):
+        return self._c.finish() if self.codificacion == 'br' else self._c.flush()
+
+
+class CompresionMiddleware:
+    """Envuelve una aplicacion WSGI y comprime sus respuestas."""
+
+    def __init__(self, app, nivel=6, nivel_brotli=5, minimo=1024):
+        self.app = app
+        self.nivel = nivel
+        self.nivel_brotli = nivel_brotli
+        self.minimo = minimo
+
+    def _codificacion(self, environ):
+        if environ.get('REQUEST_METHOD') == 'HEAD' or environ.get('HTTP_RANGE'):
+            return None
+        aceptadas = _aceptadas(environ.get('HTTP_ACCEPT_ENCODING'))
+        if brotli is not None and 'br' in aceptadas:
+            return 'br'
+        if 'gzip' in aceptadas:
+            return 'gzip'
+        return None
+
+    def _elegible(self, status, headers):
+        """Si el tipo de respuesta admite compresion (independiente del cliente)."""
+        if status[:3] in ('204', '206', '304') or int(status[:3]) < 200:
+            return False
+        nombres = {k.lower(): v for k, v in headers}
+        if 'content-encoding' in nombres:
+            return False
+        tipo = nombres.get('content-type', '').split(';')[0].strip().lower()
+        return tipo in TIPOS_COMPRIMIBLES
+
+    def _supera_minimo(self, headers):
+        largo = next((v for k, v in headers if k.lower() == 'content-length'), None)
+        return largo is None or int(largo) >= self.minimo
+
+    def __call__(self, environ, start_response):
+        codificacion = self._codificacion(environ)
+        estado = {}
+
+        def _start_response(status, headers, exc_info=None):
+            estado['status'], estado['headers'], estado['exc_info'] = status, headers, exc_info
+            elegible = self._elegible(status, headers)
+            estado['comprimir'] = bool(codificacion) and elegible and self._supera_minimo(headers)
+            if not estado['comprimir']:
+                return start_response(status, _con_vary(headers) if elegible else headers, exc_info)
+            # Las respuestas comprimidas llaman a start_response al tener el cuerpo
+            return estado.setdefault('escritos', []).append
+
+        app_iter = self.app(environ, _start_response)
+        if 'comprimir' not in estado:
+            # Una aplicacion generadora llama a start_response al iterar
+            # (PEP 3333): se decide despues de su primer fragmento
+            app_iter = _Reanudado(app_iter)
+        if not estado.get('comprimir'):
+            return app_iter
+
+        # El cuerpo cambia de bytes: un ETag fuerte pasa a debil (como nginx),
+        # asi If-None-Match sigue coincidiendo con la comparacion debil
+        headers = [(k, v if k.lower() != 'etag' or v.startswith('W/') else f'W/{v}')
+                   for k, v in estado['headers'] if k.lower() != 'content-length']
+        headers = _con_vary(headers) + [('Content-Encoding', codificacion)]
+        compresor = _Compresor(codificacion, self.nivel, self.nivel_brotli)
+
+        if any(k.lower() == 'content-length' for k, _ in estado['headers']):
+            try:
+                cuerpo = b''.join(estado.get('escritos', [])) + b''.join(app_iter)
+            finally:
+                if hasattr(app_iter, 'close'):
+                    app_iter.close()
+            datos = compresor.comprimir(cuerpo) + compresor.terminar()
+            headers.append(('Content-Length', str(len(datos))))
+            start_response(estado['status'], headers, estado['exc_info'])
+            return [datos]
+
+        start_response(estado['status'], headers, estado['exc_info'])
+        return _flujo_comprimido(app_iter, compresor, estado.get('escritos', []))
+
+
+def _con_vary(headers):
+    """Agrega Accept-Encoding a Vary (las respuestas dependen de la negociacion)."""
+    for i, (k, v) in enumerate(headers):
+        if k.lower() == 'vary':
+            if 'accept-encoding' not in v.lower():
+                headers = list(headers)
+                headers[i] = (k, f'{v}, Accept-Encoding')
+            return headers
+    return list(headers) + [('Vary', 'Accept-Encoding')]
+
+
+class _Reanudado:
+    """Iterable WSGI que ya leyo el primer fragmento de `app_iter` y lo
+    entrega antes que el resto; close() cierra el original."""
+
+    def __init__(self, app_iter):
+        self._original = app_iter
+        self._iterador = iter(app_iter)
+        try:
+            self._primero = [next(self._iterador)]
+        except StopIteration:
+            self._primero = []
+        except BaseException:
+            self.close()
+            raise
+
+    def __iter__(self):
+        yield from self._primero
+        yield from self._iterador
+
+    def close(self):
+        if hasattr(self._original, 'close'):
+            self._original.close()
+
+
+def _flujo_comprimido(app_iter, compresor, escritos):
+    """Comprime un cuerpo en streaming: cada fragmento sale apenas se produce."""
+    try:
+        for fragmento in escritos:
+            yield compresor.comprimir(fragmento, flush=True)
+        for fragmento in app_iter:
+            if fragmento:
+                yield compresor.comprimir(fragmento, flush=True)
+        yield compresor.terminar()
+    finally:
+        if hasattr(app_iter, 'close'):
+            app_iter.close()
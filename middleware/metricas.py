@@ -0,0 +1,197 @@
+"""
+middleware/metricas.py
+Metricas de solicitudes en memoria del proceso, servidas en formato de texto
+de Prometheus en /metrics:
+
+- latencia por ruta (endpoint), metodo y clase de estado (histograma)
+- consultas, tiempo en SQLite y filas leidas por solicitud, medidos por la
+  conexion de get_db (models/instrumentacion.py)
+- espera por el bloqueo de escritura de la sesion, reintentos y turnos
+  vencidos (503) por ruta (models/escritura.py)
+- aciertos, fallos e invalidaciones del cache compartido (services/cache.py),
+  sumados entre todos los procesos
+
+Cada respuesta lleva ademas un header Server-Timing (app y db) para verlo en
+las herramientas del navegador. /metrics exige config.ADMIN_TOKEN (header
+Authorization: Bearer o ?token=); sin token configurado solo responde a
+solicitudes locales.
+"""
+import hmac
+import sqlite3
+import threading
+from time import perf_counter
+
+from flask import g, request, Response, abort
+
+import config
+from models.instrumentacion import iniciar_medicion, terminar_medicion
+from services import cache
+
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_CONSULTAS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+_LOCALES = ('127.0.0.1', '::1')
+
+
+class Histograma:
+    """Histograma acumulativo al estilo Prometheus, por combinacion de etiquetas."""
+
+    def __init__(self, nombre, ayuda, buckets):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.buckets = buckets
+        self._series = {}
+
+    def observar(self, etiquetas, valor):
+        serie = self._series.get(etiquetas)
+        if serie is None:
+            serie = self._series[etiquetas] = [[0] * len(self.buckets), 0.0, 0]
+        for i, limite in enumerate(self.buckets):
+            if valor <= limite:
+                serie[0][i] += 1
+        serie[1] += valor
+        serie[2] += 1
+
+    def exponer(self):
+        lineas = [f'# HELP {self.nombre} {self.ayuda}', f'# TYPE {self.nombre} histogram']
+        for etiquetas, (cuentas, suma, total) in sorted(self._series.items()):
+            base = _etiquetas(etiquetas)
+            for limite, cuenta in zip(self.buckets, cuentas):
+                lineas.append(f'{self.nombre}_bucket{{{base},le="{limite}"}} {cuenta}')
+            lineas.append(f'{self.nombre}_bucket{{{base},le="+Inf"}} {total}')
+            lineas.append(f'{self.nombre}_sum{{{base}}} {suma:.6f}')
+            lineas.append(f'{self.nombre}_count{{{base}}} {total}')
+        return lineas
+
+
+class Contador:
+    """Contador monotono por combinacion de etiquetas."""
+
+    def __init__(self, nombre, ayuda):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self._series = {}
+
+    def sumar(self, etiquetas, valor=1):
+        self._series[etiquetas] = self._series.get(etiquetas, 0) + valor
+
+    def exponer(self):
+        lineas = [f'# HELP {self.nombre} {self.ayuda}', f'# TYPE {self.nombre} counter']
+        lineas += [f'{self.nombre}{{{_etiquetas(e)}}} {v}' for e, v in sorted(self._series.items())]
+        return lineas
+
+
+def _etiquetas(pares):
+    return ','.join(f'{k}="{_escapar(v)}"' for k, v in pares)
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+_lock = threading.Lock()
+
+LATENCIA = Histograma('capre_http_request_duration_seconds',
+                      'Latencia de solicitudes por ruta', BUCKETS_LATENCIA)
+SQLITE_SEGUNDOS = Histograma('capre_sqlite_request_seconds',
+                             'Tiempo en SQLite por solicitud', BUCKETS_LATENCIA)
+SQLITE_CONSULTAS = Histograma('capre_sqlite_request_queries',
+                              'Consultas SQLite por solicitud', BUCKETS_CONSULTAS)
+SQLITE_FILAS = Contador('capre_sqlite_rows_total', 'Filas leidas de SQLite')
+ESPERA_ESCRITURA = Histograma('capre_sqlite_lock_wait_seconds',
+                              'Espera por el bloqueo de escritura por solicitud', BUCKETS_LATENCIA)
+REINTENTOS_ESCRITURA = Contador('capre_sqlite_lock_retries_total',
+                                'Reintentos de BEGIN IMMEDIATE con la sesion ocupada')
+ESCRITURAS_AGOTADAS = Contador('capre_sqlite_lock_timeouts_total',
+                               'Escrituras que no obtuvieron el bloqueo a tiempo')
+
+METRICAS = (LATENCIA, SQLITE_SEGUNDOS, SQLITE_CONSULTAS, SQLITE_FILAS,
+            ESPERA_ESCRITURA, REINTENTOS_ESCRITURA, ESCRITURAS_AGOTADAS)
+
+
+def registrar_solicitud(ruta, metodo, estado, segundos, medicion):
+    """Acumula una solicitud terminada en las metricas del proceso."""
+    etiquetas = (('endpoint', ruta), ('method', metodo), ('status', f'{estado // 100}xx'))
+    por_ruta = (('endpoint', ruta),)
+    with _lock:
+        LATENCIA.observar(etiquetas, segundos)
+        if medicion is not None:
+            SQLITE_SEGUNDOS.observar(por_ruta, medicion.segundos)
+            SQLITE_CONSULTAS.observar(por_ruta, medicion.consultas)
+            SQLITE_FILAS.sumar(por_ruta, medicion.filas)
+            if medicion.escrituras:
+                ESPERA_ESCRITURA.observar(por_ruta, medicion.espera_escritura)
+                REINTENTOS_ESCRITURA.sumar(por_ruta, medicion.reintentos)
+                ESCRITURAS_AGOTADAS.sumar(por_ruta, medicion.agotadas)
+
+
+def _metricas_cache():
+    """Contadores del cache compartido; se leen de su base en cada consulta."""
+    if not config.CACHE_ACTIVO:
+        return []
+    try:
+        filas = cache.estadisticas()
+    except sqlite3.Error:
+        return []
+    lineas = ['# HELP capre_cache_total Consultas al cache compartido por resultado',
+              '# TYPE capre_cache_total counter']
+    for fila in filas:
+        for resultado in ('aciertos', 'fallos', 'invalidados'):
+            etiquetas = _etiquetas((('espacio', fila['espacio']), ('resultado', resultado)))
+            lineas.append(f'capre_cache_total{{{etiquetas}}} {fila[resultado]}')
+    lineas += ['# HELP capre_cache_entradas Entradas guardadas en el cache compartido',
+               '# TYPE capre_cache_entradas gauge']
+    lineas += [f'capre_cache_entradas{{{_etiquetas((("espacio", fila["espacio"]),))}}} {fila["entradas"]}'
+               for fila in filas]
+    return lineas
+
+
+def exponer_metricas():
+    with _lock:
+        lineas = [linea for metrica in METRICAS for linea in metrica.exponer()]
+    lineas += _metricas_cache()
+    return '\n'.join(lineas) + '\n'
+
+
+def acceso_permitido():
+    """Token de administracion, o solicitud local si no hay token configurado."""
+    if not config.ADMIN_TOKEN:
+        # Detras de un proxy remote_addr es local: exigir que no venga reenviada
+        return request.remote_addr in _LOCALES and 'X-Forwarded-For' not in request.headers
+    autorizacion = request.headers.get('Authorization', '')
+    token = autorizacion[7:] if autorizacion.startswith('Bearer ') else request.args.get('token', '')
+    return hmac.compare_digest(token.encode(), config.ADMIN_TOKEN.encode())
+
+
+def instalar_metricas(app):
+    """Registra la medicion por solicitud, Server-Timing y la ruta /metrics."""
+
+    @app.before_request
+    def _iniciar_medicion():
+        g.metricas_inicio = perf_counter()
+        g.metricas_sqlite = iniciar_medicion(request.endpoint)
+
+    @app.after_request
+    def _server_timing(response):
+        inicio = g.pop('metricas_inicio', None)
+        medicion = g.pop('metricas_sqlite', None)
+        terminar_medicion()
+        if inicio is None:
+            return response
+        segundos = perf_counter() - inicio
+        registrar_solicitud(request.endpoint or 'sin_ruta', request.method,
+                            response.status_code, segundos, medicion)
+        timing = [f'app;dur={segundos * 1000:.1f}']
+        if medicion is not None:
+            timing.append(f'db;dur={medicion.segundos * 1000:.1f};desc="{medicion.consultas} consultas"')
+            if medicion.escrituras:
+                timing.append(f'lock;dur={medicion.espera_escritura * 1000:.1f};'
+                              f'desc="{medicion.reintentos} reintentos"')
+        response.headers.add('Server-Timing', ', '.join(timing))
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        if not acceso_permitido():
+            abort(404)
+        return Response(exponer_metricas(), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,180 @@
+"""
+middleware/perfilador.py
+Perfilado bajo demanda de una solicitud con cProfile. Se activa con el header
+X-Perfil: 1 o el parametro ?_perfil=1, solo con acceso de administracion
+(mismas reglas que /metrics). Cada perfil queda en
+DATA_FOLDER/perfiles/<endpoint>/<sesion>/<marca>.{prof,collapsed,json}:
+
+- .prof: estadisticas de pstats (snakeviz, python -m pstats)
+- .collapsed: pilas colapsadas "a;b;c microsegundos" para flamegraph.pl o
+  speedscope, reconstruidas desde el grafo de llamadas de pstats
+- .json: metadatos (ruta, metodo, estado, duracion)
+
+/perfiles lista los perfiles recientes.
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+from datetime import datetime
+from time import perf_counter
+
+from flask import g, request, session, abort, render_template, send_from_directory, Response
+
+import config
+from middleware.metricas import acceso_permitido
+
+PROFUNDIDAD_MAXIMA = 64
+FRACCION_MINIMA = 0.001
+_RE_NOMBRE = re.compile(r'[^\w.-]')
+
+
+def carpeta_perfiles():
+    return os.path.join(config.DATA_FOLDER, 'perfiles')
+
+
+def _solicitado():
+    return request.headers.get('X-Perfil') == '1' or request.args.get('_perfil') == '1'
+
+
+def _nombre_funcion(func):
+    archivo, linea, nombre = func
+    if archivo == '~':
+        return nombre  # funciones built-in: '<built-in method ...>'
+    return f'{nombre} ({os.path.basename(archivo)}:{linea})'
+
+
+def pilas_colapsadas(stats):
+    """
+    Pilas colapsadas desde pstats. pstats solo guarda llamador -> llamado, asi
+    que el tiempo propio de cada funcion se reparte entre sus caminos en
+    proporcion al tiempo acumulado que aporta cada llamador. Los caminos con
+    menos de FRACCION_MINIMA del tiempo total se descartan (acotan la
+    cantidad de caminos, que crece de forma exponencial con la profundidad).
+    Retorna {"a;b;c": microsegundos}.
+    """
+    llamados = {}
+    raices = []
+    for func, (_, _, _, _, llamadores) in stats.items():
+        if not llamadores:
+            raices.append(func)
+        for llamador, datos in llamadores.items():
+            llamados.setdefault(llamador, []).append((func, datos[3]))
+
+    pilas = {}
+    umbral = max(sum(stats[r][3] for r in raices) * FRACCION_MINIMA, 1e-6)
+
+    def recorrer(func, camino, tiempo):
+        _, _, propio, acumulado, _ = stats[func]
+        if tiempo < umbral or acumulado <= 0 or len(camino) >= PROFUNDIDAD_MAXIMA:
+            return
+        camino = camino + [func]
+        fraccion = tiempo / acumulado
+        clave = ';'.join(_nombre_funcion(f) for f in camino)
+        pilas[clave] = pilas.get(clave, 0) + propio * fraccion * 1e6
+        for hijo, tiempo_hijo in llamados.get(func, ()):
+            if hijo not in camino:
+                recorrer(hijo, camino, tiempo_hijo * fraccion)
+
+    for raiz in raices:
+        recorrer(raiz, [], stats[raiz][3])
+    return pilas
+
+
+def _guardar(perfil, segundos, estado):
+    ruta = _RE_NOMBRE.sub('_', request.endpoint or 'sin_ruta')
+    sesion = _RE_NOMBRE.sub('_', session.get('active_session_id') or 'sin_sesion')
+    carpeta = os.path.join(carpeta_perfiles(), ruta, sesion)
+    os.makedirs(carpeta, exist_ok=True)
+    marca = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+    base = os.path.join(carpeta, marca)
+
+    perfil.dump_stats(f'{base}.prof')
+    stats = pstats.Stats(perfil).stats
+    with open(f'{base}.collapsed', 'w', encoding='utf-8') as f:
+        for pila, micros in sorted(pilas_colapsadas(stats).items()):
+            if micros >= 1:
+                f.write(f'{pila} {int(micros)}\n')
+    with open(f'{base}.json', 'w', encoding='utf-8') as f:
+        json.dump({
+            'ruta': request.endpoint, 'sesion': session.get('active_session_id'),
+            'metodo': request.method, 'url': request.full_path.rstrip('?'),
+            'estado': estado, 'ms': round(segundos * 1000, 1), 'fecha': marca,
+        }, f, ensure_ascii=False)
+    _podar()
+
+
+def _podar():
+    """Conserva solo los config.PERFILES_MAXIMO perfiles mas recientes."""
+    perfiles = listar_perfiles()
+    for p in perfiles[config.PERFILES_MAXIMO:]:
+        for extension in ('.prof', '.collapsed', '.json'):
+            try:
+                os.remove(os.path.join(carpeta_perfiles(), p['base'] + extension))
+            except OSError:
+                pass
+
+
+def listar_perfiles():
+    """Metadatos de los perfiles guardados, del mas reciente al mas antiguo."""
+    raiz = carpeta_perfiles()
+    perfiles = []
+    for carpeta, _, archivos in os.walk(raiz):
+        for archivo in archivos:
+            if not archivo.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(carpeta, archivo), encoding='utf-8') as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                continue
+            meta['base'] = os.path.relpath(os.path.join(carpeta, archivo[:-5]), raiz).replace(os.sep, '/')
+            perfiles.append(meta)
+    perfiles.sort(key=lambda p: p.get('fecha', ''), reverse=True)
+    return perfiles
+
+
+def instalar_perfilador(app):
+    """Registra el perfilado opcional de solicitudes y las rutas /perfiles."""
+
+    @app.before_request
+    def _iniciar_perfil():
+        if _solicitado() and acceso_permitido():
+            g.perfil = cProfile.Profile()
+            g.perfil_inicio = perf_counter()
+            g.perfil.enable()
+
+    @app.after_request
+    def _terminar_perfil(response):
+        perfil = g.pop('perfil', None)
+        if perfil is not None:
+            perfil.disable()
+            _guardar(perfil, perf_counter() - g.pop('perfil_inicio'), response.status_code)
+        return response
+
+    @app.route('/perfiles')
+    def perfiles():
+        if not acceso_permitido():
+            abort(404)
+        return render_template('perfiles.html', perfiles=listar_perfiles()[:100],
+                               token=request.args.get('token', ''))
+
+    @app.route('/perfiles/ver/<path:base>')
+    def perfil_ver(base):
+        """Funciones con mas tiempo acumulado del perfil, como texto."""
+        if not acceso_permitido():
+            abort(404)
+        ruta = os.path.realpath(os.path.join(carpeta_perfiles(), f'{base}.prof'))
+        if not ruta.startswith(os.path.realpath(carpeta_perfiles()) + os.sep) or not os.path.exists(ruta):
+            abort(404)
+        salida = io.StringIO()
+        pstats.Stats(ruta, stream=salida).sort_stats('cumulative').print_stats(40)
+        return Response(salida.getvalue(), mimetype='text/plain')
+
+    @app.route('/perfiles/archivo/<path:nombre>')
+    def perfil_archivo(nombre):
+        if not acceso_permitido() or not nombre.endswith(('.prof', '.collapsed', '.json')):
+            abort(404)
+        return send_from_directory(carpeta_perfiles(), nombre, as_attachment=True)
@@ -1,7 +1,10 @@
 import os
+import json
 import sqlite3
 import logging
+from urllib.request import pathname2url
 import config
+from models.escritura import ConexionEscritura
 
 logger = logging.getLogger(__name__)
 
@@ -94,6 +97,343 @@ CREATE INDEX IF NOT EXISTS idx_tabla3_fecser ON tabla3(fecser);
 CREATE INDEX IF NOT EXISTS idx_tabla3_fecparto ON tabla3(fecparto);
 """
 
+# Bitacora append-only de novedades (ver services/bitacora.py).
+# AUTOINCREMENT garantiza que seq nunca se reutiliza despues de compactar,
+# asi los consumidores pueden guardar el ultimo seq leido como cursor.
+BITACORA_SQL = """
+CREATE TABLE IF NOT EXISTS bitacora (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    animal_id INTEGER NOT NULL,
+    evento TEXT NOT NULL,
+    accion TEXT NOT NULL,
+    valores TEXT,
+    device_id TEXT,
+    ts TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now'))
+);
+
+CREATE INDEX IF NOT EXISTS idx_bitacora_animal_evento ON bitacora(animal_id, evento, seq);
+"""
+
+# Version de los datos de la sesion (ver services/sync.py): sync_version es
+# un contador global que sube con cada fila insertada, modificada o
+# eliminada en tabla1/2/3.
+def _sync_triggers(tabla):
+    return f"""
+CREATE TRIGGER IF NOT EXISTS trg_sync_{tabla}_ins AFTER INSERT ON {tabla} BEGIN
+    UPDATE sync_version SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_sync_{tabla}_upd AFTER UPDATE ON {tabla} BEGIN
+    UPDATE sync_version SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_sync_{tabla}_del AFTER DELETE ON {tabla} BEGIN
+    UPDATE sync_version SET version = version + 1 WHERE id = 1;
+END;
+"""
+
+
+SYNC_SQL = """
+CREATE TABLE IF NOT EXISTS sync_version (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    version INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO sync_version (id, version) VALUES (1, 0);
+""" + ''.join(_sync_triggers(t) for t in ('tabla1', 'tabla2', 'tabla3'))
+
+# Indice de texto completo para la busqueda de animales (ver services/busqueda.py).
+# rowid = id para tabla2 y -id para tabla3, asi los triggers actualizan una
+# sola fila del indice sin recorrerlo.
+def _fts_triggers(tabla, signo):
+    nuevo, viejo = f'{signo}NEW.id', f'{signo}OLD.id'
+    return f"""
+CREATE TRIGGER IF NOT EXISTS trg_fts_{tabla}_ins AFTER INSERT ON {tabla} BEGIN
+    INSERT INTO animales_fts (rowid, nombre, orejera, codint, registro)
+    VALUES ({nuevo}, NEW.nombre, NEW.orejera, NEW.codint, NEW.registro);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_fts_{tabla}_upd AFTER UPDATE OF nombre, orejera, codint, registro ON {tabla} BEGIN
+    DELETE FROM animales_fts WHERE rowid = {viejo};
+    INSERT INTO animales_fts (rowid, nombre, orejera, codint, registro)
+    VALUES ({nuevo}, NEW.nombre, NEW.orejera, NEW.codint, NEW.registro);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_fts_{tabla}_del AFTER DELETE ON {tabla} BEGIN
+    DELETE FROM animales_fts WHERE rowid = {viejo};
+END;
+"""
+
+
+BUSQUEDA_SQL = """
+CREATE VIRTUAL TABLE IF NOT EXISTS animales_fts USING fts5(
+    nombre, orejera, codint, registro,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+
+DELETE FROM animales_fts;
+INSERT INTO animales_fts (rowid, nombre, orejera, codint, registro)
+    SELECT id, nombre, orejera, codint, registro FROM tabla2;
+INSERT INTO animales_fts (rowid, nombre, orejera, codint, registro)
+    SELECT -id, nombre, orejera, codint, registro FROM tabla3;
+""" + _fts_triggers('tabla2', '') + _fts_triggers('tabla3', '-')
+
+# Listado de novillas (estado='0') de tabla2 y tabla3 mantenido por triggers
+# (ver services/novillas.py), en el orden de navegacion (nombre, tabla,
+# fila_id) de idx_roster_novillas_nombre. La posicion no se guarda: se
+# calcula al leer, asi cada alta o baja toca una sola fila y no renumera las
+# siguientes. t2_id es la fila de tabla2 de la que se leen servicio y parto:
+# la misma fila para tabla2, la primera de igual codint para tabla3.
+def _roster_triggers(tabla):
+    if tabla == 'tabla2':
+        t2_new = 'NEW.id'
+    else:
+        t2_new = '(SELECT MIN(id) FROM tabla2 WHERE codint = NEW.codint)'
+    entrada = f"""
+    INSERT INTO roster_novillas (tabla, fila_id, codint, orejera, nombre, t2_id)
+    SELECT '{tabla}', NEW.id, NEW.codint, NEW.orejera, COALESCE(NEW.nombre, ''), {t2_new}
+    WHERE NEW.estado = '0';"""
+    salida = f"""
+    DELETE FROM roster_novillas WHERE tabla = '{tabla}' AND fila_id = OLD.id;"""
+    return f"""
+CREATE TRIGGER IF NOT EXISTS trg_roster_{tabla}_ins AFTER INSERT ON {tabla}
+WHEN NEW.estado = '0' BEGIN{entrada}
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_roster_{tabla}_del AFTER DELETE ON {tabla}
+WHEN OLD.estado = '0' BEGIN{salida}
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_roster_{tabla}_upd AFTER UPDATE OF estado, nombre, codint, orejera ON {tabla}
+WHEN OLD.estado = '0' OR NEW.estado = '0' BEGIN{salida}{entrada}
+END;
+"""
+
+
+# Calculo completo del listado (backfill y cargas masivas de tabla2 y tabla3)
+_ROSTER_RECALCULO = """
+DELETE FROM roster_novillas;
+INSERT INTO roster_novillas (tabla, fila_id, codint, orejera, nombre, t2_id)
+SELECT 'tabla2', id, codint, orejera, COALESCE(nombre, ''), id
+FROM tabla2 WHERE estado = '0'
+UNION ALL
+SELECT 'tabla3', id, codint, orejera, COALESCE(nombre, ''),
+       (SELECT MIN(t2.id) FROM tabla2 t2 WHERE t2.codint = tabla3.codint)
+FROM tabla3 WHERE estado = '0';
+"""
+
+ROSTER_NOVILLAS_SQL = """
+CREATE TABLE IF NOT EXISTS roster_novillas (
+    tabla TEXT NOT NULL,
+    fila_id INTEGER NOT NULL,
+    codint TEXT,
+    orejera TEXT,
+    nombre TEXT NOT NULL,
+    t2_id INTEGER,
+    PRIMARY KEY (tabla, fila_id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_roster_novillas_nombre ON roster_novillas(nombre);
+CREATE INDEX IF NOT EXISTS idx_roster_novillas_codint ON roster_novillas(codint);
+
+""" + _ROSTER_RECALCULO + """
+-- Copia de una novilla de tabla3 a tabla2 (novillas_servicio): enlazar t2_id
+CREATE TRIGGER IF NOT EXISTS trg_roster_t2_link_ins AFTER INSERT ON tabla2 BEGIN
+    UPDATE roster_novillas SET t2_id = NEW.id
+    WHERE tabla = 'tabla3' AND codint = NEW.codint AND (t2_id IS NULL OR t2_id > NEW.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_roster_t2_link_del AFTER DELETE ON tabla2 BEGIN
+    UPDATE roster_novillas SET t2_id = (SELECT MIN(id) FROM tabla2 WHERE codint = OLD.codint)
+    WHERE tabla = 'tabla3' AND t2_id = OLD.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_roster_t2_link_upd AFTER UPDATE OF codint ON tabla2 BEGIN
+    UPDATE roster_novillas SET t2_id = (SELECT MIN(id) FROM tabla2 WHERE codint = roster_novillas.codint)
+    WHERE tabla = 'tabla3' AND codint IN (OLD.codint, NEW.codint);
+END;
+""" + _roster_triggers('tabla2') + _roster_triggers('tabla3')
+
+# Cohorte "en produccion" de ordenos_grupal/validar_exportacion (ver
+# services/produccion.py): columna generada en_produccion (la suman los
+# indicadores, ver _INDICADORES) e indices parciales que cubren la consulta de
+# ordeños en cada orden (nombre u orejera numerica; DESC recorre el mismo
+# indice al reves).
+# Las consultas filtran y ordenan por las expresiones y no por columnas
+# generadas: SQLite no usa un indice como cubriente cuando la consulta lee una
+# columna generada VIRTUAL, y las columnas no pueden ser STORED via ALTER TABLE.
+# El + de +fecsale evita que el planificador prefiera idx_tabla2_fecsale (y
+# luego ordene con un B-tree temporal) en bases sin estadisticas.
+EN_PRODUCCION = """(estado IN ('1', '2') OR fecparto IS NOT NULL)
+          AND +fecsale IS NULL
+          AND (fecseca IS NULL OR (fecparto IS NOT NULL AND fecparto > fecseca))"""
+
+OREJERA_NUM = 'CAST(orejera AS INTEGER)'
+
+_COLUMNAS_ORDENOS = ('codint, orejera, estado, fecest, fecparto, dialec, ultlec, ord1, ord2, ord3,'
+                     ' fecsale, fecseca')
+
+PRODUCCION_SQL = f"""
+ALTER TABLE tabla2 ADD COLUMN en_produccion INTEGER GENERATED ALWAYS AS (
+    CASE WHEN {EN_PRODUCCION} THEN 1 ELSE 0 END
+) VIRTUAL;
+
+CREATE INDEX IF NOT EXISTS idx_produccion_nombre
+    ON tabla2(nombre, {_COLUMNAS_ORDENOS})
+    WHERE {EN_PRODUCCION};
+CREATE INDEX IF NOT EXISTS idx_produccion_orejera
+    ON tabla2({OREJERA_NUM}, nombre, {_COLUMNAS_ORDENOS})
+    WHERE {EN_PRODUCCION};
+"""
+
+# Indicadores del hato (ver services/indicadores.py), mantenidos por triggers
+# sobre tabla2: cada fila suma a indicadores_hato el valor de cada par
+# (clave, valor) de _INDICADORES; un UPDATE resta la fila vieja y suma la nueva.
+# "Sin servicio" depende de la fecha de referencia, asi que se guarda como
+# histograma por fecha limite (parto + DIAS_MIN_SERVICIO) y se suma al leer.
+_ORDENO_TOTAL = 'COALESCE({r}.ord1, 0) + COALESCE({r}.ord2, 0) + COALESCE({r}.ord3, 0)'
+
+_INDICADORES = (
+    ("'animales'", '1'),
+    ("'salidas'", '{r}.fecsale IS NOT NULL'),
+    ("'produccion'", '{r}.en_produccion'),
+    ("'estado:' || COALESCE({r}.estado, '')", '{r}.fecsale IS NULL'),
+    ("'pac:' || UPPER(TRIM(COALESCE({r}.pac, '')))", '{r}.fecsale IS NULL'),
+    ("'ordenos'", _ORDENO_TOTAL),
+    ("'con_ordeno'", f'({_ORDENO_TOTAL}) > 0'),
+)
+
+_SIN_SERVICIO = """{r}.fecsale IS NULL AND {r}.estado IN ('1', '2')
+        AND UPPER(TRIM(COALESCE({r}.pac, ''))) <> 'P'
+        AND {r}.fecser IS NULL
+        AND date(COALESCE({r}.fecparto, {r}.fecest)) IS NOT NULL
+        AND ({r}.fecultser IS NULL OR {r}.fecultser < COALESCE({r}.fecparto, {r}.fecest))"""
+
+_FECHA_LIMITE_SERVICIO = ("date(COALESCE({r}.fecparto, {r}.fecest), "
+                          f"'+{int(config.DIAS_MIN_SERVICIO)} days')")
+
+# Calculo completo desde tabla2 (backfill y comprobacion de consistencia)
+INDICADORES_CALCULO_SQL = f"""
+SELECT clave, SUM(valor) AS valor FROM (
+    {' UNION ALL '.join(f'SELECT {c} AS clave, {v} AS valor FROM tabla2 AS t'.format(r='t')
+                        for c, v in _INDICADORES)}
+) GROUP BY clave
+"""
+
+SIN_SERVICIO_CALCULO_SQL = f"""
+SELECT {_FECHA_LIMITE_SERVICIO.format(r='t')} AS fecha_limite, COUNT(*) AS animales
+FROM tabla2 AS t
+WHERE {_SIN_SERVICIO.format(r='t')}
+GROUP BY 1
+"""
+
+
+def _indicadores_delta(r, signo):
+    sentencias = [f"""
+    INSERT INTO indicadores_hato (clave, valor) VALUES ({c}, {signo}({v}))
+    ON CONFLICT(clave) DO UPDATE SET valor = valor + excluded.valor;""".format(r=r)
+                  for c, v in _INDICADORES]
+    sentencias.append(f"""
+    INSERT INTO indicadores_sin_servicio (fecha_limite, animales)
+    SELECT {_FECHA_LIMITE_SERVICIO}, {signo}1 WHERE {_SIN_SERVICIO}
+    ON CONFLICT(fecha_limite) DO UPDATE SET animales = animales + excluded.animales;""".format(r=r))
+    return ''.join(sentencias)
+
+
+INDICADORES_SQL = f"""
+CREATE TABLE IF NOT EXISTS indicadores_hato (
+    clave TEXT PRIMARY KEY,
+    valor REAL NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS indicadores_sin_servicio (
+    fecha_limite TEXT PRIMARY KEY,
+    animales INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+
+DELETE FROM indicadores_hato;
+INSERT INTO indicadores_hato (clave, valor) {INDICADORES_CALCULO_SQL};
+DELETE FROM indicadores_sin_servicio;
+INSERT INTO indicadores_sin_servicio (fecha_limite, animales) {SIN_SERVICIO_CALCULO_SQL};
+
+CREATE TRIGGER IF NOT EXISTS trg_indicadores_ins AFTER INSERT ON tabla2 BEGIN{_indicadores_delta('NEW', '+')}
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_indicadores_del AFTER DELETE ON tabla2 BEGIN{_indicadores_delta('OLD', '-')}
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_indicadores_upd
+AFTER UPDATE OF estado, fecest, pac, fecser, fecultser, fecparto, fecseca, fecsale, ord1, ord2, ord3 ON tabla2
+BEGIN{_indicadores_delta('OLD', '-')}{_indicadores_delta('NEW', '+')}
+END;
+"""
+
+# tabla3 (hembras de reemplazo del DBF) se importa y luego solo se lee; las
+# novedades de sus novillas se guardan en su copia de tabla2. Se reconstruye
+# sin AUTOINCREMENT (cada insercion actualizaba sqlite_sequence) y con dos
+# indices en lugar de cinco: codint y uno parcial por nombre de las novillas
+# (estado='0'), en el orden del listado de roster_novillas. Conserva id como rowid y todas las
+# columnas: busqueda, sync y roster usan id, y la exportacion DBF las escribe.
+# DROP TABLE elimina sus triggers, que se vuelven a crear.
+TABLA3_TRIGGERS_SQL = _sync_triggers('tabla3') + _fts_triggers('tabla3', '-') + _roster_triggers('tabla3')
+
+TABLA3_COMPACTA_SQL = f"""
+CREATE TABLE tabla3_compacta (
+    {TABLA2_COLUMNS.replace(' AUTOINCREMENT', '')}
+);
+INSERT INTO tabla3_compacta SELECT * FROM tabla3;
+DROP TABLE tabla3;
+ALTER TABLE tabla3_compacta RENAME TO tabla3;
+DELETE FROM sqlite_sequence WHERE name = 'tabla3';
+
+CREATE INDEX IF NOT EXISTS idx_tabla3_codint ON tabla3(codint);
+CREATE INDEX IF NOT EXISTS idx_tabla3_novillas ON tabla3(nombre) WHERE estado = '0';
+""" + TABLA3_TRIGGERS_SQL
+
+# Carga masiva de tabla3 (importacion DBF): sin los triggers por fila (sync,
+# busqueda y listado de novillas) y con el estado derivado reconstruido en
+# bloque al final (una sola version de sync).
+TABLA3_DERIVADOS_SQL = """
+UPDATE sync_version SET version = version + 1 WHERE id = 1;
+DELETE FROM animales_fts WHERE rowid < 0;
+INSERT INTO animales_fts (rowid, nombre, orejera, codint, registro)
+    SELECT -id, nombre, orejera, codint, registro FROM tabla3;
+""" + _ROSTER_RECALCULO
+
+# El listado de novillas guardaba su posicion y cada alta o baja renumeraba
+# las filas siguientes: se recrea sin ella (tabla, indice, triggers y datos)
+ROSTER_SIN_POSICION_SQL = ''.join(
+    f'DROP TRIGGER IF EXISTS trg_roster_{tabla}_{evento};\n'
+    for tabla in ('tabla2', 'tabla3') for evento in ('ins', 'del', 'upd')
+) + """
+DROP TABLE IF EXISTS roster_novillas;
+""" + ROSTER_NOVILLAS_SQL
+
+# El registro por fila de sync_cambios solo lo leia /principal/api/changes
+# (espejo IndexedDB, retirado): los triggers quedan con el contador de version
+SYNC_SOLO_VERSION_SQL = ''.join(
+    f'DROP TRIGGER IF EXISTS trg_sync_{tabla}_{evento};\n'
+    for tabla in ('tabla1', 'tabla2', 'tabla3') for evento in ('ins', 'upd', 'del')
+) + """
+DROP TABLE IF EXISTS sync_cambios;
+""" + ''.join(_sync_triggers(t) for t in ('tabla1', 'tabla2', 'tabla3'))
+
+# Migraciones de esquema para bases de sesion existentes: (version, script).
+# Se aplican en orden segun PRAGMA user_version. init_db las ejecuta todas
+# sobre una base nueva, asi SCHEMA_SQL + MIGRACIONES es el esquema completo.
+MIGRACIONES = [
+    (1, BITACORA_SQL),
+    (2, SYNC_SQL),
+    (3, BUSQUEDA_SQL),
+    (4, ROSTER_NOVILLAS_SQL),
+    (5, PRODUCCION_SQL),
+    (6, INDICADORES_SQL),
+    (7, TABLA3_COMPACTA_SQL),
+    (8, ROSTER_SIN_POSICION_SQL),
+    (9, SYNC_SOLO_VERSION_SQL),
+]
+
+SCHEMA_VERSION = MIGRACIONES[-1][0]
+
 # Field names matching the actual .dbf columns
 ANIMAL_FIELDS = [
     'codint', 'orejera', 'nombre', 'registro', 'estado', 'fecest',
@@ -113,31 +453,226 @@ TABLA1_FIELDS = [
 ]
 
 
-def get_db_path(session_id):
+def get_disk_path(session_id):
+    """Copia persistente de la sesion en DATA_FOLDER."""
     return os.path.join(config.DATA_FOLDER, f'session_{session_id}.db')
 
 
+def get_hot_path(session_id):
+    """Copia caliente en SESION_CALIENTE_DIR (None si el modo esta desactivado)."""
+    if not config.SESION_CALIENTE_DIR:
+        return None
+    return os.path.join(config.SESION_CALIENTE_DIR, f'session_{session_id}.db')
+
+
+def get_db_path(session_id):
+    """Ruta desde la que se sirve la sesion: la copia caliente si existe
+    (ver services/caliente.py), si no la de DATA_FOLDER."""
+    caliente = get_hot_path(session_id)
+    if caliente and os.path.exists(caliente):
+        return caliente
+    return get_disk_path(session_id)
+
+
+def _sentencias(script):
+    """Divide un script SQL en sentencias completas (respeta cuerpos de triggers)."""
+    actual = ''
+    for parte in script.split(';'):
+        actual += parte + ';'
+        if sqlite3.complete_statement(actual):
+            if actual.strip(' \t\r\n;'):
+                yield actual.strip()
+            actual = ''
+    if actual.strip(' \t\r\n;'):
+        yield actual.strip().rstrip(';')
+
+
+def _migrar(conn):
+    """Aplica las migraciones pendientes en una sola transaccion.
+
+    Usa BEGIN IMMEDIATE y vuelve a leer user_version dentro del bloqueo para
+    que dos procesos que abren la misma sesion no apliquen dos veces la misma
+    migracion.
+    """
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        version = conn.execute('PRAGMA user_version').fetchone()[0]
+        for numero, script in MIGRACIONES:
+            if numero > version:
+                for sentencia in _sentencias(script):
+                    conn.execute(sentencia)
+        conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def perfil_io(nombre=None):
+    """PRAGMAs de E/S del perfil indicado o de config.PERFIL_IO."""
+    nombre = nombre or config.PERFIL_IO
+    if nombre not in config.PERFILES_IO:
+        raise ValueError(f'Perfil de E/S desconocido: {nombre}')
+    return config.PERFILES_IO[nombre]
+
+
 def get_db(session_id):
     db_path = get_db_path(session_id)
-    conn = sqlite3.connect(db_path, timeout=10)
+    nueva = not os.path.exists(db_path)
+    if nueva and db_path != get_disk_path(session_id):
+        return get_db(session_id)  # la copia caliente se enfrio recien
+    if nueva and os.path.exists(get_archive_path(session_id)):
+        # Sesion archivada: se descomprime antes de abrirla
+        from services.archivo import restaurar_sesion
+        restaurar_sesion(session_id)
+        nueva = False
+    # ConexionEscritura anota tiempo y filas de cada consulta (ver /metrics) y
+    # abre las escrituras por turnos (models/escritura.py). El busy_timeout es
+    # corto: las esperas por escribir las hace ConexionEscritura con reintentos
+    # y las lecturas en WAL no esperan a los escritores.
+    espera = config.ESCRITURA_INTENTO_MS / 1000
+    if nueva:
+        conn = sqlite3.connect(db_path, timeout=espera, factory=ConexionEscritura)
+    else:
+        # mode=rw no vuelve a crear vacia una base que se archivo o enfrio
+        # (services/archivo.py, services/caliente.py) despues de comprobarla
+        try:
+            conn = sqlite3.connect(f'file:{pathname2url(db_path)}?mode=rw', uri=True,
+                                   timeout=espera, factory=ConexionEscritura)
+        except sqlite3.OperationalError:
+            if os.path.exists(db_path):
+                raise
+            return get_db(session_id)
+    conn.db_path = db_path
+    conn.session_id = session_id
+    # Identidad del archivo abierto: ConexionEscritura la compara al escribir
+    estado = os.stat(db_path)
+    conn.archivo = (estado.st_dev, estado.st_ino)
     conn.row_factory = sqlite3.Row
-    # Optimizaciones SQLite para mejor rendimiento
+    perfil = perfil_io()
+    if nueva:
+        # Solo tienen efecto antes de inicializar el archivo (init_db): las
+        # bases nuevas liberan paginas con incremental_vacuum (ver
+        # services/mantenimiento.py) y usan el page_size del perfil
+        conn.execute(f"PRAGMA page_size = {int(perfil['page_size'])}")
+        conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+    # Optimizaciones SQLite para mejor rendimiento (perfil de E/S en config)
     conn.execute('PRAGMA journal_mode = WAL')
     conn.execute('PRAGMA synchronous = NORMAL')
-    conn.execute('PRAGMA cache_size = 10000')
-    conn.execute('PRAGMA temp_store = MEMORY')
+    conn.execute(f"PRAGMA cache_size = {int(perfil['cache_size'])}")
+    conn.execute(f"PRAGMA mmap_size = {int(perfil['mmap_size'])}")
+    conn.execute(f"PRAGMA temp_store = {perfil['temp_store']}")
+    # Sesiones creadas con un esquema anterior se actualizan al abrirlas.
+    # Una base recien creada (sin tabla2) la inicializa init_db.
+    if conn.execute('PRAGMA user_version').fetchone()[0] < SCHEMA_VERSION:
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'tabla2'").fetchone():
+            _migrar(conn)
     return conn
 
 
+def quitar_triggers_tabla3(conn):
+    """Inicio de una carga masiva de tabla3 (ver TABLA3_DERIVADOS_SQL)."""
+    nombres = [r[0] for r in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'tabla3'")]
+    for nombre in nombres:
+        conn.execute(f'DROP TRIGGER {nombre}')
+
+
+def reconstruir_tabla3(conn):
+    """Fin de una carga masiva de tabla3: estado derivado y triggers."""
+    for sentencia in _sentencias(TABLA3_DERIVADOS_SQL + TABLA3_TRIGGERS_SQL):
+        conn.execute(sentencia)
+
+
+def quitar_triggers_roster(conn, tabla):
+    """Inicio de una carga masiva de `tabla` sin los triggers del listado de
+    novillas: el listado se arma al final con un solo INSERT ... SELECT en vez
+    de una insercion por fila. Los de sync y busqueda se conservan."""
+    for evento in ('ins', 'del', 'upd'):
+        conn.execute(f'DROP TRIGGER IF EXISTS trg_roster_{tabla}_{evento}')
+
+
+def reconstruir_roster(conn, tabla):
+    """Fin de una carga masiva de `tabla`: listado completo y triggers."""
+    for sentencia in _sentencias(_ROSTER_RECALCULO + _roster_triggers(tabla)):
+        conn.execute(sentencia)
+
+
+def crear_esquema(conn):
+    """Crea el esquema completo (SCHEMA_SQL + migraciones) en una conexion."""
+    conn.executescript(SCHEMA_SQL)
+    _migrar(conn)
+
+
 def init_db(session_id):
     conn = get_db(session_id)
-    conn.executescript(SCHEMA_SQL)
-    conn.commit()
+    crear_esquema(conn)
     return conn
 
 
+def get_archive_path(session_id):
+    """Copia comprimida de una sesion archivada (ver services/archivo.py)."""
+    return os.path.join(config.DATA_FOLDER, 'archivo', f'session_{session_id}.db.gz')
+
+
+def leer_catalogo(session_id):
+    """Datos de la sesion para el listado; None si no tiene session_meta."""
+    conn = get_db(session_id)
+    try:
+        meta = conn.execute('SELECT * FROM session_meta WHERE id = 1').fetchone()
+        if not meta:
+            return None
+        t2_count = conn.execute('SELECT COUNT(*) FROM tabla2').fetchone()[0]
+        t3_count = conn.execute('SELECT COUNT(*) FROM tabla3').fetchone()[0]
+        # Obtener fechas de tabla1
+        tabla1 = conn.execute('SELECT fecultprb, fecprbact FROM tabla1 LIMIT 1').fetchone()
+    finally:
+        conn.close()
+    # Obtener device_id de la sesion (puede ser None en sesiones antiguas)
+    session_device_id = None
+    try:
+        session_device_id = meta['device_id']
+    except (IndexError, KeyError):
+        pass
+    return {
+        'session_id': session_id,
+        'prefix_code': meta['prefix_code'],
+        'farm_name': meta['farm_name'],
+        'created_at': meta['created_at'],
+        'status': meta['status'],
+        'tabla2_count': t2_count,
+        'tabla3_count': t3_count,
+        'device_id': session_device_id,
+        'fecultprb': tabla1['fecultprb'] if tabla1 and tabla1['fecultprb'] else None,
+        'fecprbact': tabla1['fecprbact'] if tabla1 and tabla1['fecprbact'] else None,
+    }
+
+
+def _catalogos_archivados():
+    """Catalogos guardados junto a las sesiones archivadas, sin descomprimirlas."""
+    carpeta = os.path.dirname(get_archive_path(''))
+    if not os.path.isdir(carpeta):
+        return
+    for filename in os.listdir(carpeta):
+        if filename.startswith('session_') and filename.endswith('.json'):
+            session_id = filename[8:-5]
+            if os.path.exists(get_db_path(session_id)):
+                continue  # restaurada (o restaurandose): se lee la base
+            try:
+                with open(os.path.join(carpeta, filename), encoding='utf-8') as f:
+                    catalogo = json.load(f)['catalogo']
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning('No se pudo leer sesion archivada %s: %s', session_id, e)
+                continue
+            yield {**catalogo, 'archivada': True}
+
+
 def list_sessions(device_id=None):
-    """Lista sesiones, opcionalmente filtradas por device_id"""
+    """Lista sesiones, opcionalmente filtradas por device_id.
+
+    Incluye las archivadas (con 'archivada': True), leidas de su catalogo sin
+    restaurarlas.
+    """
     sessions = []
     if not os.path.exists(config.DATA_FOLDER):
         return sessions
@@ -145,42 +680,16 @@ def list_sessions(device_id=None):
         if filename.startswith('session_') and filename.endswith('.db'):
             session_id = filename[8:-3]
             try:
-                conn = get_db(session_id)
-                meta = conn.execute('SELECT * FROM session_meta WHERE id = 1').fetchone()
-                t2_count = conn.execute('SELECT COUNT(*) FROM tabla2').fetchone()[0]
-                t3_count = conn.execute('SELECT COUNT(*) FROM tabla3').fetchone()[0]
-                # Obtener fechas de tabla1
-                tabla1 = conn.execute('SELECT fecultprb, fecprbact FROM tabla1 LIMIT 1').fetchone()
-                fecultprb = tabla1['fecultprb'] if tabla1 and tabla1['fecultprb'] else None
-                fecprbact = tabla1['fecprbact'] if tabla1 and tabla1['fecprbact'] else None
-                conn.close()
-                if meta:
-                    # Obtener device_id de la sesion (puede ser None en sesiones antiguas)
-                    session_device_id = None
-                    try:
-                        session_device_id = meta['device_id']
-                    except (IndexError, KeyError):
-                        pass
-
-                    # Filtrar por device_id si se especifica
-                    if device_id and session_device_id and session_device_id != device_id:
-                        continue
-
-                    sessions.append({
-                        'session_id': session_id,
-                        'prefix_code': meta['prefix_code'],
-                        'farm_name': meta['farm_name'],
-                        'created_at': meta['created_at'],
-                        'status': meta['status'],
-                        'tabla2_count': t2_count,
-                        'tabla3_count': t3_count,
-                        'device_id': session_device_id,
-                        'fecultprb': fecultprb,
-                        'fecprbact': fecprbact,
-                    })
+                catalogo = leer_catalogo(session_id)
             except Exception as e:
                 logger.warning('No se pudo leer sesion %s: %s', session_id, e)
                 continue
+            if catalogo:
+                sessions.append(catalogo)
+    sessions.extend(_catalogos_archivados())
+    # Filtrar por device_id si se especifica
+    if device_id:
+        sessions = [s for s in sessions if not s['device_id'] or s['device_id'] == device_id]
     sessions.sort(key=lambda s: s['created_at'], reverse=True)
     return sessions
 
@@ -212,9 +721,18 @@ def set_session_device(session_id, device_id):
 
 
 def delete_session(session_id):
-    db_path = get_db_path(session_id)
-    # Eliminar el archivo principal y los archivos WAL auxiliares de SQLite
-    for suffix in ('', '-wal', '-shm'):
-        path = db_path + suffix
+    # Eliminar el archivo principal y los archivos WAL auxiliares de SQLite,
+    # en disco y en la copia caliente
+    for db_path in (get_disk_path(session_id), get_hot_path(session_id)):
+        if not db_path:
+            continue
+        for suffix in ('', '-wal', '-shm', '.respaldo'):
+            path = db_path + suffix
+            if os.path.exists(path):
+                os.remove(path)
+    # y la copia archivada con su catalogo y la marca de acceso, si las hay
+    archivo = get_archive_path(session_id)
+    acceso = os.path.join(config.DATA_FOLDER, '.accesos', session_id)
+    for path in (archivo, archivo[:-len('.db.gz')] + '.json', acceso):
         if os.path.exists(path):
             os.remove(path)
@@ -0,0 +1,288 @@
+"""
+models/escritura.py
+Turnos de escritura para las conexiones de get_db. Con varios dispositivos
+escribiendo en la misma sesion, el busy handler de SQLite (timeout=10)
+dejaba a los escritores esperando hasta 10 s sin orden y luego respondia un
+500 por "database is locked".
+
+Cada transaccion de escritura se abre por turnos. Cuenta como escritura,
+fuera de una transaccion, la primera sentencia INSERT/UPDATE/DELETE/REPLACE
+(tambien detras de un WITH), un BEGIN explicito o un executescript; desde la
+conexion o desde cualquiera de sus cursores (CursorEscritura):
+
+1. Dentro del proceso, los hilos que escriben en la misma sesion hacen fila
+   (FIFO): solo el primero compite por el bloqueo de SQLite.
+2. Entre procesos, BEGIN IMMEDIATE con el busy_timeout corto de la conexion
+   (ESCRITURA_INTENTO_MS, ver get_db); si la base sigue ocupada se reintenta
+   con espera exponencial acotada y aleatoria (full jitter, entre
+   ESCRITURA_BACKOFF_MIN_MS y ESCRITURA_BACKOFF_MAX_MS), para que los
+   procesos no reintenten a la vez.
+3. Si en ESCRITURA_ESPERA_MAX_SEG no se obtiene el bloqueo se lanza
+   EscrituraOcupada; app.py responde 503 con Retry-After.
+4. Con el bloqueo tomado se comprueba que el archivo abierto siga siendo el
+   que sirve la sesion (get_db_path, y el mismo inodo). Promover o enfriar
+   una sesion caliente (services/caliente.py) y archivarla
+   (services/archivo.py) cambian o borran el archivo con el bloqueo del
+   anterior tomado. Una conexion abierta antes no escribe en el archivo que
+   se deja de servir: lanza SesionMovida (tambien 503) y la solicitud
+   reintentada abre el vigente.
+
+Un executescript corre en una transaccion por turno (un BEGIN del script se
+suma a ella). El turno se suelta al terminar la transaccion: commit,
+rollback, COMMIT/ROLLBACK como sentencia, o close. La espera, los reintentos y
+los turnos vencidos se anotan en la medicion de la solicitud
+(models/instrumentacion.py) y se ven en /metrics y en Server-Timing.
+"""
+import collections
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from time import perf_counter
+
+import config
+from models.instrumentacion import ConexionMedida, CursorMedido, anotar_escritura
+
+
+class EscrituraOcupada(sqlite3.OperationalError):
+    """La sesion no libero el bloqueo de escritura a tiempo."""
+
+
+class SesionMovida(EscrituraOcupada):
+    """La sesion paso a servirse desde otro archivo (modo caliente)."""
+
+
+class _Fila:
+    """Fila FIFO de los hilos de un proceso que escriben en una sesion."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ocupada = False
+        self._espera = collections.deque()
+
+    def tomar(self, limite):
+        """Espera el turno hasta `limite` (time.monotonic). Retorna si lo obtuvo."""
+        with self._lock:
+            if not self._ocupada and not self._espera:
+                self._ocupada = True
+                return True
+            evento = threading.Event()
+            self._espera.append(evento)
+        if evento.wait(max(0.0, limite - time.monotonic())):
+            return True
+        with self._lock:
+            if evento.is_set():
+                return True  # el turno llego justo al vencer
+            self._espera.remove(evento)
+            return False
+
+    def soltar(self):
+        with self._lock:
+            if self._espera:
+                self._espera.popleft().set()  # pasa directo al siguiente
+            else:
+                self._ocupada = False
+
+
+_filas = {}
+_filas_lock = threading.Lock()
+
+
+def _fila(db_path):
+    with _filas_lock:
+        fila = _filas.get(db_path)
+        if fila is None:
+            fila = _filas[db_path] = _Fila()
+        return fila
+
+
+_ESCRITURAS = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+# Literales, identificadores entre comillas, comentarios, parentesis y palabras
+_TOKENS = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|`[^`]*`|\[[^\]]*\]"
+                     r"|--[^\n]*|/\*.*?\*/|[()]|\w+", re.S)
+
+
+def _es_escritura(sql):
+    inicial = sql.lstrip()[:7].upper()
+    if inicial.startswith(_ESCRITURAS):
+        return True
+    # WITH ... INSERT/UPDATE/...: sqlite3 no abre transaccion implicita
+    # para estas, pero escriben igual
+    return inicial.startswith('WITH') and _principal_de_with(sql) in _ESCRITURAS
+
+
+def _principal_de_with(sql):
+    """Sentencia principal de un WITH: la primera palabra clave fuera de
+    parentesis (los cuerpos de las CTE van entre parentesis)."""
+    nivel = 0
+    for token in _TOKENS.findall(sql):
+        if token == '(':
+            nivel += 1
+        elif token == ')':
+            nivel -= 1
+        elif nivel == 0:
+            palabra = token.upper()
+            if palabra in ('SELECT', 'VALUES') + _ESCRITURAS:
+                return palabra
+    return None
+
+
+def _ocupada(error):
+    mensaje = str(error)
+    return 'locked' in mensaje or 'busy' in mensaje
+
+
+class ConexionEscritura(ConexionMedida):
+    """ConexionMedida que abre sus transacciones de escritura por turnos."""
+
+    db_path = None
+    session_id = None
+    archivo = None  # (st_dev, st_ino) de db_path al abrir
+    _turno = False
+
+    def _abrir_escritura(self, sentencia='BEGIN IMMEDIATE'):
+        inicio = perf_counter()
+        limite = time.monotonic() + config.ESCRITURA_ESPERA_MAX_SEG
+        fila = _fila(self.db_path)
+        if not self._turno:
+            if not fila.tomar(limite):
+                anotar_escritura(perf_counter() - inicio, agotada=True)
+                raise EscrituraOcupada('Sesion ocupada: otra escritura no termino a tiempo')
+            self._turno = True
+        reintentos = 0
+        # Cursor sin medir: la espera se anota aparte, no como tiempo en SQLite
+        cursor = self.cursor(sqlite3.Cursor)
+        while True:
+            try:
+                cursor.execute(sentencia)
+                break
+            except sqlite3.OperationalError as e:
+                restante = limite - time.monotonic()
+                if not _ocupada(e) or restante <= 0:
+                    self._soltar_turno()
+                    if not _ocupada(e):
+                        raise
+                    anotar_escritura(perf_counter() - inicio, reintentos, agotada=True)
+                    raise EscrituraOcupada('Sesion ocupada: no se obtuvo el bloqueo de escritura') from e
+                tope = min(config.ESCRITURA_BACKOFF_MAX_MS,
+                           config.ESCRITURA_BACKOFF_MIN_MS * 2 ** reintentos)
+                time.sleep(min(restante, random.uniform(config.ESCRITURA_BACKOFF_MIN_MS, tope) / 1000))
+                reintentos += 1
+        anotar_escritura(perf_counter() - inicio, reintentos)
+        if not self._vigente():
+            self.rollback()
+            raise SesionMovida('La sesion cambio de archivo: reintentar')
+
+    def _vigente(self):
+        """Si el archivo abierto sigue siendo el que sirve la sesion."""
+        if self.session_id is None:
+            return True
+        from models.database import get_db_path  # models.database importa este modulo
+        if get_db_path(self.session_id) != self.db_path:
+            return False
+        try:
+            estado = os.stat(self.db_path)
+        except FileNotFoundError:
+            return False
+        # El descriptor abierto mantiene vivo el inodo: no puede reutilizarse
+        return (estado.st_dev, estado.st_ino) == self.archivo
+
+    def _soltar_turno(self):
+        if self._turno:
+            self._turno = False
+            _fila(self.db_path).soltar()
+
+    def _preparar(self, sql):
+        """Abre la transaccion de escritura si `sql` la necesita. Retorna True
+        si `sql` era un BEGIN (ya ejecutado)."""
+        if self.in_transaction:
+            return False
+        if sql.lstrip()[:5].upper() == 'BEGIN':
+            # BEGIN explicito (migraciones, importacion): siempre para escribir
+            self._abrir_escritura(sql if 'EXCLUSIVE' in sql.upper() else 'BEGIN IMMEDIATE')
+            return True
+        if _es_escritura(sql):
+            self._abrir_escritura()
+        return False
+
+    def cursor(self, factory=None):
+        return super().cursor(factory or CursorEscritura)
+
+    def commit(self):
+        try:
+            super().commit()
+        finally:
+            if not self.in_transaction:
+                self._soltar_turno()
+
+    def rollback(self):
+        try:
+            super().rollback()
+        finally:
+            self._soltar_turno()
+
+    def __exit__(self, *args):
+        # `with conn:` hace commit/rollback sin pasar por los metodos de arriba
+        try:
+            return super().__exit__(*args)
+        finally:
+            if not self.in_transaction:
+                self._soltar_turno()
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self._soltar_turno()
+
+    def __del__(self):
+        # Una conexion olvidada sin close no deja la fila tomada
+        self._soltar_turno()
+
+
+class CursorEscritura(CursorMedido):
+    """CursorMedido de ConexionEscritura: sus escrituras toman turno igual que
+    las de la conexion (conn.execute usa uno de estos cursores)."""
+
+    def execute(self, sql, parameters=()):
+        conn = self.connection
+        try:
+            if conn._preparar(sql):
+                return self
+            return super().execute(sql, parameters)
+        finally:
+            if conn._turno and not conn.in_transaction:
+                conn._soltar_turno()  # COMMIT/ROLLBACK como sentencia
+
+    def executemany(self, sql, seq_of_parameters):
+        self.connection._preparar(sql)
+        return super().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        # sqlite3 confirma la transaccion pendiente antes de un script y lo
+        # corre sin transaccion: aqui cada tramo va en una transaccion por
+        # turno. Un BEGIN del script se suma a la abierta; tras un COMMIT del
+        # script la siguiente sentencia abre otra.
+        from models.database import _sentencias  # models.database importa este modulo
+        conn = self.connection
+        if conn.in_transaction:
+            conn.commit()
+        try:
+            for sentencia in _sentencias(sql_script):
+                if sentencia.lstrip()[:5].upper() == 'BEGIN':
+                    if not conn.in_transaction:
+                        self.execute(sentencia)
+                    continue
+                if not conn.in_transaction:
+                    conn._abrir_escritura()
+                self.execute(sentencia)
+            if conn.in_transaction:
+                conn.commit()
+        except BaseException:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        return self
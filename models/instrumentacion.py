@@ -0,0 +1,197 @@
+"""
+models/instrumentacion.py
+Conexion SQLite instrumentada para get_db: mide cada sentencia (tiempo en
+execute y en los fetch) y las filas leidas, lo acumula en la medicion de la
+solicitud en curso (middleware/metricas.py) y registra las sentencias lentas
+(models/sql_lenta.py), ademas de la espera por el bloqueo de escritura
+(models/escritura.py). Fuera de una solicitud (CLI, benchmarks) no hay
+medicion activa y solo se paga el costo de perf_counter.
+"""
+import contextvars
+import sqlite3
+from time import perf_counter
+
+import config
+from models import sql_lenta
+
+_medicion = contextvars.ContextVar('medicion_sqlite', default=None)
+
+
+class Medicion:
+    """Acumulado de SQLite durante una solicitud."""
+    __slots__ = ('ruta', 'consultas', 'segundos', 'filas',
+                 'escrituras', 'espera_escritura', 'reintentos', 'agotadas')
+
+    def __init__(self, ruta=None):
+        self.ruta = ruta
+        self.consultas = 0
+        self.segundos = 0.0
+        self.filas = 0
+        # Transacciones de escritura (models/escritura.py)
+        self.escrituras = 0
+        self.espera_escritura = 0.0
+        self.reintentos = 0
+        self.agotadas = 0
+
+
+def iniciar_medicion(ruta=None):
+    """Activa una medicion nueva para el contexto actual y la retorna."""
+    medicion = Medicion(ruta)
+    _medicion.set(medicion)
+    return medicion
+
+
+def terminar_medicion():
+    """Desactiva y retorna la medicion del contexto actual (o None)."""
+    medicion = _medicion.get()
+    _medicion.set(None)
+    return medicion
+
+
+def _anotar(segundos, consultas=0, filas=0):
+    medicion = _medicion.get()
+    if medicion is not None:
+        medicion.consultas += consultas
+        medicion.segundos += segundos
+        medicion.filas += filas
+
+
+def anotar_escritura(segundos, reintentos=0, agotada=False):
+    """Anota la espera por el bloqueo de una transaccion de escritura."""
+    medicion = _medicion.get()
+    if medicion is not None:
+        medicion.escrituras += 1
+        medicion.espera_escritura += segundos
+        medicion.reintentos += reintentos
+        medicion.agotadas += agotada
+
+
+class CursorMedido(sqlite3.Cursor):
+    """
+    Cursor que anota tiempo y filas de cada execute/fetch. Ademas acumula la
+    duracion de la sentencia en curso (execute + fetch hasta agotarla, un
+    fetchone, cerrar el cursor o ejecutar otra) y la registra si supera
+    config.SQL_LENTA_MS.
+    """
+    # [sql, parametros, segundos, filas] de la sentencia en curso
+    _sentencia = None
+
+    def _empezar(self, sql, parametros, segundos):
+        self._sentencia = [sql, parametros, segundos, 0]
+        if self.description is None:
+            # Sin filas que leer (INSERT/UPDATE/DDL): la sentencia ya termino
+            self._terminar()
+
+    def _medir(self, segundos, filas, agotado):
+        _anotar(segundos, filas=filas)
+        sentencia = self._sentencia
+        if sentencia is not None:
+            sentencia[2] += segundos
+            sentencia[3] += filas
+            if agotado:
+                self._terminar()
+
+    def _terminar(self):
+        sentencia, self._sentencia = self._sentencia, None
+        if sentencia is None or config.SQL_LENTA_MS <= 0:
+            return
+        sql, parametros, segundos, filas = sentencia
+        if segundos * 1000 >= config.SQL_LENTA_MS:
+            medicion = _medicion.get()
+            sql_lenta.registrar(self.connection, sql, parametros, segundos, filas,
+                                medicion.ruta if medicion is not None else None)
+
+    def execute(self, sql, parameters=()):
+        self._terminar()
+        inicio = perf_counter()
+        try:
+            resultado = super().execute(sql, parameters)
+        finally:
+            segundos = perf_counter() - inicio
+            _anotar(segundos, consultas=1)
+        self._empezar(sql, parameters, segundos)
+        return resultado
+
+    def executemany(self, sql, seq_of_parameters):
+        self._terminar()
+        inicio = perf_counter()
+        try:
+            resultado = super().executemany(sql, seq_of_parameters)
+        finally:
+            segundos = perf_counter() - inicio
+            _anotar(segundos, consultas=1)
+        self._empezar(sql, None, segundos)
+        return resultado
+
+    def executescript(self, sql_script):
+        # Scripts (migraciones): se miden pero no se registran como lentos
+        self._terminar()
+        inicio = perf_counter()
+        try:
+            return super().executescript(sql_script)
+        finally:
+            _anotar(perf_counter() - inicio, consultas=1)
+
+    def fetchone(self):
+        # conn.execute(...).fetchone() no agota la sentencia: se da por
+        # terminada con la primera fila (las siguientes se anotan, pero ya no
+        # suman a su duracion)
+        inicio = perf_counter()
+        fila = super().fetchone()
+        self._medir(perf_counter() - inicio, fila is not None, True)
+        return fila
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        inicio = perf_counter()
+        filas = super().fetchmany(size)
+        self._medir(perf_counter() - inicio, len(filas), len(filas) < size)
+        return filas
+
+    def fetchall(self):
+        inicio = perf_counter()
+        filas = super().fetchall()
+        self._medir(perf_counter() - inicio, len(filas), True)
+        return filas
+
+    def __next__(self):
+        inicio = perf_counter()
+        try:
+            fila = super().__next__()
+        except StopIteration:
+            self._medir(perf_counter() - inicio, 0, True)
+            raise
+        self._medir(perf_counter() - inicio, 1, False)
+        return fila
+
+    def close(self):
+        self._terminar()
+        super().close()
+
+    def __del__(self):
+        # Desde el recolector no se ejecuta SQL (EXPLAIN de sql_lenta): una
+        # sentencia sin terminar se descarta
+        self._sentencia = None
+
+
+class ConexionMedida(sqlite3.Connection):
+    """Conexion cuyos atajos execute* usan CursorMedido."""
+
+    def cursor(self, factory=CursorMedido):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+    def commit(self):
+        inicio = perf_counter()
+        try:
+            super().commit()
+        finally:
+            _anotar(perf_counter() - inicio)
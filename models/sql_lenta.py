@@ -0,0 +1,138 @@
+"""
+models/sql_lenta.py
+Registro de consultas lentas. La conexion de get_db (models/instrumentacion.py)
+mide cada sentencia desde el execute hasta leer su ultima fila; las que
+superan config.SQL_LENTA_MS quedan en un log rotativo (una linea JSON por
+sentencia) con la forma de los parametros, la duracion, las filas y su
+EXPLAIN QUERY PLAN. resumir() agrupa el log por sentencia normalizada para
+`flask sql-lentas`.
+"""
+import json
+import logging
+import logging.handlers
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+import config
+
+_logger = logging.getLogger('capre.sql_lenta')
+_logger.propagate = False
+_logger_lock = threading.Lock()
+
+_RE_TEXTO = re.compile(r"'(?:[^']|'')*'")
+_RE_NUMERO = re.compile(r'(?<![\w.])-?\d+(?:\.\d+)?\b')
+_RE_LISTA = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_RE_ESPACIOS = re.compile(r'\s+')
+
+
+def ruta_log():
+    return os.path.join(config.DATA_FOLDER, 'logs', 'sql_lenta.log')
+
+
+def _preparar_logger():
+    """Configura el handler rotativo la primera vez (DATA_FOLDER puede cambiar antes)."""
+    with _logger_lock:
+        if not _logger.handlers:
+            os.makedirs(os.path.dirname(ruta_log()), exist_ok=True)
+            handler = logging.handlers.RotatingFileHandler(
+                ruta_log(), maxBytes=config.SQL_LENTA_MAX_BYTES,
+                backupCount=config.SQL_LENTA_RESPALDOS, encoding='utf-8')
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            _logger.addHandler(handler)
+            _logger.setLevel(logging.INFO)
+
+
+def normalizar(sql):
+    """Sentencia sin literales ni espacios variables: agrupa las f-strings equivalentes."""
+    sql = _RE_TEXTO.sub('?', sql)
+    sql = _RE_NUMERO.sub('?', sql)
+    sql = _RE_LISTA.sub('(?...)', sql)
+    return _RE_ESPACIOS.sub(' ', sql).strip()
+
+
+def forma_parametros(parametros):
+    """Tipos de los parametros (sin sus valores)."""
+    if parametros is None:
+        return None
+    if isinstance(parametros, dict):
+        return {k: type(v).__name__ for k, v in parametros.items()}
+    return [type(v).__name__ for v in parametros]
+
+
+def _plan(conn, sql, parametros):
+    # Connection.execute base: el EXPLAIN no se mide ni se vuelve a registrar
+    try:
+        return [fila[3] for fila in sqlite3.Connection.execute(conn, f'EXPLAIN QUERY PLAN {sql}', parametros)]
+    except (sqlite3.Error, ValueError):
+        return None
+
+
+def registrar(conn, sql, parametros, segundos, filas, ruta=None):
+    """Anota una sentencia lenta con su plan. parametros=None para executemany."""
+    if parametros is None:
+        # executemany: el plan no depende de los valores
+        plan = _plan(conn, sql, [None] * sql.count('?'))
+    else:
+        plan = _plan(conn, sql, parametros)
+    _preparar_logger()
+    _logger.info(json.dumps({
+        'ts': datetime.now(timezone.utc).isoformat(timespec='milliseconds'),
+        'ms': round(segundos * 1000, 2),
+        'filas': filas,
+        'ruta': ruta,
+        'sql': _RE_ESPACIOS.sub(' ', sql).strip(),
+        'normalizada': normalizar(sql),
+        'parametros': forma_parametros(parametros) if parametros is not None else 'executemany',
+        'plan': plan,
+    }, ensure_ascii=False))
+
+
+def leer(ruta=None):
+    """Entradas del log y de sus respaldos rotados, de la mas antigua a la mas nueva."""
+    ruta = ruta or ruta_log()
+    # RotatingFileHandler: .1 es el respaldo mas reciente
+    archivos = [f'{ruta}.{i}' for i in range(config.SQL_LENTA_RESPALDOS, 0, -1)] + [ruta]
+    for archivo in archivos:
+        if not os.path.exists(archivo):
+            continue
+        with open(archivo, encoding='utf-8') as f:
+            for linea in f:
+                try:
+                    yield json.loads(linea)
+                except ValueError:
+                    continue
+
+
+def resumir(entradas, orden='total'):
+    """
+    Agrupa por sentencia normalizada. Retorna [dict] con veces, total_ms,
+    max_ms, promedio_ms, rutas, plan (de la ejecucion mas lenta) y sin_indice
+    (el plan recorre una tabla completa o ordena con B-tree temporal),
+    ordenado por total_ms, max_ms o veces.
+    """
+    grupos = {}
+    for e in entradas:
+        g = grupos.setdefault(e['normalizada'], {
+            'normalizada': e['normalizada'], 'veces': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+            'rutas': set(), 'plan': None,
+        })
+        g['veces'] += 1
+        g['total_ms'] += e['ms']
+        if e.get('ruta'):
+            g['rutas'].add(e['ruta'])
+        if e['ms'] >= g['max_ms']:
+            g['max_ms'] = e['ms']
+            g['plan'] = e.get('plan')
+    resultado = []
+    for g in grupos.values():
+        plan = g['plan'] or []
+        g['promedio_ms'] = g['total_ms'] / g['veces']
+        g['rutas'] = sorted(g['rutas'])
+        g['sin_indice'] = any((d.startswith('SCAN ') and 'COVERING INDEX' not in d)
+                              or 'TEMP B-TREE' in d for d in plan)
+        resultado.append(g)
+    resultado.sort(key=lambda g: g[{'max': 'max_ms', 'veces': 'veces'}.get(orden, 'total_ms')], reverse=True)
+    return resultado
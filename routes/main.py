@@ -1,7 +1,15 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, session, make_response, request, jsonify
+import logging
+
+from flask import Blueprint, render_template, redirect, url_for, flash, session, make_response, request, jsonify, abort
 from models.database import list_sessions, delete_session
+from services.federacion import federar
+from services import cache
+from services.mantenimiento import leer_registro, sesiones_en_disco, tamanos
+from services.archivo import restaurar_sesion, sesiones_archivadas, leer_archivada, resumen_archivo
+from middleware.metricas import acceso_permitido
 
 bp = Blueprint('main', __name__)
+logger = logging.getLogger(__name__)
 
 
 @bp.route('/api/restore-device', methods=['POST'])
@@ -38,9 +46,19 @@ def index():
 
 @bp.route('/session/<session_id>/select')
 def select_session(session_id):
+    # Una sesion archivada se descomprime al activarla
+    try:
+        segundos = restaurar_sesion(session_id)
+    except Exception as e:
+        logger.warning('No se pudo restaurar sesion %s: %s', session_id, e)
+        flash('No se pudo restaurar la sesion archivada.', 'danger')
+        return redirect(url_for('main.index'))
     session['active_session_id'] = session_id
     session.modified = True  # Forzar guardar la sesion
-    flash('Sesion activada correctamente.', 'success')
+    if segundos is not None:
+        flash(f'Sesion restaurada del archivo ({segundos:.1f} s) y activada.', 'success')
+    else:
+        flash('Sesion activada correctamente.', 'success')
     return redirect(url_for('principal.index'))
 
 
@@ -49,5 +67,44 @@ def remove_session(session_id):
     if session.get('active_session_id') == session_id:
         session.pop('active_session_id', None)
     delete_session(session_id)
+    cache.olvidar_sesion(session_id)
     flash('Sesion eliminada.', 'info')
     return redirect(url_for('main.index'))
+
+
+@bp.route('/tablero')
+def tablero():
+    """Tablero del dispositivo: trabajo pendiente y novedades de todas sus fincas."""
+    device_id = session.get('device_id')
+    # Las sesiones archivadas no se restauran solo para el tablero
+    sessions = [s for s in list_sessions(device_id=device_id) if not s.get('archivada')]
+    ids = [s['session_id'] for s in sessions]
+    sin_pesaje = federar(ids, 'sin_pesaje')
+    novedades = federar(ids, 'novedades')
+
+    fincas = []
+    for s in sessions:
+        if s['session_id'] not in novedades:
+            continue  # sesion ilegible (ver services/federacion.py)
+        fincas.append({
+            **s,
+            'sin_pesaje': sin_pesaje.get(s['session_id'], []),
+            'novedades': novedades[s['session_id']][0],
+        })
+    return render_template('tablero.html', fincas=fincas, active_session=session.get('active_session_id'))
+
+
+@bp.route('/mantenimiento')
+def mantenimiento():
+    """Reporte del mantenimiento de bases de sesion (solo administracion)."""
+    if not acceso_permitido():
+        abort(404)
+    registro = leer_registro()
+    filas = []
+    for session_id in sorted(sesiones_en_disco()):
+        db, wal = tamanos(session_id)
+        filas.append({'session_id': session_id, 'db': db, 'wal': wal,
+                      'ultimo': registro.get(session_id)})
+    archivadas = [{'session_id': s, **(leer_archivada(s) or {})} for s in sorted(sesiones_archivadas())]
+    return render_template('mantenimiento.html', filas=filas, archivadas=archivadas,
+                           archivo=resumen_archivo())
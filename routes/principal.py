@@ -1,8 +1,21 @@
+import os
+import hashlib
 from datetime import datetime, timedelta
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, make_response
 from models.database import get_db
+from services.bitacora import CAMPOS_EVENTO, registrar_novedad, registrar_novedad_grupo, borrar_novedad
+from services.sync import version_datos
+from services import cache
+from services.busqueda import buscar_animales, animal_captura, navegacion_captura
+from services.produccion import ORDEN_ORDENOS, ORDEN_DEFECTO, listar_en_produccion, sin_pesaje
+from services.indicadores import leer_indicadores
+from services.grid import TABLAS_GRID, LIMITE_DEFECTO, columnas_tabla, consultar_grid, decodificar_cursor
+from services.novillas import (
+    total_novillas, listar_novillas, entrada_novilla, ids_en_tabla2, cargar_novilla,
+)
 from services.helpers import (
     get_session_id as _get_session_id,
+    get_device_id as _get_device_id,
     format_fecha,
     parsear_ordeno,
     ESTADO_MAP, ESTADO_COLOR, PAC_MAP, PAC_COLOR,
@@ -11,6 +24,31 @@ from services.helpers import (
 
 bp = Blueprint('principal', __name__)
 
+# Pestañas de Captura servidas como fragmento (principal_tab.html)
+TABS_CAPTURA = ('servicios', 'secas', 'chequeo', 'partos', 'salidas', 'sanitario')
+
+# Revision de la plantilla del fragmento: forma parte del ETag para que un
+# despliegue con la plantilla cambiada no reutilice fragmentos en cache
+_REV_FRAGMENTO = str(int(os.path.getmtime(
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), 'templates', 'principal_tab.html'))))
+
+
+def _limites_fecha(hato):
+    """(fecha_min, fecha_max, fecha_min_servicio) para los campos de novedades."""
+    fecha_min = hato['fecultprb'] or '' if hato else ''
+    fecha_max = hato['fecprbact'] or '' if hato else ''
+
+    # Calcular fecha minima para servicios (DIAS_MIN_SERVICIO dias antes de fecha de validacion)
+    fecha_min_servicio = ''
+    if fecha_max:
+        try:
+            fec_val = datetime.strptime(fecha_max, '%Y-%m-%d')
+            fec_min_ser = fec_val - timedelta(days=DIAS_MIN_SERVICIO)
+            fecha_min_servicio = fec_min_ser.strftime('%Y-%m-%d')
+        except ValueError:
+            fecha_min_servicio = fecha_min
+    return fecha_min, fecha_max, fecha_min_servicio
+
 
 @bp.route('/principal')
 def index():
@@ -24,21 +62,22 @@ def index():
     # Load farm info (tabla1)
     hato = conn.execute('SELECT * FROM tabla1 LIMIT 1').fetchone()
 
-    # Load animal list from tabla2 for navigation
-    animales = conn.execute(
-        'SELECT id, codint, orejera, nombre FROM tabla2 ORDER BY nombre'
-    ).fetchall()
+    # La lista de animales ya no se envia en la pagina: la busqueda usa
+    # /principal/api/buscar y la navegacion solo necesita el total
+    total_animales = conn.execute('SELECT COUNT(*) FROM tabla2').fetchone()[0]
 
-    # Current animal index
+    # Current animal index: idx es la posicion que se muestra; id (si viene de
+    # los botones o la busqueda) el animal a cargar, sin recorrer hasta idx
     animal_idx = request.args.get('idx', 0, type=int)
     animal = None
-    if animales:
+    navegacion = {}
+    if total_animales:
         if animal_idx < 0:
             animal_idx = 0
-        if animal_idx >= len(animales):
-            animal_idx = len(animales) - 1
-        animal_id = animales[animal_idx]['id']
-        animal = conn.execute('SELECT * FROM tabla2 WHERE id = ?', (animal_id,)).fetchone()
+        if animal_idx >= total_animales:
+            animal_idx = total_animales - 1
+        animal = animal_captura(conn, animal_idx, request.args.get('id', type=int))
+        navegacion = navegacion_captura(conn, animal)
 
     # Active tab
     tab = request.args.get('tab', 'servicios')
@@ -46,26 +85,15 @@ def index():
     conn.close()
 
     # Date limits for novelty fields
-    fecha_min = hato['fecultprb'] or '' if hato else ''
-    fecha_max = hato['fecprbact'] or '' if hato else ''
-
-    # Calcular fecha minima para servicios (125 dias antes de fecha de validacion)
-    fecha_min_servicio = ''
-    if fecha_max:
-        try:
-            fec_val = datetime.strptime(fecha_max, '%Y-%m-%d')
-            fec_min_ser = fec_val - timedelta(days=125)
-            fecha_min_servicio = fec_min_ser.strftime('%Y-%m-%d')
-        except ValueError:
-            fecha_min_servicio = fecha_min
+    fecha_min, fecha_max, fecha_min_servicio = _limites_fecha(hato)
 
     return render_template(
         'principal.html',
         hato=hato,
-        animales=animales,
         animal=animal,
         animal_idx=animal_idx,
-        total_animales=len(animales),
+        total_animales=total_animales,
+        navegacion=navegacion,
         tab=tab,
         fecha_min=fecha_min,
         fecha_max=fecha_max,
@@ -73,6 +101,58 @@ def index():
     )
 
 
+@bp.route('/principal/tab/<tab>/<int:animal_id>')
+def tab_fragmento(tab, animal_id):
+    """
+    Fragmento HTML de una pestaña de Captura para un animal (lo pide
+    captura.js al cambiar de pestaña). El ETag depende de la version de datos
+    de la sesion, asi mientras no haya cambios el navegador lo revalida con
+    un 304 sin que se consulte el animal ni se renderice la plantilla.
+    """
+    session_id = _get_session_id()
+    if not session_id:
+        return jsonify({'success': False, 'error': 'Sin sesión activa'}), 401
+    if tab not in TABS_CAPTURA:
+        return jsonify({'success': False, 'error': 'Pestaña no valida'}), 404
+
+    animal_idx = request.args.get('idx', 0, type=int)
+
+    conn = get_db(session_id)
+    try:
+        version = version_datos(conn)
+        fragmento = f'{session_id}:{animal_id}:{animal_idx}:{tab}:{_REV_FRAGMENTO}'
+        etag = hashlib.sha1(f'{version}:{fragmento}'.encode()).hexdigest()[:20]
+        if request.if_none_match.contains_weak(etag):
+            resp = make_response('', 304)
+        else:
+            # Otro dispositivo (o proceso) pudo renderizarlo con la misma version
+            html = cache.obtener('fragmento', fragmento, version=version)
+            if html is None:
+                hato = conn.execute('SELECT * FROM tabla1 LIMIT 1').fetchone()
+                animal = conn.execute('SELECT * FROM tabla2 WHERE id = ?', (animal_id,)).fetchone()
+                if not animal:
+                    return jsonify({'success': False, 'error': 'Animal no encontrado'}), 404
+                fecha_min, fecha_max, fecha_min_servicio = _limites_fecha(hato)
+                html = render_template(
+                    'principal_tab.html',
+                    animal=animal,
+                    animal_idx=animal_idx,
+                    tab=tab,
+                    fecha_min=fecha_min,
+                    fecha_max=fecha_max,
+                    fecha_min_servicio=fecha_min_servicio,
+                )
+                cache.guardar('fragmento', fragmento, html, session_id=session_id, version=version)
+            resp = make_response(html)
+    finally:
+        conn.close()
+
+    resp.set_etag(etag)
+    resp.headers['Cache-Control'] = 'private, no-cache'
+    resp.vary.add('Cookie')
+    return resp
+
+
 @bp.route('/principal/api/animal/<int:idx>')
 def api_get_animal(idx):
     """API para obtener datos del animal via AJAX."""
@@ -88,9 +168,8 @@ def api_get_animal(idx):
             return jsonify({'success': False, 'error': 'No hay animales'}), 404
 
         idx = max(0, min(idx, total - 1))
-        animal_row = conn.execute(
-            'SELECT * FROM tabla2 ORDER BY nombre LIMIT 1 OFFSET ?', (idx,)
-        ).fetchone()
+        animal_row = animal_captura(conn, idx, request.args.get('id', type=int))
+        navegacion = navegacion_captura(conn, animal_row)
     finally:
         conn.close()
 
@@ -104,6 +183,7 @@ def api_get_animal(idx):
         'success': True,
         'animal_idx': idx,
         'total_animales': total,
+        'navegacion': navegacion,
         'animal': {
             'id': animal['id'],
             'orejera': animal.get('orejera', ''),
@@ -148,6 +228,32 @@ def api_get_animal(idx):
     })
 
 
+@bp.route('/principal/api/buscar')
+def api_buscar():
+    """Busqueda de animales por nombre, orejera, codint o registro (FTS5)."""
+    session_id = _get_session_id()
+    if not session_id:
+        return jsonify({'success': False, 'error': 'Sin sesión activa'}), 401
+
+    texto = request.args.get('q', '').strip()
+
+    conn = get_db(session_id)
+    try:
+        resultados = buscar_animales(conn, texto)
+    finally:
+        conn.close()
+
+    for r in resultados:
+        if r['idx'] is None:
+            r['url'] = None
+        elif r['tabla'] == 'tabla2':
+            r['url'] = url_for('principal.index', idx=r['idx'], id=r['id'])
+        else:
+            r['url'] = url_for('principal.novillas', idx=r['idx'])
+
+    return jsonify({'success': True, 'resultados': resultados})
+
+
 @bp.route('/api/validar-exportacion')
 def validar_exportacion():
     """Valida si hay animales en produccion sin pesaje de leche antes de exportar."""
@@ -156,21 +262,11 @@ def validar_exportacion():
         return jsonify({'ok': False, 'error': 'Sin sesion activa'}), 401
 
     conn = get_db(session_id)
-    # Misma lógica que ordenos_grupal
-    sin_pesaje = conn.execute('''
-        SELECT orejera, nombre
-        FROM tabla2
-        WHERE (estado IN ('1', '2') OR fecparto IS NOT NULL)
-          AND fecsale IS NULL
-          AND (fecseca IS NULL OR (fecparto IS NOT NULL AND fecparto > fecseca))
-          AND (ord1 IS NULL OR ord1 = 0)
-          AND (ord2 IS NULL OR ord2 = 0)
-          AND (ord3 IS NULL OR ord3 = 0)
-        ORDER BY nombre ASC
-    ''').fetchall()
+    # Misma cohorte que ordenos_grupal (ver services/produccion.py)
+    filas = sin_pesaje(conn)
     conn.close()
 
-    animales = [{'orejera': a['orejera'] or '', 'nombre': a['nombre'] or ''} for a in sin_pesaje]
+    animales = [{'orejera': a['orejera'] or '', 'nombre': a['nombre'] or ''} for a in filas]
     return jsonify({'ok': True, 'sin_pesaje': animales, 'total': len(animales)})
 
 
@@ -191,32 +287,15 @@ def ordenos_grupal():
         return redirect(url_for('principal.index'))
 
     # Obtener parámetro de ordenamiento
-    orden = request.args.get('orden', 'nombre_asc')
-    opciones_validas = ('nombre_asc', 'nombre_desc', 'orejera_asc', 'orejera_desc')
-    if orden not in opciones_validas:
-        orden = 'nombre_asc'
-
-    # Definir la cláusula ORDER BY según el tipo de ordenamiento
-    order_map = {
-        'nombre_asc': 'nombre ASC',
-        'nombre_desc': 'nombre DESC',
-        'orejera_asc': 'CAST(orejera AS INTEGER) ASC',
-        'orejera_desc': 'CAST(orejera AS INTEGER) DESC',
-    }
-    order_clause = order_map.get(orden, 'nombre ASC')
+    orden = request.args.get('orden', ORDEN_DEFECTO)
+    if orden not in ORDEN_ORDENOS:
+        orden = ORDEN_DEFECTO
 
-    # Animales en producción activa:
+    # Animales en producción activa (tabla2.en_produccion, services/produccion.py):
     # - estado 1/2, o con parto registrado
     # - sin salida
     # - sin seca, O si hay seca pero el parto es posterior (nueva lactancia)
-    animales = conn.execute(f'''
-        SELECT id, codint, orejera, nombre, estado, fecest, fecparto, dialec, ultlec, ord1, ord2, ord3
-        FROM tabla2
-        WHERE (estado IN ('1', '2') OR fecparto IS NOT NULL)
-          AND fecsale IS NULL
-          AND (fecseca IS NULL OR (fecparto IS NOT NULL AND fecparto > fecseca))
-        ORDER BY {order_clause}
-    ''').fetchall()
+    animales = listar_en_produccion(conn, orden)
     conn.close()
 
     return render_template('ordenos_grupal.html', hato=hato, animales=animales, orden=orden)
@@ -240,6 +319,7 @@ def guardar_ordenos_grupal():
 
     # Obtener todos los IDs de animales del formulario
     animal_ids = request.form.getlist('animal_id')
+    device_id = _get_device_id()
 
     try:
         for animal_id in animal_ids:
@@ -256,10 +336,9 @@ def guardar_ordenos_grupal():
                 flash(err, 'danger')
                 return redirect(url_for('principal.ordenos_grupal'))
 
-            conn.execute(
-                'UPDATE tabla2 SET ord1=?, ord2=?, ord3=? WHERE id=?',
-                (ord1_val, ord2_val, ord3_val, animal_id)
-            )
+            registrar_novedad(conn, animal_id, 'ordenos',
+                              {'ord1': ord1_val, 'ord2': ord2_val, 'ord3': ord3_val},
+                              device_id)
 
         conn.commit()
     finally:
@@ -296,7 +375,7 @@ def auto_guardar_ordeno():
         hato = conn.execute('SELECT fecprbact FROM tabla1 LIMIT 1').fetchone()
         if not hato or not hato['fecprbact']:
             return jsonify({'success': False, 'error': 'Falta Fecha de Validacion'}), 400
-        conn.execute(f'UPDATE tabla2 SET {campo}=? WHERE id=?', (valor_float, animal_id))
+        registrar_novedad(conn, animal_id, 'ordenos', {campo: valor_float}, _get_device_id())
         conn.commit()
     finally:
         conn.close()
@@ -304,6 +383,148 @@ def auto_guardar_ordeno():
     return jsonify({'success': True})
 
 
+# ---- CAPTURA GRUPAL DE SECAS, CHEQUEOS Y SANITARIO ----
+
+# Reglas de negocio compartidas con update_secas y update_chequeo, como
+# condicion SQL sobre tabla2 para aplicarlas en una sola sentencia.
+_REGLA_SECAS = "estado IN ('1', '2')"
+_REGLA_CHEQUEO = "numser > 0"
+
+# Evento → configuracion de la vista grupal:
+#   condicion: regla que debe cumplir el animal (tambien filtra la lista)
+#   fecha: columna que recibe la fecha comun (None si el evento no tiene fecha)
+#   valor: columna con el valor por fila (None: la fila solo se marca)
+_GRUPAL_CONFIG = {
+    'secas': {
+        'titulo': 'Secas', 'icono': 'bi-pause-circle',
+        'condicion': _REGLA_SECAS, 'fecha': 'fecseca', 'valor': None,
+        'columnas': 'fecseca',
+        'opciones': (),
+    },
+    'chequeo': {
+        'titulo': 'Chequeos de Preñez', 'icono': 'bi-clipboard2-pulse',
+        'condicion': _REGLA_CHEQUEO, 'fecha': 'fecchp', 'valor': 'panew',
+        'columnas': 'fecchp, panew, pac',
+        'opciones': (('P', 'P - Preñada'), ('A', 'A - Abierta')),
+    },
+    'sanitario': {
+        'titulo': 'Sanitario', 'icono': 'bi-heart-pulse-fill',
+        'condicion': '1', 'fecha': None, 'valor': 'cart',
+        'columnas': 'cart',
+        'opciones': (('S', 'S - Enferma'), ('M', 'M - Mastitis aguda'),
+                     ('U', 'U - Lesion de ubre'), ('T', 'T - Perdida muestra de leche'),
+                     ('L', 'L - Perdida peso de leche')),
+    },
+}
+
+
+@bp.route('/principal/grupal/<evento>')
+def captura_grupal(evento):
+    """Vista grupal de secas, chequeos o sanitario con fecha comun."""
+    cfg = _GRUPAL_CONFIG.get(evento)
+    if not cfg:
+        flash('Evento no reconocido.', 'danger')
+        return redirect(url_for('principal.index'))
+
+    session_id = _get_session_id()
+    if not session_id:
+        return redirect(url_for('main.index'))
+
+    conn = get_db(session_id)
+    hato = conn.execute('SELECT * FROM tabla1 LIMIT 1').fetchone()
+
+    # Validar que exista fecha de validacion
+    if not hato or not hato['fecprbact']:
+        conn.close()
+        flash(f'Debe ingresar la Fecha de Validacion antes de acceder a {cfg["titulo"]}.', 'warning')
+        return redirect(url_for('principal.index'))
+
+    animales = conn.execute(f'''
+        SELECT id, orejera, nombre, estado, numser, {cfg['columnas']}
+        FROM tabla2
+        WHERE {cfg['condicion']}
+        ORDER BY nombre
+    ''').fetchall()
+    conn.close()
+
+    return render_template('captura_grupal.html',
+                           hato=hato,
+                           evento=evento,
+                           cfg=cfg,
+                           animales=animales,
+                           fecha_min=hato['fecultprb'] or '',
+                           fecha_max=hato['fecprbact'] or '')
+
+
+@bp.route('/principal/grupal/<evento>/guardar', methods=['POST'])
+def guardar_captura_grupal(evento):
+    """Guarda la captura grupal con una sola sentencia por tipo de evento."""
+    cfg = _GRUPAL_CONFIG.get(evento)
+    if not cfg:
+        flash('Evento no reconocido.', 'danger')
+        return redirect(url_for('principal.index'))
+
+    session_id = _get_session_id()
+    if not session_id:
+        return redirect(url_for('main.index'))
+
+    fecha = request.form.get('fecha', '').strip() or None
+
+    # Filas que cambian: las que reciben un valor (o quedan marcadas) y las
+    # que se borran a proposito, con "Sin novedad" sobre un valor registrado
+    # (original_<id> viene de la plantilla) o con la casilla Borrar. Las filas
+    # sin cambios no se tocan.
+    nuevas = {}
+    borradas = set(request.form.getlist('borrar', type=int))
+    for animal_id in request.form.getlist('animal_id', type=int):
+        if not cfg['valor']:
+            nuevas[animal_id] = {}
+            continue
+        valor = request.form.get(f'valor_{animal_id}', '').strip().upper()
+        original = request.form.get(f'original_{animal_id}', '').strip().upper()
+        if valor == original:
+            continue
+        if not valor:
+            borradas.add(animal_id)
+            continue
+        if valor not in dict(cfg['opciones']):
+            flash('Valor no valido.', 'danger')
+            return redirect(url_for('principal.captura_grupal', evento=evento))
+        nuevas[animal_id] = {cfg['valor']: valor}
+
+    if nuevas and cfg['fecha']:
+        if not fecha:
+            flash('Debe seleccionar la fecha.', 'danger')
+            return redirect(url_for('principal.captura_grupal', evento=evento))
+        for fila in nuevas.values():
+            fila[cfg['fecha']] = fecha
+
+    # El borrado pone en NULL todas las columnas del evento (gana si la fila
+    # tambien quedo marcada)
+    filas = {**nuevas, **{a: dict.fromkeys(CAMPOS_EVENTO[evento]) for a in borradas}}
+
+    if not filas:
+        flash('No se selecciono ningun animal.', 'warning')
+        return redirect(url_for('principal.captura_grupal', evento=evento))
+
+    conn = get_db(session_id)
+    try:
+        hato = conn.execute('SELECT fecprbact FROM tabla1 LIMIT 1').fetchone()
+        if not hato or not hato['fecprbact']:
+            flash('Debe ingresar la Fecha de Validacion antes de registrar novedades.', 'warning')
+            return redirect(url_for('principal.index'))
+        guardados = registrar_novedad_grupo(conn, evento, filas, cfg['condicion'], _get_device_id())
+        conn.commit()
+    finally:
+        conn.close()
+
+    flash(f'{cfg["titulo"]}: {guardados} animal(es) guardados.', 'success')
+    omitidos = len(filas) - guardados
+    if omitidos:
+        flash(f'{omitidos} animal(es) omitidos por no cumplir las condiciones del evento.', 'warning')
+    return redirect(url_for('principal.captura_grupal', evento=evento))
+
+
 @bp.route('/principal/api/novilla/<int:idx>')
 def api_get_novilla(idx):
     """API para obtener datos de novilla via AJAX."""
@@ -313,37 +534,15 @@ def api_get_novilla(idx):
 
     conn = get_db(session_id)
     try:
-        # Novillas con estado='0' de ambas tablas (solo columnas necesarias para índice)
-        animales = conn.execute('''
-            SELECT id, 'tabla2' as tabla, nombre FROM tabla2 WHERE estado = '0'
-            UNION ALL
-            SELECT id, 'tabla3' as tabla, nombre FROM tabla3 WHERE estado = '0'
-            ORDER BY nombre
-        ''').fetchall()
-
-        if not animales:
+        # Lectura por posicion en el listado de novillas (orden del indice)
+        total = total_novillas(conn)
+        if not total:
             return jsonify({'success': False, 'error': 'No hay novillas'}), 404
 
-        idx = max(0, min(idx, len(animales) - 1))
-        animal_id = animales[idx]['id']
-        tabla_origen = animales[idx]['tabla']
-
-        # Obtener datos completos
-        if tabla_origen == 'tabla2':
-            animal = dict(conn.execute('SELECT * FROM tabla2 WHERE id = ?', (animal_id,)).fetchone())
-        else:
-            animal_t3 = conn.execute('SELECT * FROM tabla3 WHERE id = ?', (animal_id,)).fetchone()
-            animal_t2 = conn.execute(
-                'SELECT fecser, toro, calor, fecparto, tipoparto, orecria1, nomcria1,'
-                ' sexcria1, hacer1, orecria2, nomcria2, sexcria2, hacer2, numser, fecultser'
-                ' FROM tabla2 WHERE codint = ?', (animal_t3['codint'],)
-            ).fetchone()
-            animal = dict(animal_t3)
-            if animal_t2:
-                for key in ['fecser', 'toro', 'calor', 'fecparto', 'tipoparto',
-                            'orecria1', 'nomcria1', 'sexcria1', 'hacer1',
-                            'orecria2', 'nomcria2', 'sexcria2', 'hacer2', 'numser', 'fecultser']:
-                    animal[key] = animal_t2[key]
+        idx = max(0, min(idx, total - 1))
+        entrada = entrada_novilla(conn, idx)
+        tabla_origen = entrada['tabla']
+        animal = cargar_novilla(conn, entrada)
     finally:
         conn.close()
 
@@ -352,7 +551,7 @@ def api_get_novilla(idx):
     return jsonify({
         'success': True,
         'animal_idx': idx,
-        'total_animales': len(animales),
+        'total_animales': total,
         'tabla_origen': tabla_origen,
         'animal': {
             'id': animal['id'],
@@ -402,13 +601,8 @@ def novillas():
         flash('Debe ingresar la Fecha de Validacion antes de acceder a Novillas.', 'warning')
         return redirect(url_for('principal.index'))
 
-    # Novillas con estado='0' de ambas tablas
-    animales = conn.execute('''
-        SELECT id, codint, orejera, nombre, 'tabla2' as tabla FROM tabla2 WHERE estado = '0'
-        UNION ALL
-        SELECT id, codint, orejera, nombre, 'tabla3' as tabla FROM tabla3 WHERE estado = '0'
-        ORDER BY nombre
-    ''').fetchall()
+    # Novillas con estado='0' de ambas tablas (listado mantenido por triggers)
+    animales = listar_novillas(conn)
 
     # Current animal index
     animal_idx = request.args.get('idx', 0, type=int)
@@ -419,36 +613,11 @@ def novillas():
             animal_idx = 0
         if animal_idx >= len(animales):
             animal_idx = len(animales) - 1
-        animal_id = animales[animal_idx]['id']
-        tabla_origen = animales[animal_idx]['tabla']
-
-        # Obtener datos completos del animal desde su tabla de origen
-        if tabla_origen == 'tabla2':
-            animal = conn.execute('SELECT * FROM tabla2 WHERE id = ?', (animal_id,)).fetchone()
-        else:
-            # Obtener datos basicos de tabla3
-            animal_t3 = conn.execute('SELECT * FROM tabla3 WHERE id = ?', (animal_id,)).fetchone()
-            # Buscar datos de servicio/parto en tabla2 (si existen)
-            animal_t2 = conn.execute('SELECT fecser, toro, calor, fecparto, tipoparto, orecria1, nomcria1, sexcria1, hacer1, orecria2, nomcria2, sexcria2, hacer2 FROM tabla2 WHERE codint = ?', (animal_t3['codint'],)).fetchone()
-
-            # Combinar datos: usar tabla3 como base y sobrescribir con datos de tabla2 si existen
-            animal_dict = dict(animal_t3)
-            if animal_t2:
-                # Sobrescribir campos de servicio/parto con los de tabla2
-                animal_dict['fecser'] = animal_t2['fecser']
-                animal_dict['toro'] = animal_t2['toro']
-                animal_dict['calor'] = animal_t2['calor']
-                animal_dict['fecparto'] = animal_t2['fecparto']
-                animal_dict['tipoparto'] = animal_t2['tipoparto']
-                animal_dict['orecria1'] = animal_t2['orecria1']
-                animal_dict['nomcria1'] = animal_t2['nomcria1']
-                animal_dict['sexcria1'] = animal_t2['sexcria1']
-                animal_dict['hacer1'] = animal_t2['hacer1']
-                animal_dict['orecria2'] = animal_t2['orecria2']
-                animal_dict['nomcria2'] = animal_t2['nomcria2']
-                animal_dict['sexcria2'] = animal_t2['sexcria2']
-                animal_dict['hacer2'] = animal_t2['hacer2']
-            animal = animal_dict
+        # La posicion es el indice en el listado, que la pagina ya trae completo
+        entrada = animales[animal_idx]
+        tabla_origen = entrada['tabla']
+        # Datos completos desde su tabla de origen (servicio/parto desde tabla2)
+        animal = cargar_novilla(conn, entrada)
 
     # Active tab
     tab = request.args.get('tab', 'servicios')
@@ -456,18 +625,7 @@ def novillas():
     conn.close()
 
     # Date limits for novelty fields
-    fecha_min = hato['fecultprb'] or '' if hato else ''
-    fecha_max = hato['fecprbact'] or '' if hato else ''
-
-    # Calcular fecha minima para servicios (125 dias antes de fecha de validacion)
-    fecha_min_servicio = ''
-    if fecha_max:
-        try:
-            fec_val = datetime.strptime(fecha_max, '%Y-%m-%d')
-            fec_min_ser = fec_val - timedelta(days=125)
-            fecha_min_servicio = fec_min_ser.strftime('%Y-%m-%d')
-        except ValueError:
-            fecha_min_servicio = fecha_min
+    fecha_min, fecha_max, fecha_min_servicio = _limites_fecha(hato)
 
     return render_template('novillas.html',
                            hato=hato,
@@ -533,32 +691,28 @@ def novillas_servicio(animal_id):
     if calor == 'S':
         toro = 'CALOR PER'
 
+    servicio = {'fecser': fecser, 'toro': toro, 'calor': calor}
+
     # Siempre guardar en tabla2
     if tabla_origen == 'tabla2':
         # Animal ya esta en tabla2, solo actualizar
-        conn.execute('''
-            UPDATE tabla2
-            SET fecser = ?, toro = ?, calor = ?
-            WHERE id = ?
-        ''', (fecser, toro, calor, animal_id))
+        registrar_novedad(conn, animal_id, 'servicios', servicio, _get_device_id())
     else:
-        # Animal viene de tabla3, buscar por codint en tabla2 o actualizar por codint
-        animal_t2 = conn.execute('SELECT id FROM tabla2 WHERE codint = ?', (animal['codint'],)).fetchone()
-        if animal_t2:
+        # Animal viene de tabla3, actualizar sus copias en tabla2 (misma codint)
+        t2_ids = ids_en_tabla2(conn, 'tabla3', animal_id)
+        if t2_ids:
             # Existe en tabla2, actualizar
-            conn.execute('''
-                UPDATE tabla2
-                SET fecser = ?, toro = ?, calor = ?
-                WHERE codint = ?
-            ''', (fecser, toro, calor, animal['codint']))
+            for t2_id in t2_ids:
+                registrar_novedad(conn, t2_id, 'servicios', servicio, _get_device_id())
         else:
-            # No existe en tabla2, insertar nuevo registro con todos los campos
-            conn.execute('''
+            # No existe en tabla2, insertar nuevo registro con todos los campos;
+            # el servicio se aplica despues para que quede en la bitacora
+            cur = conn.execute('''
                 INSERT INTO tabla2 (codint, orejera, nombre, registro, estado, fecest,
                     ultlec, dialec, numser, fecultser, pac, numreb,
-                    fecser, toro, calor, nuevo, codtor, clasi, ptos,
+                    nuevo, codtor, clasi, ptos,
                     ord1, ord2, ord3)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             ''', (
                 animal['codint'],
                 animal['orejera'],
@@ -572,9 +726,6 @@ def novillas_servicio(animal_id):
                 animal['fecultser'],
                 animal['pac'],
                 animal['numreb'] if animal['numreb'] is not None else 0,    # numreb = 0 si es NULL
-                fecser,
-                toro,
-                calor,
                 1,  # nuevo = 1 (.T. en VFP) para indicar que viene de tabla3
                 animal['codtor'],
                 animal['clasi'],
@@ -583,6 +734,7 @@ def novillas_servicio(animal_id):
                 0.0,  # ord2 = 0.0
                 0.0   # ord3 = 0.0
             ))
+            registrar_novedad(conn, cur.lastrowid, 'servicios', servicio, _get_device_id())
 
     conn.commit()
     conn.close()
@@ -625,9 +777,9 @@ def novillas_parto(animal_id):
     tiene_servicio = animal['fecser']
     if tabla_origen == 'tabla3' and not tiene_servicio:
         # Verificar si existe en tabla2 con servicio
-        animal_t2 = conn.execute('SELECT fecser FROM tabla2 WHERE codint = ?', (animal['codint'],)).fetchone()
-        if animal_t2:
-            tiene_servicio = animal_t2['fecser']
+        t2_ids = ids_en_tabla2(conn, 'tabla3', animal_id)
+        if t2_ids:
+            tiene_servicio = conn.execute('SELECT fecser FROM tabla2 WHERE id = ?', (t2_ids[0],)).fetchone()['fecser']
 
     if not tiene_servicio:
         conn.close()
@@ -645,27 +797,21 @@ def novillas_parto(animal_id):
     sexcria2 = request.form.get('sexcria2', '').strip() or None
     hacer2 = request.form.get('hacer2', '').strip() or None
 
+    parto = {
+        'fecparto': fecparto, 'tipoparto': tipoparto,
+        'orecria1': orecria1, 'nomcria1': nomcria1, 'sexcria1': sexcria1, 'hacer1': hacer1,
+        'orecria2': orecria2, 'nomcria2': nomcria2, 'sexcria2': sexcria2, 'hacer2': hacer2,
+    }
+
     # Siempre guardar en tabla2
     if tabla_origen == 'tabla2':
-        conn.execute('''
-            UPDATE tabla2 SET fecparto=?, tipoparto=?,
-               orecria1=?, nomcria1=?, sexcria1=?, hacer1=?,
-               orecria2=?, nomcria2=?, sexcria2=?, hacer2=?
-               WHERE id=?
-        ''', (fecparto, tipoparto, orecria1, nomcria1, sexcria1, hacer1,
-              orecria2, nomcria2, sexcria2, hacer2, animal_id))
+        registrar_novedad(conn, animal_id, 'partos', parto, _get_device_id())
     else:
-        # Animal viene de tabla3, actualizar por codint en tabla2
-        animal_t2 = conn.execute('SELECT id FROM tabla2 WHERE codint = ?', (animal['codint'],)).fetchone()
-        if animal_t2:
-            conn.execute('''
-                UPDATE tabla2 SET fecparto=?, tipoparto=?,
-                   orecria1=?, nomcria1=?, sexcria1=?, hacer1=?,
-                   orecria2=?, nomcria2=?, sexcria2=?, hacer2=?
-                   WHERE codint=?
-            ''', (fecparto, tipoparto, orecria1, nomcria1, sexcria1, hacer1,
-                  orecria2, nomcria2, sexcria2, hacer2, animal['codint']))
-        else:
+        # Animal viene de tabla3, actualizar sus copias en tabla2
+        t2_ids = ids_en_tabla2(conn, 'tabla3', animal_id)
+        for t2_id in t2_ids:
+            registrar_novedad(conn, t2_id, 'partos', parto, _get_device_id())
+        if not t2_ids:
             conn.close()
             flash('Error: El animal debe tener un servicio registrado primero.', 'danger')
             return redirect(url_for('principal.novillas', idx=idx, tab='partos'))
@@ -687,13 +833,9 @@ def novillas_borrar_servicio(animal_id):
     idx = request.form.get('idx', 0, type=int)
     tabla_origen = request.form.get('tabla', 'tabla2')
 
-    if tabla_origen == 'tabla2':
-        conn.execute('UPDATE tabla2 SET fecser=NULL, toro=NULL, calor=NULL WHERE id=?', (animal_id,))
-    else:
-        # Animal viene de tabla3, borrar de tabla2 por codint
-        animal = conn.execute('SELECT codint FROM tabla3 WHERE id = ?', (animal_id,)).fetchone()
-        if animal:
-            conn.execute('UPDATE tabla2 SET fecser=NULL, toro=NULL, calor=NULL WHERE codint=?', (animal['codint'],))
+    # Si viene de tabla3, se borra de sus copias en tabla2
+    for t2_id in ids_en_tabla2(conn, tabla_origen, animal_id):
+        borrar_novedad(conn, t2_id, 'servicios', _get_device_id())
 
     conn.commit()
     conn.close()
@@ -711,19 +853,9 @@ def novillas_borrar_parto(animal_id):
     idx = request.form.get('idx', 0, type=int)
     tabla_origen = request.form.get('tabla', 'tabla2')
 
-    if tabla_origen == 'tabla2':
-        conn.execute('''UPDATE tabla2 SET fecparto=NULL, tipoparto=NULL,
-                        orecria1=NULL, nomcria1=NULL, sexcria1=NULL, hacer1=NULL,
-                        orecria2=NULL, nomcria2=NULL, sexcria2=NULL, hacer2=NULL
-                        WHERE id=?''', (animal_id,))
-    else:
-        # Animal viene de tabla3, borrar de tabla2 por codint
-        animal = conn.execute('SELECT codint FROM tabla3 WHERE id = ?', (animal_id,)).fetchone()
-        if animal:
-            conn.execute('''UPDATE tabla2 SET fecparto=NULL, tipoparto=NULL,
-                            orecria1=NULL, nomcria1=NULL, sexcria1=NULL, hacer1=NULL,
-                            orecria2=NULL, nomcria2=NULL, sexcria2=NULL, hacer2=NULL
-                            WHERE codint=?''', (animal['codint'],))
+    # Si viene de tabla3, se borra de sus copias en tabla2
+    for t2_id in ids_en_tabla2(conn, tabla_origen, animal_id):
+        borrar_novedad(conn, t2_id, 'partos', _get_device_id())
 
     conn.commit()
     conn.close()
@@ -814,6 +946,21 @@ def resumen_general():
                            sanitarios=sanitarios)
 
 
+@bp.route('/principal/indicadores')
+def indicadores():
+    """Tablero de indicadores del hato (mantenidos por triggers, ver services/indicadores.py)."""
+    session_id = _get_session_id()
+    if not session_id:
+        return redirect(url_for('main.index'))
+
+    conn = get_db(session_id)
+    hato = conn.execute('SELECT * FROM tabla1 LIMIT 1').fetchone()
+    kpi = leer_indicadores(conn)
+    conn.close()
+
+    return render_template('indicadores.html', hato=hato, kpi=kpi, estado_color=ESTADO_COLOR)
+
+
 @bp.route('/principal/hato', methods=['POST'])
 def update_hato():
     """Update farm validation date, milk total, and elaborated by."""
@@ -905,10 +1052,9 @@ def update_servicios(animal_id):
     if calor == 'S':
         toro_input = 'CALOR PER'
 
-    conn.execute(
-        'UPDATE tabla2 SET fecser = ?, toro = ?, calor = ? WHERE id = ?',
-        (fecser, toro_input, calor, animal_id)
-    )
+    registrar_novedad(conn, animal_id, 'servicios',
+                      {'fecser': fecser, 'toro': toro_input, 'calor': calor},
+                      _get_device_id())
     conn.commit()
     conn.close()
 
@@ -916,7 +1062,7 @@ def update_servicios(animal_id):
         return jsonify({'success': True, 'message': 'Servicio guardado'})
 
     flash('Servicio guardado.', 'success')
-    return redirect(url_for('principal.index', idx=idx, tab='servicios'))
+    return redirect(url_for('principal.index', idx=idx, id=animal_id, tab='servicios'))
 
 
 @bp.route('/principal/animal/<int:animal_id>/secas', methods=['POST'])
@@ -940,11 +1086,11 @@ def update_secas(animal_id):
         if is_ajax:
             return jsonify({'success': False, 'message': msg}), 400
         flash(msg, 'danger')
-        return redirect(url_for('principal.index', idx=idx, tab='secas'))
+        return redirect(url_for('principal.index', idx=idx, id=animal_id, tab='secas'))
 
     fecseca = request.form.get('fecseca', '').strip() or None
 
-    conn.execute('UPDATE tabla2 SET fecseca = ? WHERE id = ?', (fecseca, animal_id))
+    registrar_novedad(conn, animal_id, 'secas', {'fecseca': fecseca}, _get_device_id())
     conn.commit()
     conn.close()
 
@@ -952,7 +1098,7 @@ def update_secas(animal_id):
         return jsonify({'success': True, 'message': 'Seca guardada'})
 
     flash('Seca guardada.', 'success')
-    return redirect(url_for('principal.index', idx=idx, tab='secas'))
+    return redirect(url_for('principal.index', idx=idx, id=animal_id, tab='secas'))
 
 
 @bp.route('/principal/animal/<int:animal_id>/chequeo', methods=['POST'])
@@ -976,12 +1122,12 @@ def update_chequeo(animal_id):
         if is_ajax:
             return jsonify({'success': False, 'message': msg}), 400
         flash(msg, 'danger')
-        return redirect(url_for('principal.index', idx=idx, tab='chequeo'))
+        return redirect(url_for('principal.index', idx=idx, id=animal_id, tab='chequeo'))
 
     fecchp = request.form.get('fecchp', '').strip() or None
     panew = request.form.get('panew', '').strip().upper() or None
 
-    conn.execute('UPDATE tabla2 SET fecchp = ?, panew = ? WHERE id = ?', (fecchp, panew, animal_id))
+    registrar_novedad(conn, animal_id, 'chequeo', {'fecchp': fecchp, 'panew': panew}, _get_device_id())
     conn.commit()
     conn.close()
 
@@ -989,7 +1135,7 @@ def update_chequeo(animal_id):
         return jsonify({'success': True, 'message': 'Chequeo guardado'})
 
     flash('Chequeo de preñez guardado.', 'success')
-    return redirect(url_for('principal.index', idx=idx, tab='chequeo'))
+    return redirect(url_for('principal.index', idx=idx, id=animal_id, tab='chequeo'))
 
 
 @bp.route('/principal/animal/<int:animal_id>/partos', methods=['POST'])
@@ -1017,7 +1163,7 @@ def update_partos(animal_id):
             if is_ajax:
                 return jsonify({'success': False, 'message': msg}), 400
             flash(msg, 'danger')
-            return redirect(url_for('principal.index', idx=idx, tab='partos'))
+            return redirect(url_for('principal.index', idx=idx, id=animal_id, tab='partos'))
 
     fecparto = request.form.get('fecparto', '').strip() or None
 
@@ -1033,7 +1179,7 @@ def update_partos(animal_id):
                 if is_ajax:
                     return jsonify({'success': False, 'message': msg}), 400
                 flash(msg, 'danger')
-                return redirect(url_for('principal.index', idx=idx, tab='partos'))
+                return redirect(url_for('principal.index', idx=idx, id=animal_id, tab='partos'))
         except ValueError:
             pass
     tipoparto = request.form.get('tipoparto', '').strip() or None
@@ -1046,14 +1192,11 @@ def update_partos(animal_id):
     sexcria2 = request.form.get('sexcria2', '').strip() or None
     hacer2 = request.form.get('hacer2', '').strip() or None
 
-    conn.execute(
-        '''UPDATE tabla2 SET fecparto=?, tipoparto=?,
-           orecria1=?, nomcria1=?, sexcria1=?, hacer1=?,
-           orecria2=?, nomcria2=?, sexcria2=?, hacer2=?
-           WHERE id=?''',
-        (fecparto, tipoparto, orecria1, nomcria1, sexcria1, hacer1,
-         orecria2, nomcria2, sexcria2, hacer2, animal_id)
-    )
+    registrar_novedad(conn, animal_id, 'partos', {
+        'fecparto': fecparto, 'tipoparto': tipoparto,
+        'orecria1': orecria1, 'nomcria1': nomcria1, 'sexcria1': sexcria1, 'hacer1': hacer1,
+        'orecria2': orecria2, 'nomcria2': nomcria2, 'sexcria2': sexcria2, 'hacer2': hacer2,
+    }, _get_device_id())
     conn.commit()
     conn.close()
 
@@ -1061,7 +1204,7 @@ def update_partos(animal_id):
         return jsonify({'success': True, 'message': 'Parto guardado'})
 
     flash('Parto guardado.', 'success')
-    return redirect(url_for('principal.index', idx=idx, tab='partos'))
+    return redirect(url_for('principal.index', idx=idx, id=animal_id, tab='partos'))
 
 
 @bp.route('/principal/animal/<int:animal_id>/salidas', methods=['POST'])
@@ -1080,8 +1223,8 @@ def update_salidas(animal_id):
     fecsale = request.form.get('fecsale', '').strip() or None
     motsale = request.form.get('motsale', '').strip() or None
 
-    conn.execute('UPDATE tabla2 SET fecsale=?, motsale=? WHERE id=?',
-                 (fecsale, motsale, animal_id))
+    registrar_novedad(conn, animal_id, 'salidas',
+                      {'fecsale': fecsale, 'motsale': motsale}, _get_device_id())
     conn.commit()
     conn.close()
 
@@ -1089,7 +1232,7 @@ def update_salidas(animal_id):
         return jsonify({'success': True, 'message': 'Salida guardada'})
 
     flash('Salida guardada.', 'success')
-    return redirect(url_for('principal.index', idx=idx, tab='salidas'))
+    return redirect(url_for('principal.index', idx=idx, id=animal_id, tab='salidas'))
 
 
 @bp.route('/principal/animal/<int:animal_id>/ordenos', methods=['POST'])
@@ -1105,27 +1248,27 @@ def update_ordenos(animal_id):
     if err:
         conn.close()
         flash(err, 'danger')
-        return redirect(url_for('principal.index', idx=idx, tab='ordenos'))
+        return redirect(url_for('principal.index', idx=idx, id=animal_id, tab='ordenos'))
     ord2, err = parsear_ordeno(request.form.get('ord2', ''))
     if err:
         conn.close()
         flash(err, 'danger')
-        return redirect(url_for('principal.index', idx=idx, tab='ordenos'))
+        return redirect(url_for('principal.index', idx=idx, id=animal_id, tab='ordenos'))
     ord3, err = parsear_ordeno(request.form.get('ord3', ''))
     if err:
         conn.close()
         flash(err, 'danger')
-        return redirect(url_for('principal.index', idx=idx, tab='ordenos'))
+        return redirect(url_for('principal.index', idx=idx, id=animal_id, tab='ordenos'))
 
     try:
-        conn.execute('UPDATE tabla2 SET ord1=?, ord2=?, ord3=? WHERE id=?',
-                     (ord1, ord2, ord3, animal_id))
+        registrar_novedad(conn, animal_id, 'ordenos',
+                          {'ord1': ord1, 'ord2': ord2, 'ord3': ord3}, _get_device_id())
         conn.commit()
     finally:
         conn.close()
 
     flash('Ordeños guardados.', 'success')
-    return redirect(url_for('principal.index', idx=idx, tab='ordenos'))
+    return redirect(url_for('principal.index', idx=idx, id=animal_id, tab='ordenos'))
 
 
 @bp.route('/principal/animal/<int:animal_id>/sanitario', methods=['POST'])
@@ -1143,7 +1286,7 @@ def update_sanitario(animal_id):
     idx = request.form.get('idx', 0, type=int)
     cart = request.form.get('cart', '').strip() or None
     try:
-        conn.execute('UPDATE tabla2 SET cart=? WHERE id=?', (cart, animal_id))
+        registrar_novedad(conn, animal_id, 'sanitario', {'cart': cart}, _get_device_id())
         conn.commit()
     finally:
         conn.close()
@@ -1152,28 +1295,21 @@ def update_sanitario(animal_id):
         return jsonify({'success': True, 'message': 'Sanitario guardado'})
 
     flash('Registro sanitario guardado.', 'success')
-    return redirect(url_for('principal.index', idx=idx, tab='sanitario'))
+    return redirect(url_for('principal.index', idx=idx, id=animal_id, tab='sanitario'))
 
 
 # ---- RUTA UNIFICADA PARA BORRAR DATOS ----
 
-# Mapeo de evento → (campos a poner en NULL, mensaje flash, tab de retorno)
+# Mapeo de evento → (campos extra a poner en NULL, mensaje flash, tab de retorno).
+# Los campos propios de cada evento estan en services.bitacora.CAMPOS_EVENTO.
 _BORRAR_CONFIG = {
-    'servicios': ('UPDATE tabla2 SET fecser=NULL, toro=NULL, calor=NULL, numser=NULL WHERE id=?',
-                  'Servicio eliminado.', 'servicios'),
-    'secas':     ('UPDATE tabla2 SET fecseca=NULL WHERE id=?',
-                  'Seca eliminada.', 'secas'),
-    'chequeo':   ('UPDATE tabla2 SET fecchp=NULL, panew=NULL WHERE id=?',
-                  'Chequeo eliminado.', 'chequeo'),
-    'partos':    ('UPDATE tabla2 SET fecparto=NULL, tipoparto=NULL, orecria1=NULL, nomcria1=NULL,'
-                  ' sexcria1=NULL, hacer1=NULL, orecria2=NULL, nomcria2=NULL, sexcria2=NULL, hacer2=NULL WHERE id=?',
-                  'Parto eliminado.', 'partos'),
-    'salidas':   ('UPDATE tabla2 SET fecsale=NULL, motsale=NULL WHERE id=?',
-                  'Salida eliminada.', 'salidas'),
-    'ordenos':   ('UPDATE tabla2 SET ord1=NULL, ord2=NULL, ord3=NULL WHERE id=?',
-                  'Ordeños eliminados.', 'ordenos'),
-    'sanitario': ('UPDATE tabla2 SET cart=NULL WHERE id=?',
-                  'Registro sanitario eliminado.', 'sanitario'),
+    'servicios': (('numser',), 'Servicio eliminado.', 'servicios'),
+    'secas':     ((), 'Seca eliminada.', 'secas'),
+    'chequeo':   ((), 'Chequeo eliminado.', 'chequeo'),
+    'partos':    ((), 'Parto eliminado.', 'partos'),
+    'salidas':   ((), 'Salida eliminada.', 'salidas'),
+    'ordenos':   ((), 'Ordeños eliminados.', 'ordenos'),
+    'sanitario': ((), 'Registro sanitario eliminado.', 'sanitario'),
 }
 
 
@@ -1189,39 +1325,76 @@ def borrar_evento(animal_id, evento):
     if not session_id:
         return redirect(url_for('main.index'))
 
-    sql, mensaje, tab = config
+    campos_extra, mensaje, tab = config
     idx = request.form.get('idx', 0, type=int)
     conn = get_db(session_id)
     try:
-        conn.execute(sql, (animal_id,))
+        borrar_novedad(conn, animal_id, evento, _get_device_id(), campos_extra)
         conn.commit()
     finally:
         conn.close()
 
     flash(mensaje, 'success')
-    return redirect(url_for('principal.index', idx=idx, tab=tab))
+    return redirect(url_for('principal.index', idx=idx, id=animal_id, tab=tab))
 
 
 @bp.route('/principal/ver-tabla')
 def ver_tabla():
-    """Vista para ver los datos de tabla2 tal cual estan en la base de datos."""
+    """Vista para ver los datos de tabla2/tabla3 tal cual estan en la base de datos.
+
+    La pagina solo trae la estructura; las filas las pide la grilla virtual
+    a /principal/api/grid/<tabla> segun lo que se ve en pantalla.
+    """
     session_id = _get_session_id()
     if not session_id:
         return redirect(url_for('main.index'))
 
+    tabla = request.args.get('tabla', 'tabla2')
+    if tabla not in TABLAS_GRID:
+        tabla = 'tabla2'
+
     conn = get_db(session_id)
     hato = conn.execute('SELECT * FROM tabla1 LIMIT 1').fetchone()
-
-    # Obtener nombres de columnas de tabla2
-    cursor = conn.execute('SELECT * FROM tabla2 LIMIT 1')
-    columnas = [description[0] for description in cursor.description]
-
-    # Obtener todos los registros
-    registros = conn.execute('SELECT * FROM tabla2 ORDER BY id').fetchall()
-
+    columnas = columnas_tabla(conn, tabla)
     conn.close()
 
     return render_template('ver_tabla.html',
                            hato=hato,
-                           columnas=columnas,
-                           registros=registros)
+                           tabla=tabla,
+                           tablas=TABLAS_GRID,
+                           columnas=columnas)
+
+
+@bp.route('/principal/api/grid/<tabla>')
+def api_grid(tabla):
+    """Pagina de la grilla de ver_tabla (keyset, orden, filtros y columnas)."""
+    session_id = _get_session_id()
+    if not session_id:
+        return jsonify({'success': False, 'error': 'Sin sesión activa'}), 401
+    if tabla not in TABLAS_GRID:
+        return jsonify({'success': False, 'error': 'Tabla no valida'}), 404
+
+    cursor = None
+    if request.args.get('cursor'):
+        cursor = decodificar_cursor(request.args['cursor'])
+        if cursor is None:
+            return jsonify({'success': False, 'error': 'Cursor no valido'}), 400
+
+    columnas = [c for c in request.args.get('cols', '').split(',') if c]
+    filtros = {k[2:]: v for k, v in request.args.items() if k.startswith('f_')}
+
+    conn = get_db(session_id)
+    try:
+        pagina = consultar_grid(
+            conn, tabla,
+            columnas=columnas,
+            orden=request.args.get('orden', 'id'),
+            desc=request.args.get('desc', '0') == '1',
+            filtros=filtros,
+            cursor=cursor,
+            limite=request.args.get('limite', LIMITE_DEFECTO, type=int),
+        )
+    finally:
+        conn.close()
+
+    return jsonify({'success': True, 'tabla': tabla, **pagina})
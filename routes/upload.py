@@ -1,12 +1,10 @@
 import os
-import zipfile
-import tempfile
-import shutil
+import io
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session, send_file
 import config
 from services.file_utils import validate_upload_set, detect_table_number
 from services.dbf_import import import_dbf_files
-from services.dbf_export import export_all_tables
+from services.dbf_export import export_all_tables_zip
 from models.database import set_session_device, session_exists_by_prefix
 
 bp = Blueprint('upload', __name__)
@@ -99,31 +97,14 @@ def export_files():
         flash('No hay sesion activa para exportar.', 'danger')
         return redirect(url_for('main.index'))
 
-    # Create temporary directory for export
-    temp_dir = tempfile.mkdtemp()
-
     try:
-        # Export tables to DBF
-        result = export_all_tables(session_id, temp_dir)
-        prefix = result['prefix']
-        farm_name = result['farm_name']
-
-        # Create ZIP file in memory
-        import io
+        # Los DBF se escriben directo dentro del ZIP, en memoria
         zip_buffer = io.BytesIO()
-
-        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            zipf.write(result['tabla1'], os.path.basename(result['tabla1']))
-            zipf.write(result['tabla2'], os.path.basename(result['tabla2']))
-            zipf.write(result['tabla3'], os.path.basename(result['tabla3']))
-
+        result = export_all_tables_zip(session_id, zip_buffer)
         zip_buffer.seek(0)
 
-        # Clean up temp directory
-        shutil.rmtree(temp_dir, ignore_errors=True)
-
         # Send file for download
-        zip_filename = f'{prefix}_{farm_name}.zip'
+        zip_filename = f'{result["prefix"]}_{result["farm_name"]}.zip'
         return send_file(
             zip_buffer,
             mimetype='application/zip',
@@ -132,7 +113,5 @@ def export_files():
         )
 
     except Exception as e:
-        # Clean up on error
-        shutil.rmtree(temp_dir, ignore_errors=True)
         flash(f'Error al exportar: {str(e)}', 'danger')
         return redirect(url_for('principal.index'))
@@ -0,0 +1,299 @@
+"""
+services/archivo.py
+Archivo de sesiones frias. Una sesion sin accesos en ARCHIVO_INACTIVIDAD_DIAS
+se copia con la API de backup (incluye el WAL), se comprime con gzip en
+DATA_FOLDER/archivo/session_<id>.db.gz y su catalogo (los datos que muestra
+list_sessions) queda al lado en session_<id>.json, asi el listado no necesita
+descomprimirla. get_db la restaura al abrirla (al activarla con
+select_session o desde cualquier otra ruta).
+
+El ultimo acceso se marca con la fecha de modificacion de
+DATA_FOLDER/.accesos/<id>, tocada por las solicitudes con esa sesion activa.
+No se usa la fecha de la base porque el mantenimiento la modifica.
+
+Las restauraciones quedan en archivo/restauraciones.log (una linea JSON con
+la duracion) para resumen_archivo().
+"""
+import gzip
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import time
+from datetime import datetime
+from urllib.request import pathname2url
+
+import config
+from models.database import get_db_path, get_disk_path, get_archive_path, leer_catalogo
+from services.helpers import get_session_id
+
+logger = logging.getLogger(__name__)
+
+# Las solicitudes tocan la marca de acceso a lo sumo cada TOQUE_SEGUNDOS
+TOQUE_SEGUNDOS = 600
+RESTAURACIONES_MAXIMO = 500
+
+
+def carpeta_archivo():
+    return os.path.dirname(get_archive_path(''))
+
+
+def _ruta_catalogo(session_id):
+    return os.path.join(carpeta_archivo(), f'session_{session_id}.json')
+
+
+def _ruta_acceso(session_id):
+    return os.path.join(config.DATA_FOLDER, '.accesos', session_id)
+
+
+def _ruta_restauraciones():
+    return os.path.join(carpeta_archivo(), 'restauraciones.log')
+
+
+def registrar_acceso(session_id, ahora=None):
+    """Marca el acceso a la sesion (como mucho una escritura cada TOQUE_SEGUNDOS)."""
+    ahora = ahora or time.time()
+    ruta = _ruta_acceso(session_id)
+    try:
+        if ahora - os.path.getmtime(ruta) < TOQUE_SEGUNDOS:
+            return
+    except OSError:
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        open(ruta, 'a').close()
+    os.utime(ruta, (ahora, ahora))
+
+
+def ultimo_acceso(session_id):
+    """Epoch del ultimo acceso. Sin marca (sesiones anteriores) se toma la
+    fecha de la base y se deja la marca con ese valor."""
+    ruta = _ruta_acceso(session_id)
+    try:
+        return os.path.getmtime(ruta)
+    except OSError:
+        pass
+    db_path = get_db_path(session_id)
+    if not os.path.exists(db_path):
+        return 0
+    fecha = max(os.path.getmtime(p) for p in (db_path, db_path + '-wal') if os.path.exists(p))
+    registrar_acceso(session_id, fecha)
+    return fecha
+
+
+def sesiones_archivadas():
+    carpeta = carpeta_archivo()
+    if not os.path.isdir(carpeta):
+        return []
+    return [f[8:-6] for f in os.listdir(carpeta) if f.startswith('session_') and f.endswith('.db.gz')]
+
+
+def leer_archivada(session_id):
+    """Catalogo y estadisticas guardados al archivar la sesion (o None)."""
+    try:
+        with open(_ruta_catalogo(session_id), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def archivar_sesion(session_id):
+    """
+    Comprime la sesion y elimina la base. Retorna las estadisticas guardadas
+    junto al catalogo, o None si la sesion no se pudo archivar (alguien esta
+    escribiendo en ella, sesion caliente o sin session_meta).
+
+    Todo ocurre con el bloqueo de escritura tomado (BEGIN IMMEDIATE en una
+    conexion aparte): la copia comprimida incluye el WAL y la base se borra
+    recien con el archivo y el catalogo completos, asi get_db encuentra
+    siempre la base o el archivo terminado. Una conexion abierta antes que
+    intente escribir recibe SesionMovida (models/escritura.py) y la
+    solicitud reintentada restaura el archivo.
+    """
+    inicio = time.perf_counter()
+    db_path = get_disk_path(session_id)
+    if get_db_path(session_id) != db_path:
+        return None  # sesion caliente (services/caliente.py): esta en uso
+    catalogo = leer_catalogo(session_id)
+    if catalogo is None:
+        return None
+
+    os.makedirs(carpeta_archivo(), exist_ok=True)
+    destino = get_archive_path(session_id)
+    copia = f'{destino}.{os.getpid()}.db'
+    temporal = f'{destino}.{os.getpid()}.tmp'
+    try:
+        guardia = sqlite3.connect(f'file:{pathname2url(db_path)}?mode=rw', uri=True,
+                                  timeout=1, isolation_level=None)
+    except sqlite3.OperationalError:
+        return None  # ya no esta en disco
+    try:
+        try:
+            guardia.execute('BEGIN IMMEDIATE')
+        except sqlite3.OperationalError:
+            return None
+        if not os.path.exists(db_path):
+            return None  # otro proceso la archivo mientras se esperaba el bloqueo
+        # backup no lee desde la conexion que tiene el bloqueo
+        fuente = sqlite3.connect(db_path)
+        instantanea = sqlite3.connect(copia)
+        try:
+            fuente.backup(instantanea)
+        finally:
+            instantanea.close()
+            fuente.close()
+        with open(copia, 'rb') as origen, gzip.open(temporal, 'wb', compresslevel=6) as comprimido:
+            shutil.copyfileobj(origen, comprimido, 1024 * 1024)
+        os.replace(temporal, destino)
+
+        estadisticas = {
+            'catalogo': catalogo,
+            'archivada': datetime.now().isoformat(timespec='seconds'),
+            'ultimo_acceso': datetime.fromtimestamp(ultimo_acceso(session_id)).isoformat(timespec='seconds'),
+            'bytes_db': os.path.getsize(copia),
+            'bytes_gz': os.path.getsize(destino),
+        }
+        # El catalogo se escribe antes de borrar la base: la sesion nunca
+        # desaparece del listado
+        temporal_catalogo = _ruta_catalogo(session_id) + '.tmp'
+        with open(temporal_catalogo, 'w', encoding='utf-8') as f:
+            json.dump(estadisticas, f, ensure_ascii=False)
+        os.replace(temporal_catalogo, _ruta_catalogo(session_id))
+        # La base al final: sin ella get_db restaura el archivo, y una
+        # restauracion no debe encontrar un WAL viejo junto a la base nueva
+        for suffix in ('-wal', '-shm', ''):
+            try:
+                os.remove(db_path + suffix)
+            except FileNotFoundError:
+                pass
+    finally:
+        guardia.close()
+        for ruta in (copia, temporal):
+            if os.path.exists(ruta):
+                os.remove(ruta)
+    estadisticas['segundos'] = round(time.perf_counter() - inicio, 3)
+    logger.info('Sesion %s archivada: %d -> %d bytes', session_id,
+                estadisticas['bytes_db'], estadisticas['bytes_gz'])
+    return estadisticas
+
+
+def restaurar_sesion(session_id):
+    """
+    Descomprime una sesion archivada en su ruta normal. Si dos procesos la
+    restauran a la vez, os.link deja una sola copia. Retorna los segundos
+    que tomo, o None si no estaba archivada.
+    """
+    origen = get_archive_path(session_id)
+    db_path = get_disk_path(session_id)
+    if not os.path.exists(origen):
+        return None
+    inicio = time.perf_counter()
+    temporal = f'{db_path}.{os.getpid()}.tmp'
+    try:
+        try:
+            with gzip.open(origen, 'rb') as comprimido, open(temporal, 'wb') as destino:
+                shutil.copyfileobj(comprimido, destino, 1024 * 1024)
+            os.link(temporal, db_path)
+        except (FileExistsError, FileNotFoundError):
+            if os.path.exists(db_path):
+                return None  # otro proceso la restauro primero
+            raise
+    finally:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+    for ruta in (origen, _ruta_catalogo(session_id)):
+        try:
+            os.remove(ruta)
+        except FileNotFoundError:
+            pass
+    segundos = time.perf_counter() - inicio
+    registrar_acceso(session_id)
+    _anotar_restauracion(session_id, segundos, os.path.getsize(db_path))
+    logger.info('Sesion %s restaurada en %.3f s', session_id, segundos)
+    return segundos
+
+
+def _anotar_restauracion(session_id, segundos, bytes_db):
+    ruta = _ruta_restauraciones()
+    with open(ruta, 'a', encoding='utf-8') as f:
+        f.write(json.dumps({
+            'session_id': session_id, 'fecha': datetime.now().isoformat(timespec='seconds'),
+            'segundos': round(segundos, 4), 'bytes_db': bytes_db,
+        }) + '\n')
+    # El log crece con cada restauracion: se recorta de vez en cuando
+    if os.path.getsize(ruta) > RESTAURACIONES_MAXIMO * 200:
+        lineas = open(ruta, encoding='utf-8').readlines()[-RESTAURACIONES_MAXIMO // 2:]
+        with open(ruta + '.tmp', 'w', encoding='utf-8') as f:
+            f.writelines(lineas)
+        os.replace(ruta + '.tmp', ruta)
+
+
+def leer_restauraciones():
+    try:
+        with open(_ruta_restauraciones(), encoding='utf-8') as f:
+            return [json.loads(linea) for linea in f if linea.strip()]
+    except (OSError, ValueError):
+        return []
+
+
+def pendientes_archivo(ahora=None):
+    """Sesiones en disco sin accesos en ARCHIVO_INACTIVIDAD_DIAS, la mas antigua primero."""
+    if config.ARCHIVO_INACTIVIDAD_DIAS <= 0 or not os.path.isdir(config.DATA_FOLDER):
+        return []
+    ahora = ahora or time.time()
+    limite = config.ARCHIVO_INACTIVIDAD_DIAS * 86400
+    candidatas = []
+    for f in os.listdir(config.DATA_FOLDER):
+        if f.startswith('session_') and f.endswith('.db'):
+            acceso = ultimo_acceso(f[8:-3])
+            if ahora - acceso >= limite:
+                candidatas.append((acceso, f[8:-3]))
+    return [s for _, s in sorted(candidatas)]
+
+
+def archivar_inactivas(limite=None, hasta=None):
+    """Archiva hasta `limite` sesiones frias; con `hasta` (time.monotonic) no
+    empieza otra pasado ese momento. Retorna {session_id: estadisticas}."""
+    resultados = {}
+    for session_id in pendientes_archivo()[:limite]:
+        if hasta is not None and time.monotonic() >= hasta:
+            break
+        try:
+            estadisticas = archivar_sesion(session_id)
+        except Exception as e:
+            logger.warning('No se pudo archivar sesion %s: %s', session_id, e)
+            continue
+        if estadisticas:
+            resultados[session_id] = estadisticas
+    return resultados
+
+
+def resumen_archivo():
+    """Totales del archivo: sesiones, bytes originales y comprimidos, y
+    latencia de las restauraciones registradas."""
+    archivadas = [a for a in (leer_archivada(s) for s in sesiones_archivadas()) if a]
+    restauraciones = leer_restauraciones()
+    tiempos = sorted(r['segundos'] for r in restauraciones)
+    bytes_db = sum(a['bytes_db'] for a in archivadas)
+    bytes_gz = sum(a['bytes_gz'] for a in archivadas)
+    return {
+        'sesiones': len(archivadas),
+        'bytes_db': bytes_db,
+        'bytes_gz': bytes_gz,
+        'ahorro': bytes_db - bytes_gz,
+        'restauraciones': len(tiempos),
+        'restauracion_media': sum(tiempos) / len(tiempos) if tiempos else 0.0,
+        'restauracion_max': tiempos[-1] if tiempos else 0.0,
+    }
+
+
+def instalar_archivo(app):
+    """Marca el acceso a la sesion activa en cada solicitud."""
+
+    @app.before_request
+    def _registrar_acceso():
+        session_id = get_session_id()
+        if session_id:
+            try:
+                registrar_acceso(session_id)
+            except OSError as e:
+                logger.warning('No se pudo marcar acceso de sesion %s: %s', session_id, e)
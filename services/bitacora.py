@@ -0,0 +1,169 @@
+"""
+services/bitacora.py
+Bitacora append-only de novedades. Cada captura o borrado de una novedad se
+aplica sobre tabla2 (estado actual materializado) y se anota en la tabla
+bitacora, para que sincronizacion, deshacer y exportaciones incrementales lean
+solo la cola de cambios en vez de recorrer todo el hato.
+"""
+import json
+
+# Evento → columnas de tabla2 que materializan la novedad
+CAMPOS_EVENTO = {
+    'servicios': ('fecser', 'toro', 'calor'),
+    'secas': ('fecseca',),
+    'chequeo': ('fecchp', 'panew'),
+    'partos': ('fecparto', 'tipoparto',
+               'orecria1', 'nomcria1', 'sexcria1', 'hacer1',
+               'orecria2', 'nomcria2', 'sexcria2', 'hacer2'),
+    'salidas': ('fecsale', 'motsale'),
+    'ordenos': ('ord1', 'ord2', 'ord3'),
+    'sanitario': ('cart',),
+}
+
+
+def _anotar(conn, animal_id, evento, accion, valores, device_id):
+    conn.execute(
+        'INSERT INTO bitacora (animal_id, evento, accion, valores, device_id) VALUES (?, ?, ?, ?, ?)',
+        (animal_id, evento, accion,
+         json.dumps(valores, ensure_ascii=False) if valores is not None else None,
+         device_id)
+    )
+
+
+def registrar_novedad(conn, animal_id, evento, valores, device_id=None):
+    """
+    Aplica una novedad sobre tabla2 y la anota en la bitacora.
+    `valores` puede traer solo una parte de las columnas del evento
+    (ej. auto-guardado de un solo ordeño). No hace commit.
+    Retorna True si el animal existe y se actualizo.
+    """
+    campos = CAMPOS_EVENTO[evento]
+    invalidos = set(valores) - set(campos)
+    if invalidos:
+        raise ValueError(f'Campos no validos para {evento}: {", ".join(sorted(invalidos))}')
+
+    asignaciones = ', '.join(f'{c} = ?' for c in valores)
+    cur = conn.execute(
+        f'UPDATE tabla2 SET {asignaciones} WHERE id = ?',
+        (*valores.values(), animal_id)
+    )
+    if cur.rowcount == 0:
+        return False
+    _anotar(conn, animal_id, evento, 'set', valores, device_id)
+    return True
+
+
+def registrar_novedad_grupo(conn, evento, filas, condicion='1', device_id=None):
+    """
+    Aplica una novedad a varios animales con una sola sentencia UPDATE (mas un
+    INSERT en la bitacora), en vez de una por animal.
+    `filas` es {animal_id: {columna: valor}}, con las mismas columnas en todas.
+    `condicion` es una expresion SQL sobre tabla2 con la regla del evento
+    (ej. "estado IN ('1', '2')"); los animales que no la cumplen se omiten.
+    No debe usar `id` sin calificar (json_each tambien tiene una columna id).
+    No hace commit. Retorna el numero de animales actualizados.
+    """
+    if not filas:
+        return 0
+    columnas = next(iter(filas.values())).keys()
+    invalidos = set(columnas) - set(CAMPOS_EVENTO[evento])
+    if invalidos:
+        raise ValueError(f'Campos no validos para {evento}: {", ".join(sorted(invalidos))}')
+
+    payload = json.dumps({str(int(k)): v for k, v in filas.items()}, ensure_ascii=False)
+
+    # La bitacora se escribe primero: la condicion se evalua sobre el estado
+    # anterior, igual que en el UPDATE.
+    conn.execute(f'''
+        INSERT INTO bitacora (animal_id, evento, accion, valores, device_id)
+        SELECT tabla2.id, ?, 'set', j.value, ?
+        FROM json_each(?) AS j
+        JOIN tabla2 ON tabla2.id = CAST(j.key AS INTEGER)
+        WHERE {condicion}
+    ''', (evento, device_id, payload))
+
+    asignaciones = ', '.join(f"{c} = json_extract(j.value, '$.{c}')" for c in columnas)
+    cur = conn.execute(f'''
+        UPDATE tabla2 SET {asignaciones}
+        FROM json_each(?) AS j
+        WHERE tabla2.id = CAST(j.key AS INTEGER) AND ({condicion})
+    ''', (payload,))
+    return cur.rowcount
+
+
+def borrar_novedad(conn, animal_id, evento, device_id=None, campos_extra=()):
+    """
+    Pone en NULL las columnas del evento (y `campos_extra`, ej. numser al
+    borrar un servicio desde Captura) y anota el borrado. No hace commit.
+    """
+    campos = CAMPOS_EVENTO[evento] + tuple(campos_extra)
+    asignaciones = ', '.join(f'{c} = NULL' for c in campos)
+    cur = conn.execute(f'UPDATE tabla2 SET {asignaciones} WHERE id = ?', (animal_id,))
+    if cur.rowcount == 0:
+        return False
+    _anotar(conn, animal_id, evento, 'clear', None, device_id)
+    return True
+
+
+def leer_bitacora(conn, desde_seq=0, limite=500):
+    """Retorna las entradas con seq > desde_seq, en orden de captura."""
+    filas = conn.execute(
+        'SELECT seq, animal_id, evento, accion, valores, device_id, ts'
+        ' FROM bitacora WHERE seq > ? ORDER BY seq LIMIT ?',
+        (desde_seq, limite)
+    ).fetchall()
+    entradas = []
+    for f in filas:
+        entrada = dict(f)
+        entrada['valores'] = json.loads(f['valores']) if f['valores'] else None
+        entradas.append(entrada)
+    return entradas
+
+
+def ultimo_seq(conn):
+    """Ultimo seq anotado (0 si la bitacora esta vacia)."""
+    return conn.execute('SELECT COALESCE(MAX(seq), 0) FROM bitacora').fetchone()[0]
+
+
+def compactar_bitacora(conn, hasta_seq=None):
+    """
+    Elimina las entradas reemplazadas por otras posteriores del mismo animal
+    y evento. Se compara por columna: un 'set' parcial (ej. {ord1} y luego
+    {ord2} del auto-guardado) solo se elimina cuando cada una de sus columnas
+    fue reescrita o borrada despues; un 'clear' cuando hay otro 'clear'
+    posterior o todas las columnas del evento se reescribieron.
+    Solo toca entradas con seq <= hasta_seq (el cursor mas antiguo que algun
+    consumidor aun necesita); por defecto compacta toda la bitacora.
+    Retorna el numero de entradas eliminadas. No hace commit.
+    """
+    if hasta_seq is None:
+        hasta_seq = ultimo_seq(conn)
+    # Una columna de la entrada sigue vigente si ninguna entrada posterior la
+    # reescribe ('set' con esa clave) ni la borra ('clear')
+    vigente = '''
+        NOT EXISTS (
+            SELECT 1 FROM bitacora b2
+            WHERE b2.animal_id = bitacora.animal_id
+              AND b2.evento = bitacora.evento
+              AND b2.seq > bitacora.seq
+              AND (b2.accion = 'clear' OR json_type(b2.valores, '$.' || c.{campo}) IS NOT NULL)
+        )
+    '''
+    eliminadas = conn.execute(f'''
+        DELETE FROM bitacora
+        WHERE seq <= ? AND accion = 'set'
+          AND NOT EXISTS (
+              SELECT 1 FROM json_each(bitacora.valores) AS c
+              WHERE {vigente.format(campo='key')}
+          )
+    ''', (hasta_seq,)).rowcount
+    for evento, campos in CAMPOS_EVENTO.items():
+        eliminadas += conn.execute(f'''
+            DELETE FROM bitacora
+            WHERE seq <= ? AND accion = 'clear' AND evento = ?
+              AND NOT EXISTS (
+                  SELECT 1 FROM json_each(?) AS c
+                  WHERE {vigente.format(campo='value')}
+              )
+        ''', (hasta_seq, evento, json.dumps(campos))).rowcount
+    return eliminadas
@@ -0,0 +1,141 @@
+"""
+services/busqueda.py
+Busqueda de animales sobre el indice FTS5 animales_fts (nombre, orejera,
+codint, registro de tabla2 y tabla3) y calculo del indice de navegacion de
+cada resultado, para no tener que enviar el listado completo del hato.
+
+La navegacion de Captura (tabla2 ORDER BY nombre, id) va por keyset desde el
+animal actual, como la grilla (services/grid.py): cada vecino es una busqueda
+en idx_tabla2_nombre (nombre, rowid), no un OFFSET que recorre el indice
+hasta la posicion.
+"""
+import re
+
+from services.novillas import posiciones_novillas
+
+LIMITE_RESULTADOS = 20
+
+
+def _consulta_fts(texto):
+    """Convierte el texto del usuario en una consulta FTS5 de prefijos (AND)."""
+    terminos = re.findall(r'\w+', texto or '')
+    return ' '.join(f'"{t}"*' for t in terminos)
+
+
+def posiciones_captura(conn, ids):
+    """
+    {id: indice en la navegacion de Captura} para los animales de tabla2
+    dados, con una sola pasada de ROW_NUMBER() sobre idx_tabla2_nombre.
+    """
+    if not ids:
+        return {}
+    marcas = ', '.join('?' * len(ids))
+    return dict(conn.execute(f'''
+        SELECT id, idx FROM (
+            SELECT id, ROW_NUMBER() OVER (ORDER BY nombre, id) - 1 AS idx FROM tabla2
+        )
+        WHERE id IN ({marcas})
+    ''', list(ids)).fetchall())
+
+
+def _tramos_vecino(animal, paso):
+    """
+    Consultas (WHERE, params, ORDER BY) que, probadas en orden, dan el animal
+    siguiente (paso > 0) o anterior en ORDER BY nombre, id. Cada una es un
+    rango de idx_tabla2_nombre; el OR de _condicion_cursor de la grilla
+    recorreria el indice desde el principio. NULL ordena primero.
+    """
+    nombre, animal_id = animal['nombre'], animal['id']
+    if paso > 0:
+        if nombre is None:
+            return [('nombre IS NULL AND id > ?', [animal_id], 'id'),
+                    ('nombre IS NOT NULL', [], 'nombre, id')]
+        return [('nombre = ? AND id > ?', [nombre, animal_id], 'id'),
+                ('nombre > ?', [nombre], 'nombre, id')]
+    if nombre is None:
+        return [('nombre IS NULL AND id < ?', [animal_id], 'id DESC')]
+    return [('nombre = ? AND id < ?', [nombre, animal_id], 'id DESC'),
+            ('nombre < ?', [nombre], 'nombre DESC, id DESC'),
+            ('nombre IS NULL', [], 'id DESC')]
+
+
+def vecino_captura(conn, animal, paso):
+    """Id del animal siguiente (paso > 0) o anterior al dado; None en el borde."""
+    for where, params, orden in _tramos_vecino(animal, paso):
+        row = conn.execute(
+            f'SELECT id FROM tabla2 WHERE {where} ORDER BY {orden} LIMIT 1', params
+        ).fetchone()
+        if row:
+            return row['id']
+    return None
+
+
+def navegacion_captura(conn, animal):
+    """Ids de destino de los botones Primero, Anterior, Proximo y Ultimo."""
+    return {
+        'primero': conn.execute('SELECT id FROM tabla2 ORDER BY nombre, id LIMIT 1').fetchone()['id'],
+        'anterior': vecino_captura(conn, animal, -1),
+        'siguiente': vecino_captura(conn, animal, 1),
+        'ultimo': conn.execute(
+            'SELECT id FROM tabla2 ORDER BY nombre DESC, id DESC LIMIT 1').fetchone()['id'],
+    }
+
+
+def animal_captura(conn, idx, animal_id=None):
+    """
+    Animal a mostrar en Captura: por id cuando la navegacion lo trae (botones,
+    busqueda); por OFFSET solo para enlaces con idx y sin id, o si el animal
+    ya no existe.
+    """
+    if animal_id is not None:
+        animal = conn.execute('SELECT * FROM tabla2 WHERE id = ?', (animal_id,)).fetchone()
+        if animal:
+            return animal
+    return conn.execute(
+        'SELECT * FROM tabla2 ORDER BY nombre, id LIMIT 1 OFFSET ?', (idx,)
+    ).fetchone()
+
+
+def buscar_animales(conn, texto, limite=LIMITE_RESULTADOS):
+    """
+    Retorna los animales que coinciden con `texto`, ordenados por relevancia.
+    Cada resultado incluye la tabla de origen y su indice de navegacion:
+    en Captura para tabla2, en Novillas para novillas de tabla3 (None si el
+    animal de tabla3 no es novilla y por tanto no es navegable).
+    """
+    consulta = _consulta_fts(texto)
+    if not consulta:
+        return []
+
+    filas = conn.execute('''
+        SELECT rowid FROM animales_fts
+        WHERE animales_fts MATCH ?
+        ORDER BY rank
+        LIMIT ?
+    ''', (consulta, limite)).fetchall()
+
+    posiciones = posiciones_captura(conn, [f['rowid'] for f in filas if f['rowid'] > 0])
+    posiciones_t3 = posiciones_novillas(conn, 'tabla3', [-f['rowid'] for f in filas if f['rowid'] < 0])
+    resultados = []
+    for f in filas:
+        tabla = 'tabla2' if f['rowid'] > 0 else 'tabla3'
+        animal = conn.execute(
+            f'SELECT id, codint, orejera, nombre, registro, estado FROM {tabla} WHERE id = ?',
+            (abs(f['rowid']),)
+        ).fetchone()
+        if not animal:
+            continue
+        if tabla == 'tabla2':
+            idx = posiciones.get(animal['id'])
+        else:
+            idx = posiciones_t3.get(animal['id'])
+        resultados.append({
+            'tabla': tabla,
+            'id': animal['id'],
+            'codint': animal['codint'] or '',
+            'orejera': animal['orejera'] or '',
+            'nombre': animal['nombre'] or '',
+            'registro': animal['registro'] or '',
+            'idx': idx,
+        })
+    return resultados
@@ -0,0 +1,207 @@
+"""
+services/cache.py
+Cache compartido por los procesos de Passenger en el mismo equipo, sin
+servicios externos: una base SQLite en DATA_FOLDER/.cache.db (WAL, asi los
+lectores no se bloquean entre si).
+
+Cada entrada vive en un espacio (p. ej. 'fragmento', 'federacion:novedades')
+y puede llevar la sesion y su version de datos (sync_version, ver
+services/sync.py): al leerla con otra version cuenta como invalidada, asi
+cualquier escritura en la sesion, desde cualquier proceso, invalida sus
+entradas sin borrarlas una por una. Ademas expiran tras su TTL.
+
+Aciertos, fallos e invalidaciones se acumulan en el proceso y se suman a
+cache_estadisticas al cerrar una respuesta cada CACHE_ESTADISTICAS_SEG
+segundos o CACHE_ESTADISTICAS_SOLICITUDES solicitudes (lo que ocurra
+primero), y al salir del proceso; se ven en /metrics y con `flask cache`.
+Si la base del cache falla, todo se comporta como un fallo y la solicitud
+sigue sin cache.
+"""
+import atexit
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+import config
+
+logger = logging.getLogger(__name__)
+
+ESQUEMA_SQL = """
+CREATE TABLE IF NOT EXISTS cache (
+    espacio TEXT NOT NULL,
+    clave TEXT NOT NULL,
+    session_id TEXT,
+    version INTEGER,
+    creado REAL NOT NULL,
+    expira REAL NOT NULL,
+    valor TEXT NOT NULL,
+    PRIMARY KEY (espacio, clave)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_cache_sesion ON cache(session_id) WHERE session_id IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_cache_expira ON cache(expira);
+
+CREATE TABLE IF NOT EXISTS cache_estadisticas (
+    espacio TEXT PRIMARY KEY,
+    aciertos INTEGER NOT NULL DEFAULT 0,
+    fallos INTEGER NOT NULL DEFAULT 0,
+    invalidados INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+"""
+
+_local = threading.local()
+_pendientes = {}  # espacio -> [aciertos, fallos, invalidados] sin guardar
+_pendientes_lock = threading.Lock()
+# Solicitudes cerradas y proximo guardado por tiempo desde el ultimo guardado
+_solicitudes = 0
+_proximo_guardado = 0.0
+
+
+def ruta_cache():
+    return os.path.join(config.DATA_FOLDER, '.cache.db')
+
+
+def _conexion():
+    """Conexion del hilo a la base del cache (se crea la primera vez)."""
+    conn = getattr(_local, 'conn', None)
+    if conn is None or getattr(_local, 'ruta', None) != ruta_cache():
+        conn = sqlite3.connect(ruta_cache(), timeout=2, isolation_level=None)
+        conn.execute('PRAGMA journal_mode = WAL')
+        conn.execute('PRAGMA synchronous = OFF')  # es un cache: se puede perder
+        conn.executescript(ESQUEMA_SQL)
+        _local.conn, _local.ruta = conn, ruta_cache()
+    return conn
+
+
+def _contar(espacio, indice):
+    with _pendientes_lock:
+        _pendientes.setdefault(espacio, [0, 0, 0])[indice] += 1
+
+
+def obtener(espacio, clave, version=None):
+    """Valor guardado o None si no esta, expiro o su version no es `version`."""
+    if not config.CACHE_ACTIVO:
+        return None
+    try:
+        fila = _conexion().execute(
+            'SELECT version, expira, valor FROM cache WHERE espacio = ? AND clave = ?',
+            (espacio, clave)).fetchone()
+    except sqlite3.Error as e:
+        logger.warning('Cache no disponible: %s', e)
+        return None
+    if fila is None:
+        _contar(espacio, 1)
+        return None
+    guardada, expira, valor = fila
+    if expira < time.time() or (version is not None and guardada != version):
+        _contar(espacio, 2)
+        return None
+    _contar(espacio, 0)
+    return json.loads(valor)
+
+
+def guardar(espacio, clave, valor, session_id=None, version=None, ttl=None):
+    """Guarda un valor serializable como JSON (reemplaza el anterior)."""
+    if not config.CACHE_ACTIVO:
+        return
+    ahora = time.time()
+    try:
+        _conexion().execute(
+            'INSERT OR REPLACE INTO cache (espacio, clave, session_id, version, creado, expira, valor)'
+            ' VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (espacio, clave, session_id, version, ahora, ahora + (ttl or config.CACHE_TTL_SEG),
+             json.dumps(valor, ensure_ascii=False, separators=(',', ':'))))
+    except sqlite3.Error as e:
+        logger.warning('No se pudo guardar en cache %s: %s', espacio, e)
+
+
+def olvidar_sesion(session_id):
+    """Elimina las entradas de una sesion (al eliminarla)."""
+    try:
+        _conexion().execute('DELETE FROM cache WHERE session_id = ?', (session_id,))
+    except sqlite3.Error as e:
+        logger.warning('No se pudo limpiar cache de sesion %s: %s', session_id, e)
+
+
+def purgar(maximo=None):
+    """Elimina las entradas vencidas y, si quedan mas de `maximo`, las mas
+    antiguas. Retorna las entradas eliminadas."""
+    maximo = maximo or config.CACHE_MAX_ENTRADAS
+    conn = _conexion()
+    eliminadas = conn.execute('DELETE FROM cache WHERE expira < ?', (time.time(),)).rowcount
+    eliminadas += conn.execute('''
+        DELETE FROM cache WHERE (espacio, clave) IN (
+            SELECT espacio, clave FROM cache ORDER BY creado DESC LIMIT -1 OFFSET ?
+        )''', (maximo,)).rowcount
+    return eliminadas
+
+
+def guardar_estadisticas():
+    """Suma a cache_estadisticas lo acumulado por el proceso."""
+    global _solicitudes, _proximo_guardado
+    with _pendientes_lock:
+        pendientes = dict(_pendientes)
+        _pendientes.clear()
+        _solicitudes = 0
+        _proximo_guardado = time.time() + config.CACHE_ESTADISTICAS_SEG
+    if not pendientes:
+        return
+    try:
+        _conexion().executemany('''
+            INSERT INTO cache_estadisticas (espacio, aciertos, fallos, invalidados) VALUES (?, ?, ?, ?)
+            ON CONFLICT(espacio) DO UPDATE SET aciertos = aciertos + excluded.aciertos,
+                fallos = fallos + excluded.fallos, invalidados = invalidados + excluded.invalidados
+        ''', [(espacio, *cuentas) for espacio, cuentas in pendientes.items()])
+    except sqlite3.Error as e:
+        logger.warning('No se pudieron guardar estadisticas del cache: %s', e)
+
+
+# Los comandos de flask no cierran respuestas: guardan lo pendiente al salir
+atexit.register(guardar_estadisticas)
+
+
+def _revisar_estadisticas():
+    """Llamado al cerrar cada respuesta: guarda si ya toca."""
+    global _solicitudes
+    with _pendientes_lock:
+        _solicitudes += 1
+        toca = (_solicitudes >= config.CACHE_ESTADISTICAS_SOLICITUDES
+                or time.time() >= _proximo_guardado)
+    if toca:
+        guardar_estadisticas()
+
+
+def estadisticas():
+    """[{espacio, aciertos, fallos, invalidados, tasa, entradas}] de todos los procesos."""
+    guardar_estadisticas()
+    conn = _conexion()
+    entradas = dict(conn.execute('SELECT espacio, COUNT(*) FROM cache GROUP BY espacio').fetchall())
+    resultado = []
+    for espacio, aciertos, fallos, invalidados in conn.execute(
+            'SELECT espacio, aciertos, fallos, invalidados FROM cache_estadisticas ORDER BY espacio'):
+        total = aciertos + fallos + invalidados
+        resultado.append({
+            'espacio': espacio, 'aciertos': aciertos, 'fallos': fallos, 'invalidados': invalidados,
+            'tasa': aciertos / total if total else 0.0, 'entradas': entradas.get(espacio, 0),
+        })
+    return resultado
+
+
+def vaciar():
+    conn = _conexion()
+    conn.execute('DELETE FROM cache')
+    conn.execute('DELETE FROM cache_estadisticas')
+
+
+def instalar_cache(app):
+    """Guarda periodicamente las estadisticas del proceso al cerrar las respuestas."""
+    if not config.CACHE_ACTIVO:
+        return
+
+    @app.after_request
+    def _programar_estadisticas(response):
+        response.call_on_close(_revisar_estadisticas)
+        return response
@@ -0,0 +1,224 @@
+"""
+services/caliente.py
+Modo caliente para sesiones con muchas escrituras pequeñas (p. ej. una prueba
+de ordeño con varios dispositivos). `flask sesion-caliente SESION` copia la
+base a SESION_CALIENTE_DIR, un RAM-disk compartido por todos los procesos
+(/dev/shm/capre), y get_db_path la sirve desde ahi. Una base :memory: con
+cache compartida no sirve: solo la ven los hilos de un proceso, y Passenger
+usa varios.
+
+Al cerrar las respuestas se revisan las copias calientes (como en
+services/mantenimiento.py):
+- cada SESION_CALIENTE_RESPALDO_SEG, si hubo escrituras, se respalda en
+  DATA_FOLDER con la API de backup de SQLite (una transaccion: el disco
+  siempre tiene una version completa y consistente);
+- tras SESION_CALIENTE_INACTIVIDAD_MIN sin escrituras se respalda por ultima
+  vez y se borra la copia caliente; la sesion vuelve a servirse desde disco.
+
+Recuperacion: la copia en DATA_FOLDER es la durable.
+- Si muere un proceso no se pierde nada: la copia caliente y su WAL siguen
+  en el RAM-disk y el siguiente proceso la abre.
+- Si se reinicia el equipo (o se vacia el RAM-disk) se pierden las
+  escrituras posteriores al ultimo respaldo, a lo sumo
+  SESION_CALIENTE_RESPALDO_SEG segundos, y la sesion se abre desde disco.
+- La marca <copia>.respaldo guarda la fecha del ultimo respaldo completo.
+
+Promover y enfriar copian la base y cambian el archivo que sirve la sesion
+con el bloqueo de escritura del origen tomado (BEGIN IMMEDIATE): ninguna
+escritura queda en la copia que se deja de servir. Las conexiones abiertas
+antes del cambio comprueban el archivo al tomar el bloqueo y responden 503
+(SesionMovida, models/escritura.py); la solicitud reintentada abre la copia
+nueva.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+import config
+from models.database import get_db, get_disk_path, get_hot_path
+
+logger = logging.getLogger(__name__)
+
+# Cada proceso revisa las copias calientes a lo sumo cada REVISION_SEGUNDOS
+REVISION_SEGUNDOS = 5
+_proxima_revision = 0.0
+_revision_lock = threading.Lock()
+
+
+def sesiones_calientes():
+    carpeta = config.SESION_CALIENTE_DIR
+    if not carpeta or not os.path.isdir(carpeta):
+        return []
+    return [f[8:-3] for f in os.listdir(carpeta) if f.startswith('session_') and f.endswith('.db')]
+
+
+def ultima_escritura(session_id):
+    ruta = get_hot_path(session_id)
+    return max((os.path.getmtime(p) for p in (ruta, ruta + '-wal') if os.path.exists(p)), default=0)
+
+
+def ultimo_respaldo(session_id):
+    try:
+        return os.path.getmtime(get_hot_path(session_id) + '.respaldo')
+    except OSError:
+        return 0
+
+
+def _marcar_respaldo(session_id, fecha):
+    ruta = get_hot_path(session_id) + '.respaldo'
+    open(ruta, 'a').close()
+    os.utime(ruta, (fecha, fecha))
+
+
+def _copiar(origen, destino, cambio=None):
+    """
+    Copia una base con la API de backup (consistente aunque haya escritores).
+    Con `cambio` (funcion sin argumentos), la copia y el cambio se hacen con
+    el bloqueo de escritura del origen tomado por una conexion aparte: backup
+    no puede leer desde una conexion con una escritura abierta.
+    """
+    guardia = sqlite3.connect(origen, timeout=10, isolation_level=None) if cambio else None
+    try:
+        if guardia:
+            guardia.execute('BEGIN IMMEDIATE')
+        fuente = sqlite3.connect(origen, timeout=10)
+        copia = sqlite3.connect(destino, timeout=10)
+        try:
+            fuente.backup(copia)
+            copia.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        finally:
+            copia.close()
+            fuente.close()
+        if cambio:
+            cambio()
+    finally:
+        if guardia:
+            guardia.close()  # cierra la transaccion: suelta el bloqueo
+
+
+def promover(session_id):
+    """
+    Pasa a servir la sesion desde SESION_CALIENTE_DIR. Retorna los segundos
+    que tomo la copia, o None si ya estaba caliente.
+    """
+    if not config.SESION_CALIENTE_DIR:
+        raise RuntimeError('SESION_CALIENTE_DIR no esta configurado')
+    caliente = get_hot_path(session_id)
+    if os.path.exists(caliente):
+        return None
+    # get_db restaura la sesion si estaba archivada y aplica migraciones
+    get_db(session_id).close()
+    os.makedirs(config.SESION_CALIENTE_DIR, exist_ok=True)
+    inicio = time.perf_counter()
+    temporal = f'{caliente}.{os.getpid()}.tmp'
+    try:
+        # os.link no reemplaza: si otro proceso la promovio primero, gana esa
+        _copiar(get_disk_path(session_id), temporal, lambda: os.link(temporal, caliente))
+    except FileExistsError:
+        return None
+    finally:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+    _marcar_respaldo(session_id, time.time())
+    logger.info('Sesion %s servida desde %s', session_id, caliente)
+    return time.perf_counter() - inicio
+
+
+def respaldar(session_id):
+    """Copia la sesion caliente a DATA_FOLDER. Retorna los segundos que tomo."""
+    inicio_epoch = time.time()
+    inicio = time.perf_counter()
+    _copiar(get_hot_path(session_id), get_disk_path(session_id))
+    # Escrituras durante la copia quedan para el siguiente respaldo
+    _marcar_respaldo(session_id, inicio_epoch)
+    return time.perf_counter() - inicio
+
+
+def enfriar(session_id):
+    """Ultimo respaldo y vuelta a disco. Retorna los segundos del respaldo."""
+    inicio = time.perf_counter()
+    caliente = get_hot_path(session_id)
+
+    def retirar():
+        # Sin la copia caliente, get_db_path vuelve a DATA_FOLDER
+        for suffix in ('', '-wal', '-shm'):
+            try:
+                os.remove(caliente + suffix)
+            except FileNotFoundError:
+                pass
+
+    _copiar(caliente, get_disk_path(session_id), retirar)
+    segundos = time.perf_counter() - inicio
+    try:
+        os.remove(caliente + '.respaldo')
+    except FileNotFoundError:
+        pass
+    logger.info('Sesion %s vuelve a servirse desde disco', session_id)
+    return segundos
+
+
+def _tomar_bloqueo(session_id):
+    ruta = get_hot_path(session_id) + '.lock'
+    try:
+        # Un bloqueo de mas de diez minutos es de un proceso que murio a mitad
+        if time.time() - os.path.getmtime(ruta) > 600:
+            os.remove(ruta)
+    except OSError:
+        pass
+    try:
+        os.close(os.open(ruta, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        return True
+    except FileExistsError:
+        return False
+
+
+def revisar_calientes(ahora=None):
+    """Respalda las copias calientes que lo necesitan y enfria las inactivas.
+    Retorna {session_id: 'respaldo' | 'enfriada'}."""
+    ahora = ahora or time.time()
+    acciones = {}
+    for session_id in sesiones_calientes():
+        escritura = ultima_escritura(session_id)
+        respaldo = ultimo_respaldo(session_id)
+        inactiva = ahora - escritura >= config.SESION_CALIENTE_INACTIVIDAD_MIN * 60
+        vencida = escritura > respaldo and ahora - respaldo >= config.SESION_CALIENTE_RESPALDO_SEG
+        if not (inactiva or vencida) or not _tomar_bloqueo(session_id):
+            continue
+        try:
+            if inactiva:
+                enfriar(session_id)
+                acciones[session_id] = 'enfriada'
+            else:
+                respaldar(session_id)
+                acciones[session_id] = 'respaldo'
+        except Exception as e:
+            logger.warning('Respaldo de sesion caliente %s fallo: %s', session_id, e)
+        finally:
+            try:
+                os.remove(get_hot_path(session_id) + '.lock')
+            except OSError:
+                pass
+    return acciones
+
+
+def _revisar():
+    global _proxima_revision
+    ahora = time.time()
+    with _revision_lock:
+        if ahora < _proxima_revision:
+            return
+        _proxima_revision = ahora + REVISION_SEGUNDOS
+    revisar_calientes(ahora)
+
+
+def instalar_caliente(app):
+    """Programa la revision de copias calientes al cerrar cada respuesta."""
+    if not config.SESION_CALIENTE_DIR:
+        return
+
+    @app.after_request
+    def _programar_respaldo(response):
+        response.call_on_close(_revisar)
+        return response
@@ -1,6 +1,8 @@
 import struct
 import datetime
+import io
 import os
+import zipfile
 from models.database import get_db, TABLA1_FIELDS, ANIMAL_FIELDS
 
 
@@ -167,22 +169,51 @@ def _write_dbf_record(f, record, fields, sqlite_fields):
         f.write(_format_dbf_value(value, ftype, length, decimals))
 
 
-def export_table_to_dbf(session_id, table_name, output_path, dbf_fields, sqlite_fields):
-    """Export a SQLite table to a DBF file."""
-    conn = get_db(session_id)
+def _write_table(f, records, dbf_fields, sqlite_fields):
+    """Write a complete DBF file (header, records, EOF marker) to f."""
+    _write_dbf_header(f, len(records), dbf_fields)
+
+    for record in records:
+        _write_dbf_record(f, record, dbf_fields, sqlite_fields)
+
+    # End of file marker
+    f.write(b'\x1A')
 
-    # Get all records
+
+def _read_table(session_id, table_name):
+    conn = get_db(session_id)
     records = conn.execute(f'SELECT * FROM {table_name}').fetchall()
     conn.close()
+    return records
+
+
+def export_table_to_dbf(session_id, table_name, output_path, dbf_fields, sqlite_fields):
+    """Export a SQLite table to a DBF file."""
+    records = _read_table(session_id, table_name)
 
     with open(output_path, 'wb') as f:
-        _write_dbf_header(f, len(records), dbf_fields)
+        _write_table(f, records, dbf_fields, sqlite_fields)
+
 
-        for record in records:
-            _write_dbf_record(f, record, dbf_fields, sqlite_fields)
+# (table number, SQLite table, DBF fields, SQLite fields) of each exported file
+DBF_TABLES = (
+    (1, 'tabla1', TABLA1_DBF_FIELDS,
+     ['hato', 'nombre', 'propieta', 'fecultprb', 'fecprbact', 'sumlec', 'elaboraa']),
+    (2, 'tabla2', ANIMAL_DBF_FIELDS, ANIMAL_DBF_FIELD_NAMES),
+    (3, 'tabla3', ANIMAL_DBF_FIELDS, ANIMAL_DBF_FIELD_NAMES),
+)
 
-        # End of file marker
-        f.write(b'\x1A')
+
+def _export_names(session_id):
+    """Prefix code and cleaned farm name used for the exported file names."""
+    conn = get_db(session_id)
+    meta = conn.execute('SELECT prefix_code FROM session_meta WHERE id = 1').fetchone()
+    prefix = meta['prefix_code'] if meta else 'export'
+    hato = conn.execute('SELECT nombre FROM tabla1 LIMIT 1').fetchone()
+    farm_name = hato['nombre'] if hato else 'HATO'
+    conn.close()
+    # Clean farm name for filename (replace spaces with underscores, remove special chars)
+    return prefix, farm_name.replace(' ', '_').replace('/', '-').replace('\\', '-')
 
 
 def export_all_tables(session_id, output_dir):
@@ -191,51 +222,30 @@ def export_all_tables(session_id, output_dir):
     Returns:
         dict with file paths for tabla1, tabla2, tabla3
     """
-    conn = get_db(session_id)
-
-    # Get prefix code from session metadata
-    meta = conn.execute('SELECT prefix_code FROM session_meta WHERE id = 1').fetchone()
-    prefix = meta['prefix_code'] if meta else 'export'
-    conn.close()
-
+    prefix, farm_name = _export_names(session_id)
     os.makedirs(output_dir, exist_ok=True)
 
-    # Export tabla1
-    tabla1_path = os.path.join(output_dir, f'{prefix}_capre_tabla1.dbf')
-    export_table_to_dbf(
-        session_id, 'tabla1', tabla1_path,
-        TABLA1_DBF_FIELDS,
-        ['hato', 'nombre', 'propieta', 'fecultprb', 'fecprbact', 'sumlec', 'elaboraa']
-    )
-
-    # Export tabla2
-    tabla2_path = os.path.join(output_dir, f'{prefix}_capre_tabla2.dbf')
-    export_table_to_dbf(
-        session_id, 'tabla2', tabla2_path,
-        ANIMAL_DBF_FIELDS,
-        ANIMAL_DBF_FIELD_NAMES,
-    )
+    result = {'prefix': prefix, 'farm_name': farm_name}
+    for number, table_name, dbf_fields, sqlite_fields in DBF_TABLES:
+        path = os.path.join(output_dir, f'{prefix}_capre_tabla{number}.dbf')
+        export_table_to_dbf(session_id, table_name, path, dbf_fields, sqlite_fields)
+        result[table_name] = path
+    return result
 
-    # Export tabla3
-    tabla3_path = os.path.join(output_dir, f'{prefix}_capre_tabla3.dbf')
-    export_table_to_dbf(
-        session_id, 'tabla3', tabla3_path,
-        ANIMAL_DBF_FIELDS,
-        ANIMAL_DBF_FIELD_NAMES,
-    )
 
-    # Get farm name for ZIP filename
-    conn = get_db(session_id)
-    hato = conn.execute('SELECT nombre FROM tabla1 LIMIT 1').fetchone()
-    farm_name = hato['nombre'] if hato else 'HATO'
-    # Clean farm name for filename (replace spaces with underscores, remove special chars)
-    farm_name_clean = farm_name.replace(' ', '_').replace('/', '-').replace('\\', '-')
-    conn.close()
+def export_all_tables_zip(session_id, destination):
+    """Export all 3 tables as DBF entries written straight into a ZIP
+    (path or binary file object), without intermediate files.
 
-    return {
-        'tabla1': tabla1_path,
-        'tabla2': tabla2_path,
-        'tabla3': tabla3_path,
-        'prefix': prefix,
-        'farm_name': farm_name_clean
-    }
+    Returns:
+        dict with prefix and farm_name
+    """
+    prefix, farm_name = _export_names(session_id)
+    with zipfile.ZipFile(destination, 'w', zipfile.ZIP_DEFLATED) as zipf:
+        for number, table_name, dbf_fields, sqlite_fields in DBF_TABLES:
+            records = _read_table(session_id, table_name)
+            with zipf.open(f'{prefix}_capre_tabla{number}.dbf', 'w') as entry:
+                # Records are small: buffer them before the compressor
+                with io.BufferedWriter(entry, 64 * 1024) as f:
+                    _write_table(f, records, dbf_fields, sqlite_fields)
+    return {'prefix': prefix, 'farm_name': farm_name}
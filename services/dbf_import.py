@@ -3,7 +3,9 @@ import datetime
 from dbfread import DBF
 
 from models.database import (
-    init_db, get_db, TABLA1_FIELDS, ANIMAL_FIELDS
+    init_db, get_db, TABLA1_FIELDS, ANIMAL_FIELDS,
+    quitar_triggers_tabla3, reconstruir_tabla3,
+    quitar_triggers_roster, reconstruir_roster
 )
 
 
@@ -20,7 +22,7 @@ def _convert_value(value):
     return value
 
 
-def _import_table(conn, dbf_path, table_name, fields, encoding='latin-1'):
+def _import_table(conn, dbf_path, table_name, fields, encoding='latin-1', commit=True):
     """Read a .dbf file and insert all records into the given SQLite table."""
     dbf = DBF(dbf_path, encoding=encoding, ignore_missing_memofile=True)
 
@@ -49,7 +51,39 @@ def _import_table(conn, dbf_path, table_name, fields, encoding='latin-1'):
     if batch:
         conn.executemany(sql, batch)
 
-    conn.commit()
+    if commit:
+        conn.commit()
+    return count
+
+
+def _import_tabla2(conn, dbf_path):
+    """tabla2 se carga sin los triggers del listado de novillas, que se
+    reconstruye en bloque al final, en la misma transaccion."""
+    conn.execute('BEGIN')
+    try:
+        quitar_triggers_roster(conn, 'tabla2')
+        count = _import_table(conn, dbf_path, 'tabla2', ANIMAL_FIELDS, commit=False)
+        reconstruir_roster(conn, 'tabla2')
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return count
+
+
+def _import_tabla3(conn, dbf_path):
+    """tabla3 solo se lee despues de importarla: se carga sin sus triggers
+    por fila y el listado de novillas, la busqueda y sync se reconstruyen en
+    bloque, todo en una transaccion."""
+    conn.execute('BEGIN')
+    try:
+        quitar_triggers_tabla3(conn)
+        count = _import_table(conn, dbf_path, 'tabla3', ANIMAL_FIELDS, commit=False)
+        reconstruir_tabla3(conn)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
     return count
 
 
@@ -75,8 +109,8 @@ def import_dbf_files(file_paths, prefix_code):
         farm_name = row['nombre'] if row else 'Sin nombre'
 
         # Import tabla2 and tabla3
-        count2 = _import_table(conn, file_paths[2], 'tabla2', ANIMAL_FIELDS)
-        count3 = _import_table(conn, file_paths[3], 'tabla3', ANIMAL_FIELDS)
+        count2 = _import_tabla2(conn, file_paths[2])
+        count3 = _import_tabla3(conn, file_paths[3])
 
         # Save session metadata
         conn.execute(
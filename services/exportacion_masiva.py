@@ -0,0 +1,153 @@
+"""
+services/exportacion_masiva.py
+Exportacion de muchas fincas a la vez, al cierre de cada ciclo de pruebas
+(`flask exportar-fincas DESTINO`), simetrica a services/importacion_masiva.py.
+Cada sesion elegida (todas, las de un dispositivo o las de una lista de
+prefijos) se exporta en un proceso del pool directo a su ZIP en DESTINO
+(export_all_tables_zip, sin DBF intermedios).
+
+DESTINO/.exportaciones.json guarda la version de datos (sync_version) de
+cada sesion en su ultima exportacion: una sesion sin cambios desde entonces,
+cuyo ZIP sigue en DESTINO, no se vuelve a exportar.
+
+Las sesiones archivadas (services/archivo.py) solo se incluyen con
+`incluir_archivadas`, porque exportarlas las restaura.
+"""
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+import config
+from models.database import get_db, list_sessions
+from services.dbf_export import export_all_tables_zip
+from services.sync import version_datos
+
+
+def _ruta_registro(destino):
+    return os.path.join(destino, '.exportaciones.json')
+
+
+def leer_registro(destino):
+    """{session_id: {version, zip, fecha}} de las exportaciones anteriores."""
+    try:
+        with open(_ruta_registro(destino), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _escribir_registro(destino, registro):
+    temporal = _ruta_registro(destino) + '.tmp'
+    with open(temporal, 'w', encoding='utf-8') as f:
+        json.dump(registro, f, ensure_ascii=False, indent=2)
+    os.replace(temporal, _ruta_registro(destino))
+
+
+def seleccionar_sesiones(device_id=None, prefijos=None, sesiones=None, incluir_archivadas=False):
+    """Catalogos de las sesiones a exportar: las indicadas, las visibles
+    para device_id y/o las de los prefijos (sin filtros, todas)."""
+    catalogos = list_sessions(device_id=device_id)
+    if sesiones:
+        catalogos = [c for c in catalogos if c['session_id'] in sesiones]
+    if prefijos:
+        catalogos = [c for c in catalogos if c['prefix_code'] in prefijos]
+    if not incluir_archivadas:
+        catalogos = [c for c in catalogos if not c.get('archivada')]
+    return catalogos
+
+
+def _iniciar_proceso(data_folder):
+    # Con spawn (macOS, Windows) el proceso no hereda config modificado en el padre
+    config.DATA_FOLDER = data_folder
+
+
+def exportar_finca(session_id, destino, nombre=None):
+    """Exporta una sesion a DESTINO (en un proceso del pool). Retorna su resumen."""
+    inicio = time.perf_counter()
+    resumen = {'session_id': session_id, 'zip': None, 'version': None,
+               'bytes': 0, 'segundos': 0.0, 'omitida': False, 'error': None}
+    try:
+        # Version leida antes de exportar: un cambio durante la exportacion
+        # queda para la siguiente
+        conn = get_db(session_id)
+        try:
+            resumen['version'] = version_datos(conn)
+        finally:
+            conn.close()
+        temporal = os.path.join(destino, f'.{session_id}.{os.getpid()}.zip.tmp')
+        try:
+            nombres = export_all_tables_zip(session_id, temporal)
+            nombre = nombre or f"{nombres['prefix']}_{nombres['farm_name']}.zip"
+            os.replace(temporal, os.path.join(destino, nombre))
+        finally:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+        resumen.update(zip=nombre, bytes=os.path.getsize(os.path.join(destino, nombre)))
+    except Exception as e:
+        resumen['error'] = f'Error al exportar: {e}'
+    resumen['segundos'] = round(time.perf_counter() - inicio, 3)
+    return resumen
+
+
+def _version_actual(session_id):
+    conn = get_db(session_id)
+    try:
+        return version_datos(conn)
+    finally:
+        conn.close()
+
+
+def exportar_sesiones(catalogos, destino, procesos=None, forzar=False):
+    """
+    Exporta las sesiones a DESTINO y actualiza el registro. Las que no
+    cambiaron desde su ultima exportacion se omiten (salvo `forzar`).
+    Retorna la lista de resumenes por sesion, ordenada por prefijo.
+    """
+    os.makedirs(destino, exist_ok=True)
+    registro = leer_registro(destino)
+    # Dos sesiones con el mismo prefijo (distintos dispositivos) no
+    # comparten nombre de ZIP
+    repetidos = {c['prefix_code'] for c in catalogos
+                 if sum(1 for o in catalogos if o['prefix_code'] == c['prefix_code']) > 1}
+
+    resumenes = []
+    pendientes = []
+    for c in catalogos:
+        session_id = c['session_id']
+        anterior = registro.get(session_id)
+        if not forzar and anterior and os.path.exists(os.path.join(destino, anterior['zip'])):
+            try:
+                sin_cambios = _version_actual(session_id) == anterior['version']
+            except Exception:
+                sin_cambios = False
+            if sin_cambios:
+                resumenes.append({'session_id': session_id, 'zip': anterior['zip'],
+                                  'version': anterior['version'], 'omitida': True, 'error': None})
+                continue
+        nombre = None
+        if c['prefix_code'] in repetidos:
+            nombre = f"{c['prefix_code']}_{session_id}.zip"
+        pendientes.append((session_id, nombre))
+
+    if pendientes:
+        procesos = min(procesos or os.cpu_count() or 1, len(pendientes))
+        with ProcessPoolExecutor(procesos, initializer=_iniciar_proceso,
+                                 initargs=(config.DATA_FOLDER,)) as pool:
+            futuros = [pool.submit(exportar_finca, session_id, destino, nombre)
+                       for session_id, nombre in pendientes]
+            for futuro in as_completed(futuros):
+                resumen = futuro.result()
+                resumenes.append(resumen)
+                if not resumen['error']:
+                    registro[resumen['session_id']] = {
+                        'version': resumen['version'], 'zip': resumen['zip'],
+                        'fecha': datetime.now().isoformat(timespec='seconds'),
+                    }
+        _escribir_registro(destino, registro)
+
+    prefijos = {c['session_id']: c['prefix_code'] for c in catalogos}
+    for r in resumenes:
+        r['prefijo'] = prefijos[r['session_id']]
+    return sorted(resumenes, key=lambda r: (r['prefijo'], r['session_id']))
@@ -0,0 +1,138 @@
+"""
+services/federacion.py
+Consultas consolidadas sobre varias sesiones (una base por finca). Las bases
+se adjuntan con ATTACH de solo lectura en lotes que respetan el limite de
+bases adjuntas de SQLite; cada consulta por finca corre como un UNION ALL del
+lote y los resultados se agrupan por session_id.
+
+El resultado de cada finca se guarda en el cache compartido entre procesos
+(services/cache.py) con su version de datos (sync_version, ver
+services/sync.py): en la siguiente consulta, desde cualquier proceso, solo se
+vuelven a consultar las fincas cuya version cambio.
+"""
+import logging
+import sqlite3
+from urllib.parse import quote
+
+from models.database import get_db_path, EN_PRODUCCION
+from services import cache
+
+logger = logging.getLogger(__name__)
+
+# Limite de SQLite si la version de Python no permite leerlo (SQLITE_MAX_ATTACHED)
+LIMITE_ATTACH_DEFECTO = 10
+
+# Consultas por finca; {esquema} es el alias de la base adjunta
+CONSULTAS = {
+    'sin_pesaje': f'''
+        SELECT orejera, nombre
+        FROM {{esquema}}.tabla2
+        WHERE {EN_PRODUCCION}
+          AND (ord1 IS NULL OR ord1 = 0)
+          AND (ord2 IS NULL OR ord2 = 0)
+          AND (ord3 IS NULL OR ord3 = 0)
+        ORDER BY nombre ASC
+    ''',
+    'novedades': '''
+        SELECT COALESCE(SUM(fecser IS NOT NULL), 0) AS servicios,
+               COALESCE(SUM(fecseca IS NOT NULL), 0) AS secas,
+               COALESCE(SUM(fecchp IS NOT NULL), 0) AS chequeos,
+               COALESCE(SUM(fecparto IS NOT NULL), 0) AS partos,
+               COALESCE(SUM(fecsale IS NOT NULL), 0) AS salidas,
+               COALESCE(SUM(COALESCE(ord1, 0) + COALESCE(ord2, 0) + COALESCE(ord3, 0) > 0), 0) AS ordenos,
+               COALESCE(SUM(cart IN ('S', 'M', 'U', 'T', 'L')), 0) AS sanitario
+        FROM {esquema}.tabla2
+    ''',
+}
+
+def _limite_attach(conn):
+    try:
+        return conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+    except AttributeError:
+        return LIMITE_ATTACH_DEFECTO
+
+
+def _adjuntar(conn, sesiones):
+    """Adjunta las bases del lote como s0, s1, ... (solo lectura)."""
+    for i, session_id in enumerate(sesiones):
+        uri = f'file:{quote(get_db_path(session_id))}?mode=ro'
+        conn.execute(f'ATTACH DATABASE ? AS s{i}', (uri,))
+
+
+def _consultar_lote(conn, consulta, sesiones):
+    """
+    Ejecuta la consulta sobre un lote adjunto. Retorna {session_id: filas}
+    solo para las fincas cuya version cambio desde la ultima consulta; las
+    demas se leen del cache.
+    """
+    versiones = dict(conn.execute(' UNION ALL '.join(
+        f'SELECT ?, version FROM s{i}.sync_version WHERE id = 1' for i in range(len(sesiones))
+    ), sesiones).fetchall())
+
+    espacio = f'federacion:{consulta}'
+    resultado = {}
+    for s in sesiones:
+        filas = cache.obtener(espacio, s, version=versiones.get(s, 0))
+        if filas is not None:
+            resultado[s] = filas
+    pendientes = [(i, s) for i, s in enumerate(sesiones) if s not in resultado]
+
+    if pendientes:
+        sql = ' UNION ALL '.join(
+            f'SELECT * FROM (SELECT ? AS session_id, q.* FROM ({CONSULTAS[consulta].format(esquema=f"s{i}")}) AS q)'
+            for i, _ in pendientes
+        )
+        nuevos = {s: [] for _, s in pendientes}
+        for fila in conn.execute(sql, [s for _, s in pendientes]):
+            datos = dict(fila)
+            nuevos[datos.pop('session_id')].append(datos)
+        for s, filas in nuevos.items():
+            cache.guardar(espacio, s, filas, session_id=s, version=versiones.get(s, 0))
+        resultado.update(nuevos)
+    return resultado
+
+
+def _conexion_federada():
+    conn = sqlite3.connect('file::memory:', uri=True)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def federar(sesiones, consulta):
+    """
+    Ejecuta una consulta de CONSULTAS sobre cada sesion y retorna
+    {session_id: [filas como dict]}. Las sesiones que no se pueden leer se
+    omiten (se registra una advertencia).
+    """
+    resultado = {}
+    conn = _conexion_federada()
+    try:
+        tamano = max(1, _limite_attach(conn))
+        for inicio in range(0, len(sesiones), tamano):
+            lote = list(sesiones[inicio:inicio + tamano])
+            try:
+                _adjuntar(conn, lote)
+                resultado.update(_consultar_lote(conn, consulta, lote))
+            except sqlite3.Error as e:
+                # Una base ilegible no debe ocultar las demas: reintentar de a una
+                logger.warning('Lote federado fallo (%s), consultando sesion por sesion', e)
+                _desadjuntar(conn)
+                for session_id in lote:
+                    try:
+                        _adjuntar(conn, [session_id])
+                        resultado.update(_consultar_lote(conn, consulta, [session_id]))
+                    except sqlite3.Error as e:
+                        logger.warning('No se pudo consultar sesion %s: %s', session_id, e)
+                    finally:
+                        _desadjuntar(conn)
+            finally:
+                _desadjuntar(conn)
+    finally:
+        conn.close()
+    return resultado
+
+
+def _desadjuntar(conn):
+    for fila in conn.execute('PRAGMA database_list').fetchall():
+        if fila['name'] not in ('main', 'temp'):
+            conn.execute(f'DETACH DATABASE {fila["name"]}')
@@ -0,0 +1,111 @@
+"""
+services/grid.py
+Consulta paginada de tabla2/tabla3 para la grilla de ver_tabla: paginacion
+por cursor (keyset sobre columna de orden + id), orden y filtros del lado del
+servidor y proyeccion de columnas. El cursor es opaco para el cliente.
+"""
+import base64
+import json
+
+TABLAS_GRID = ('tabla2', 'tabla3')
+LIMITE_DEFECTO = 100
+LIMITE_MAXIMO = 500
+
+
+def columnas_tabla(conn, tabla):
+    """Columnas reales de la tabla (sin columnas generadas), en orden de esquema."""
+    return [r['name'] for r in conn.execute(f'PRAGMA table_info({tabla})')]
+
+
+def codificar_cursor(valor, fila_id):
+    crudo = json.dumps([valor, fila_id], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(crudo).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor):
+    """Retorna (valor, id) o None si el cursor no es valido."""
+    try:
+        crudo = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        valor, fila_id = json.loads(crudo)
+        return valor, int(fila_id)
+    except (ValueError, TypeError):
+        return None
+
+
+def _condicion_cursor(orden, desc, valor, fila_id):
+    """
+    WHERE para las filas posteriores al cursor en ORDER BY orden, id
+    (ASC: NULL primero; DESC: NULL al final, como ordena SQLite).
+    """
+    if orden == 'id':
+        return ('id < ?' if desc else 'id > ?'), [fila_id]
+    if desc:
+        if valor is None:
+            return f'({orden} IS NULL AND id < ?)', [fila_id]
+        return (f'({orden} < ? OR ({orden} = ? AND id < ?) OR {orden} IS NULL)',
+                [valor, valor, fila_id])
+    if valor is None:
+        return f'(({orden} IS NULL AND id > ?) OR {orden} IS NOT NULL)', [fila_id]
+    return f'({orden} > ? OR ({orden} = ? AND id > ?))', [valor, valor, fila_id]
+
+
+def consultar_grid(conn, tabla, columnas=None, orden='id', desc=False,
+                   filtros=None, cursor=None, limite=LIMITE_DEFECTO):
+    """
+    Retorna una pagina de la grilla:
+    {'columnas', 'filas' (listas en el orden de columnas), 'siguiente'
+    (cursor o None), 'total' (solo en la primera pagina)}.
+
+    columnas/orden/filtros se validan contra las columnas reales de la tabla;
+    las desconocidas se ignoran. filtros es {columna: texto} y filtra por
+    contenido (LIKE, sin distinguir mayusculas).
+    """
+    disponibles = columnas_tabla(conn, tabla)
+    columnas = [c for c in (columnas or disponibles) if c in disponibles] or disponibles
+    if 'id' not in columnas:
+        columnas = ['id'] + columnas
+    if orden not in disponibles:
+        orden = 'id'
+    limite = max(1, min(limite or LIMITE_DEFECTO, LIMITE_MAXIMO))
+
+    condiciones, params = [], []
+    for col, texto in (filtros or {}).items():
+        texto = (texto or '').strip()
+        if col in disponibles and texto:
+            patron = texto.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            condiciones.append(f"CAST({col} AS TEXT) LIKE ? ESCAPE '\\'")
+            params.append(f'%{patron}%')
+
+    total = None
+    if cursor is None:
+        where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ''
+        total = conn.execute(f'SELECT COUNT(*) FROM {tabla} {where}', params).fetchone()[0]
+    else:
+        valor, fila_id = cursor
+        condicion, params_cursor = _condicion_cursor(orden, desc, valor, fila_id)
+        condiciones.append(condicion)
+        params = params + params_cursor
+
+    direccion = 'DESC' if desc else 'ASC'
+    order_by = f'id {direccion}' if orden == 'id' else f'{orden} {direccion}, id {direccion}'
+    where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ''
+    # Se pide una fila extra para saber si hay pagina siguiente
+    filas = conn.execute(f'''
+        SELECT {', '.join(dict.fromkeys(columnas + [orden]))}
+        FROM {tabla} {where}
+        ORDER BY {order_by}
+        LIMIT ?
+    ''', params + [limite + 1]).fetchall()
+
+    siguiente = None
+    if len(filas) > limite:
+        filas = filas[:limite]
+        ultima = filas[-1]
+        siguiente = codificar_cursor(ultima[orden], ultima['id'])
+
+    return {
+        'columnas': columnas,
+        'filas': [[f[c] for c in columnas] for f in filas],
+        'siguiente': siguiente,
+        'total': total,
+    }
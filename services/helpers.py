@@ -6,6 +6,8 @@ y validaciones reutilizables.
 from datetime import datetime
 from flask import session as flask_session
 
+import config
+
 # ── Constantes de dominio ─────────────────────────────────────────────────────
 
 MESES = ('ENE', 'FEB', 'MAR', 'ABR', 'MAY', 'JUN',
@@ -35,7 +37,7 @@ PAC_MAP = {'A': 'Abierta', 'P': 'Preñada'}
 PAC_COLOR = {'A': 'danger', 'P': 'success'}
 
 MAX_ORDENO_KG = 80.0
-DIAS_MIN_SERVICIO = 125
+DIAS_MIN_SERVICIO = config.DIAS_MIN_SERVICIO
 DIAS_MIN_NOVILLA = 365
 DIAS_MIN_ABORTO = 152
 
@@ -46,6 +48,11 @@ def get_session_id():
     return flask_session.get('active_session_id')
 
 
+def get_device_id():
+    """Retorna el device_id del dispositivo actual o None."""
+    return flask_session.get('device_id')
+
+
 # ── Formateo de fechas ───────────────────────────────────────────────────────
 
 def format_fecha(fecha_str):
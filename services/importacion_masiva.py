@@ -0,0 +1,119 @@
+"""
+services/importacion_masiva.py
+Importacion de muchas fincas a la vez, para el inicio de cada ciclo de
+pruebas (`flask importar-fincas DIRECTORIO`). Los .dbf del directorio (y sus
+subdirectorios) se agrupan por prefijo de hato y cada grupo se valida como
+en /upload (validate_upload_set: exactamente tabla1, tabla2 y tabla3 del
+mismo prefijo). Las fincas validas se importan en paralelo con un pool de
+procesos: cada importacion crea su propia base de sesion, asi no comparten
+bloqueos, y el trabajo de dbfread no queda limitado por el GIL.
+
+Como en /upload, no se importa una finca si ya existe una sesion con su
+prefijo visible para el dispositivo asignado.
+"""
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+import config
+from models.database import session_exists_by_prefix, set_session_device
+from services.dbf_import import import_dbf_files
+from services.file_utils import detect_prefix, detect_table_number, validate_upload_set
+
+
+def agrupar_archivos(directorio):
+    """
+    Agrupa los .dbf del directorio por prefijo. Retorna (grupos, errores):
+    grupos {prefijo: {1: ruta, 2: ruta, 3: ruta}} de los conjuntos validos y
+    errores {prefijo o archivo: mensaje} de los que no lo son.
+    """
+    por_prefijo = {}
+    errores = {}
+    for raiz, _, archivos in os.walk(directorio):
+        for nombre in sorted(archivos):
+            if not nombre.lower().endswith('.dbf'):
+                continue
+            try:
+                prefijo = detect_prefix(nombre)
+            except ValueError as e:
+                errores[os.path.relpath(os.path.join(raiz, nombre), directorio)] = str(e)
+                continue
+            por_prefijo.setdefault(prefijo, []).append(os.path.join(raiz, nombre))
+
+    grupos = {}
+    for prefijo, rutas in sorted(por_prefijo.items()):
+        try:
+            validate_upload_set([os.path.basename(r) for r in rutas])
+        except ValueError as e:
+            errores[prefijo] = f"{e} ({', '.join(os.path.basename(r) for r in rutas)})"
+            continue
+        grupos[prefijo] = {detect_table_number(os.path.basename(r)): r for r in rutas}
+    return grupos, errores
+
+
+def _iniciar_proceso(data_folder):
+    # Con spawn (macOS, Windows) el proceso no hereda config modificado en el padre
+    config.DATA_FOLDER = data_folder
+
+
+def importar_finca(prefijo, rutas, device_id=None):
+    """Importa una finca (en un proceso del pool). Retorna su resumen."""
+    inicio = time.perf_counter()
+    resumen = {'prefijo': prefijo, 'session_id': None, 'finca': None, 'device_id': device_id,
+               'tabla1': 0, 'tabla2': 0, 'tabla3': 0, 'segundos': 0.0, 'error': None}
+    try:
+        session_id, counts = import_dbf_files(rutas, prefijo)
+        if device_id:
+            set_session_device(session_id, device_id)
+        resumen.update(session_id=session_id, finca=counts['farm_name'], tabla1=counts['tabla1'],
+                       tabla2=counts['tabla2'], tabla3=counts['tabla3'])
+    except Exception as e:
+        resumen['error'] = f'Error al importar: {e}'
+    resumen['segundos'] = round(time.perf_counter() - inicio, 3)
+    return resumen
+
+
+def importar_directorio(directorio, device_id=None, asignaciones=None, procesos=None):
+    """
+    Importa todas las fincas del directorio. `asignaciones` {prefijo:
+    device_id} tiene prioridad sobre `device_id`. Retorna la lista de
+    resumenes por finca (incluye las rechazadas, con su error), ordenada por
+    prefijo.
+    """
+    asignaciones = asignaciones or {}
+    grupos, errores = agrupar_archivos(directorio)
+    resumenes = [{'prefijo': clave, 'session_id': None, 'error': mensaje}
+                 for clave, mensaje in errores.items()]
+
+    pendientes = {}
+    for prefijo, rutas in grupos.items():
+        dispositivo = asignaciones.get(prefijo, device_id)
+        existe, finca = session_exists_by_prefix(prefijo, device_id=dispositivo)
+        if existe:
+            resumenes.append({'prefijo': prefijo, 'session_id': None, 'device_id': dispositivo,
+                              'error': f'Ya existe una sesion con el codigo de hato "{prefijo}" ({finca})'})
+        else:
+            pendientes[prefijo] = (rutas, dispositivo)
+
+    if pendientes:
+        procesos = min(procesos or os.cpu_count() or 1, len(pendientes))
+        with ProcessPoolExecutor(procesos, initializer=_iniciar_proceso,
+                                 initargs=(config.DATA_FOLDER,)) as pool:
+            futuros = [pool.submit(importar_finca, prefijo, rutas, dispositivo)
+                       for prefijo, (rutas, dispositivo) in pendientes.items()]
+            resumenes += [f.result() for f in as_completed(futuros)]
+    return sorted(resumenes, key=lambda r: r['prefijo'])
+
+
+def escribir_resumen(resumenes, ruta, segundos):
+    """Guarda el resumen de la importacion como JSON."""
+    with open(ruta, 'w', encoding='utf-8') as f:
+        json.dump({
+            'fecha': datetime.now().isoformat(timespec='seconds'),
+            'segundos': round(segundos, 3),
+            'importadas': sum(1 for r in resumenes if r['session_id']),
+            'errores': sum(1 for r in resumenes if r['error']),
+            'fincas': resumenes,
+        }, f, ensure_ascii=False, indent=2)
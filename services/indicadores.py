@@ -0,0 +1,94 @@
+"""
+services/indicadores.py
+Indicadores del hato para el tablero: los mantienen los triggers de tabla2
+(ver INDICADORES_SQL en models/database.py), asi leerlos no recorre la tabla.
+recalcular_indicadores() los compara contra un calculo completo y puede
+reescribirlos.
+"""
+from models.database import INDICADORES_CALCULO_SQL, SIN_SERVICIO_CALCULO_SQL
+from services.helpers import ESTADO_MAP, DIAS_MIN_SERVICIO
+
+# Diferencia admitida en sumas de ordeños (acumulado incremental en REAL)
+TOLERANCIA = 1e-6
+
+
+def _tasa(parte, total):
+    return round(100.0 * parte / total, 1) if total else None
+
+
+def leer_indicadores(conn):
+    """Indicadores del hato a la fecha de validacion (o hoy si no hay)."""
+    valores = {r['clave']: r['valor'] for r in conn.execute('SELECT clave, valor FROM indicadores_hato')}
+    hato = conn.execute('SELECT fecprbact, sumlec FROM tabla1 LIMIT 1').fetchone()
+    fecha_ref = conn.execute(
+        "SELECT COALESCE(?, date('now'))", (hato['fecprbact'] if hato else None,)
+    ).fetchone()[0]
+    sin_servicio = conn.execute(
+        'SELECT COALESCE(SUM(animales), 0) FROM indicadores_sin_servicio WHERE fecha_limite <= ?',
+        (fecha_ref,)
+    ).fetchone()[0]
+
+    def entero(clave):
+        return int(round(valores.get(clave, 0)))
+
+    animales = entero('animales')
+    activos = animales - entero('salidas')
+    abiertas, prenadas = entero('pac:A'), entero('pac:P')
+    ordenos = round(valores.get('ordenos', 0), 1)
+    sumlec = hato['sumlec'] if hato else None
+
+    return {
+        'fecha_ref': fecha_ref,
+        'animales': animales,
+        'activos': activos,
+        'salidas': entero('salidas'),
+        'produccion': entero('produccion'),
+        'con_ordeno': entero('con_ordeno'),
+        'ordenos': ordenos,
+        'sumlec': sumlec,
+        'diferencia_sumlec': round(ordenos - sumlec, 1) if sumlec is not None else None,
+        'estados': [(codigo, nombre, entero(f'estado:{codigo}')) for codigo, nombre in ESTADO_MAP.items()],
+        'abiertas': abiertas,
+        'prenadas': prenadas,
+        'tasa_abiertas': _tasa(abiertas, abiertas + prenadas),
+        'tasa_prenadas': _tasa(prenadas, abiertas + prenadas),
+        'sin_servicio': sin_servicio,
+        'dias_min_servicio': DIAS_MIN_SERVICIO,
+    }
+
+
+def _diferencias(guardado, calculado, tolerancia):
+    return [(clave, guardado.get(clave, 0), calculado.get(clave, 0))
+            for clave in sorted(set(guardado) | set(calculado))
+            if abs(guardado.get(clave, 0) - calculado.get(clave, 0)) > tolerancia]
+
+
+def recalcular_indicadores(conn, corregir=False):
+    """
+    Recalcula los indicadores recorriendo tabla2 y los compara con los
+    guardados. Retorna [(clave, guardado, calculado)] de los que difieren
+    (sin_servicio:<fecha> para el histograma). Con corregir=True reescribe
+    las tablas de indicadores con el calculo completo.
+    """
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        guardado = {r[0]: r[1] for r in conn.execute('SELECT clave, valor FROM indicadores_hato')}
+        calculado = {r[0]: r[1] for r in conn.execute(INDICADORES_CALCULO_SQL)}
+        diferencias = _diferencias(guardado, calculado, TOLERANCIA)
+
+        guardado = {r[0]: r[1] for r in conn.execute(
+            'SELECT fecha_limite, animales FROM indicadores_sin_servicio')}
+        calculado = {r[0]: r[1] for r in conn.execute(SIN_SERVICIO_CALCULO_SQL)}
+        diferencias += [(f'sin_servicio:{clave}', g, c)
+                        for clave, g, c in _diferencias(guardado, calculado, 0)]
+
+        if corregir and diferencias:
+            conn.execute('DELETE FROM indicadores_hato')
+            conn.execute(f'INSERT INTO indicadores_hato (clave, valor) {INDICADORES_CALCULO_SQL}')
+            conn.execute('DELETE FROM indicadores_sin_servicio')
+            conn.execute(f'INSERT INTO indicadores_sin_servicio (fecha_limite, animales) {SIN_SERVICIO_CALCULO_SQL}')
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return diferencias
@@ -0,0 +1,282 @@
+"""
+services/mantenimiento.py
+Mantenimiento periodico de las bases de sesion, sin cron externo: al cerrar
+una respuesta se revisa si toca (cada MANTENIMIENTO_REVISION_MIN minutos) y,
+si toca, se lanza la pasada en un hilo aparte, fuera de la solicitud. Un solo
+proceso, el que obtiene el archivo de bloqueo, mantiene hasta
+MANTENIMIENTO_LOTE sesiones inactivas (sin escrituras en
+MANTENIMIENTO_INACTIVIDAD_MIN minutos) cuyo ultimo mantenimiento tiene mas de
+MANTENIMIENTO_INTERVALO_HORAS, y archiva las sesiones frias
+(services/archivo.py). La pasada no empieza pasos nuevos despues de
+MANTENIMIENTO_PRESUPUESTO_SEG; lo que quede se retoma en la siguiente.
+
+Por sesion: compactacion de la bitacora (services/bitacora.py), ANALYZE
+inicial o PRAGMA optimize, incremental_vacuum por tandas y
+wal_checkpoint(TRUNCATE). Las bases anteriores a auto_vacuum=INCREMENTAL se
+convierten una vez con VACUUM. Cada paso es una transaccion de escritura por
+turnos (models/escritura.py), asi las solicitudes que escriben se intercalan.
+En la misma pasada se purga el cache compartido (services/cache.py). El
+resultado (fecha y tamaños de base y WAL antes y despues) queda en
+DATA_FOLDER/.mantenimiento.json.
+
+`flask mantenimiento` corre la misma pasada sin presupuesto.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+import config
+from models.database import get_db, get_db_path
+from services import cache
+from services.archivo import archivar_inactivas
+from services.bitacora import compactar_bitacora
+
+logger = logging.getLogger(__name__)
+
+_proxima_revision = 0.0
+_revision_lock = threading.Lock()
+_hilo = None  # pasada en curso de este proceso
+
+
+def _ruta_registro():
+    return os.path.join(config.DATA_FOLDER, '.mantenimiento.json')
+
+
+def _ruta_bloqueo():
+    return os.path.join(config.DATA_FOLDER, '.mantenimiento.lock')
+
+
+def leer_registro():
+    """{session_id: ultimo resultado} mas la clave '_revision' (epoch)."""
+    try:
+        with open(_ruta_registro(), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _escribir_registro(registro):
+    temporal = _ruta_registro() + '.tmp'
+    with open(temporal, 'w', encoding='utf-8') as f:
+        json.dump(registro, f, ensure_ascii=False, indent=1)
+    os.replace(temporal, _ruta_registro())
+
+
+def tamanos(session_id):
+    """(bytes de la base, bytes del WAL)."""
+    ruta = get_db_path(session_id)
+    return tuple(os.path.getsize(p) if os.path.exists(p) else 0 for p in (ruta, ruta + '-wal'))
+
+
+def ultima_escritura(session_id):
+    ruta = get_db_path(session_id)
+    return max((os.path.getmtime(p) for p in (ruta, ruta + '-wal') if os.path.exists(p)), default=0)
+
+
+def sesiones_en_disco():
+    if not os.path.isdir(config.DATA_FOLDER):
+        return []
+    return [f[8:-3] for f in os.listdir(config.DATA_FOLDER) if f.startswith('session_') and f.endswith('.db')]
+
+
+def _vencido(hasta):
+    return hasta is not None and time.monotonic() >= hasta
+
+
+def _liberar_paginas(conn, hasta=None):
+    """incremental_vacuum por tandas de MANTENIMIENTO_PAGINAS_TANDA paginas,
+    cada una en su transaccion. sqlite3 da un solo paso por execute y cada
+    paso libera una pagina. Retorna las paginas que quedan libres."""
+    while True:
+        libres = conn.execute('PRAGMA freelist_count').fetchone()[0]
+        if not libres or _vencido(hasta):
+            return libres
+        conn.execute('BEGIN')
+        cursor = conn.cursor()
+        try:
+            for _ in range(min(libres, config.MANTENIMIENTO_PAGINAS_TANDA)):
+                cursor.execute('PRAGMA incremental_vacuum(1)')
+        finally:
+            cursor.close()
+        conn.commit()
+
+
+def mantener_sesion(session_id, hasta=None):
+    """Ejecuta el mantenimiento de una sesion y retorna su resultado. Con
+    `hasta` (time.monotonic) no empieza pasos nuevos despues de ese momento:
+    el resultado queda con completo = False."""
+    inicio = time.perf_counter()
+    db_antes, wal_antes = tamanos(session_id)
+    conn = get_db(session_id)
+    restantes = None
+    pendiente = True
+    ocupado = None  # sin checkpoint: no alcanzo el presupuesto
+    try:
+        # Antes del vacuum: las entradas eliminadas liberan paginas
+        compactadas = compactar_bitacora(conn)
+        conn.commit()
+
+        conn.execute('BEGIN')
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone():
+            conn.execute('PRAGMA optimize')
+        else:
+            # Sin estadisticas PRAGMA optimize no analiza: ANALYZE la primera vez
+            conn.execute('PRAGMA analysis_limit = 1000')
+            conn.execute('ANALYZE')
+        conn.commit()
+
+        libres = conn.execute('PRAGMA freelist_count').fetchone()[0]
+        pendiente = conn.execute('PRAGMA auto_vacuum').fetchone()[0] != 2
+        if pendiente and not _vencido(hasta):
+            # Bases creadas antes de auto_vacuum=INCREMENTAL: convertir una vez.
+            # VACUUM no corre dentro de una transaccion: espera con busy_timeout
+            conn.execute(f'PRAGMA busy_timeout = {int(config.ESCRITURA_ESPERA_MAX_SEG * 1000)}')
+            conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+            conn.execute('VACUUM')
+            conn.execute(f'PRAGMA busy_timeout = {int(config.ESCRITURA_INTENTO_MS)}')
+            pendiente = False
+            restantes = 0
+        elif not pendiente:
+            restantes = _liberar_paginas(conn, hasta)
+        if not _vencido(hasta):
+            # Con el busy_timeout corto de get_db no espera a otros
+            # escritores: si la base esta en uso queda checkpoint_completo = False
+            ocupado, _, _ = conn.execute('PRAGMA wal_checkpoint(TRUNCATE)').fetchone()
+    finally:
+        conn.close()
+    db_despues, wal_despues = tamanos(session_id)
+    return {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'db_antes': db_antes, 'wal_antes': wal_antes,
+        'db_despues': db_despues, 'wal_despues': wal_despues,
+        'paginas_libres': libres,
+        'bitacora_compactada': compactadas,
+        'conversion_pendiente': pendiente,
+        'checkpoint_completo': ocupado == 0,
+        'completo': not pendiente and restantes == 0 and ocupado is not None,
+        'segundos': round(time.perf_counter() - inicio, 3),
+    }
+
+
+def pendientes(registro, ahora=None):
+    """Sesiones inactivas cuyo ultimo mantenimiento ya vencio o quedo a medias
+    (sin presupuesto), la mas antigua primero."""
+    ahora = ahora or time.time()
+    intervalo = config.MANTENIMIENTO_INTERVALO_HORAS * 3600
+    inactividad = config.MANTENIMIENTO_INACTIVIDAD_MIN * 60
+    candidatas = []
+    for session_id in sesiones_en_disco():
+        previo = registro.get(session_id, {})
+        vencida = ahora - previo.get('epoch', 0) >= intervalo or not previo.get('completo', True)
+        if vencida and ahora - ultima_escritura(session_id) >= inactividad:
+            candidatas.append((previo.get('epoch', 0), session_id))
+    return [s for _, s in sorted(candidatas)]
+
+
+def _tomar_bloqueo():
+    ruta = _ruta_bloqueo()
+    try:
+        # Un bloqueo de mas de una hora es de un proceso que murio a mitad
+        if time.time() - os.path.getmtime(ruta) > 3600:
+            os.remove(ruta)
+    except OSError:
+        pass
+    try:
+        os.close(os.open(ruta, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        return True
+    except FileExistsError:
+        return False
+
+
+def ejecutar_mantenimiento(sesiones=None, limite=None, presupuesto=None):
+    """
+    Mantiene las sesiones indicadas (o las pendientes, hasta `limite`, y
+    archiva las frias) con el bloqueo tomado. Con `presupuesto` (segundos) no
+    empieza pasos nuevos pasado ese tiempo. Retorna {session_id: resultado};
+    {} si otro proceso tiene el bloqueo.
+    """
+    if not _tomar_bloqueo():
+        return {}
+    hasta = time.monotonic() + presupuesto if presupuesto else None
+    resultados = {}
+    try:
+        registro = leer_registro()
+        registro['_revision'] = time.time()
+        objetivos = list(sesiones) if sesiones else pendientes(registro)[:limite]
+        for session_id in objetivos:
+            if _vencido(hasta):
+                break
+            try:
+                resultado = mantener_sesion(session_id, hasta)
+            except Exception as e:
+                logger.warning('Mantenimiento de sesion %s fallo: %s', session_id, e)
+                continue
+            resultado['epoch'] = time.time()
+            registro[session_id] = resultados[session_id] = resultado
+        if not sesiones:
+            # Las sesiones frias pasan al archivo comprimido
+            for session_id, estadisticas in archivar_inactivas(limite, hasta).items():
+                resultados[session_id] = {**estadisticas, 'archivada': True}
+                registro.pop(session_id, None)
+            try:
+                cache.purgar()
+            except sqlite3.Error as e:
+                logger.warning('No se pudo purgar el cache: %s', e)
+        # Olvidar sesiones eliminadas
+        existentes = set(sesiones_en_disco())
+        for clave in [c for c in registro if not c.startswith('_') and c not in existentes]:
+            del registro[clave]
+        _escribir_registro(registro)
+    finally:
+        try:
+            os.remove(_ruta_bloqueo())
+        except OSError:
+            pass
+    return resultados
+
+
+def _pasada():
+    try:
+        ejecutar_mantenimiento(limite=config.MANTENIMIENTO_LOTE,
+                               presupuesto=config.MANTENIMIENTO_PRESUPUESTO_SEG)
+    except Exception as e:
+        logger.warning('Mantenimiento programado fallo: %s', e)
+
+
+def revisar_mantenimiento():
+    """Llamado al cerrar cada respuesta: si ya toca revisar, lanza la pasada en
+    un hilo y vuelve enseguida. Retorna el hilo (o None)."""
+    global _proxima_revision, _hilo
+    ahora = time.time()
+    if ahora < _proxima_revision:
+        return None
+    with _revision_lock:
+        if ahora < _proxima_revision or (_hilo is not None and _hilo.is_alive()):
+            return None
+        periodo = config.MANTENIMIENTO_REVISION_MIN * 60
+        _proxima_revision = ahora + periodo
+        # Otro proceso pudo revisar hace poco: el registro es compartido
+        ultima = leer_registro().get('_revision', 0)
+        if ahora - ultima < periodo:
+            _proxima_revision = ultima + periodo
+            return None
+        # No es daemon: al salir, el proceso espera a que la pasada termine
+        # (acotada por el presupuesto) y no deja el archivo de bloqueo tomado
+        _hilo = threading.Thread(target=_pasada, name='mantenimiento')
+        _hilo.start()
+        return _hilo
+
+
+def instalar_mantenimiento(app):
+    """Programa la revision de mantenimiento al cerrar cada respuesta."""
+    if not config.MANTENIMIENTO_ACTIVO:
+        return
+
+    @app.after_request
+    def _programar_mantenimiento(response):
+        response.call_on_close(revisar_mantenimiento)
+        return response
@@ -0,0 +1,91 @@
+"""
+services/novillas.py
+Lecturas del listado de novillas (tabla roster_novillas, mantenida por
+triggers). Reemplaza el UNION ALL de tabla2/tabla3 ordenado por nombre y la
+busqueda por codint en tabla2 que se repetian en cada request.
+
+La posicion de navegacion no se guarda en el listado (cada alta o baja
+renumeraria las siguientes): es el indice en ORDER BY nombre, tabla, fila_id,
+el orden de idx_roster_novillas_nombre, y se calcula al leer.
+"""
+
+# Campos de servicio/parto que para una novilla de tabla3 se toman de su
+# copia en tabla2 (donde siempre se guardan las novedades)
+CAMPOS_DESDE_TABLA2 = (
+    'fecser', 'toro', 'calor', 'fecparto', 'tipoparto',
+    'orecria1', 'nomcria1', 'sexcria1', 'hacer1',
+    'orecria2', 'nomcria2', 'sexcria2', 'hacer2', 'numser', 'fecultser',
+)
+
+
+def total_novillas(conn):
+    return conn.execute('SELECT COUNT(*) FROM roster_novillas').fetchone()[0]
+
+
+def listar_novillas(conn):
+    """
+    Listado para navegacion, en orden: su indice es la posicion. Cada fila
+    sirve tambien de entrada para cargar_novilla (id es fila_id).
+    """
+    return conn.execute('''
+        SELECT fila_id AS id, fila_id, codint, orejera, nombre, tabla, t2_id
+        FROM roster_novillas
+        ORDER BY nombre, tabla, fila_id
+    ''').fetchall()
+
+
+def entrada_novilla(conn, idx):
+    """Entrada del listado en la posicion idx (para la API, que no lista)."""
+    return conn.execute(
+        'SELECT * FROM roster_novillas ORDER BY nombre, tabla, fila_id LIMIT 1 OFFSET ?', (idx,)
+    ).fetchone()
+
+
+def posiciones_novillas(conn, tabla, ids):
+    """{fila_id: indice de navegacion} de las novillas de `tabla` dadas que
+    estan en el listado, con una sola pasada de ROW_NUMBER()."""
+    if not ids:
+        return {}
+    marcas = ', '.join('?' * len(ids))
+    return dict(conn.execute(f'''
+        SELECT fila_id, idx FROM (
+            SELECT tabla, fila_id, ROW_NUMBER() OVER (ORDER BY nombre, tabla, fila_id) - 1 AS idx
+            FROM roster_novillas
+        )
+        WHERE tabla = ? AND fila_id IN ({marcas})
+    ''', [tabla, *ids]).fetchall())
+
+
+def ids_en_tabla2(conn, tabla, animal_id):
+    """
+    Filas de tabla2 donde se guardan las novedades de la novilla: la misma
+    para tabla2; para tabla3 todas las de su codint, como se actualizaban
+    por codint antes del listado ([] si aun no tiene copia).
+    """
+    if tabla == 'tabla2':
+        return [animal_id]
+    return [r['id'] for r in conn.execute(
+        'SELECT id FROM tabla2 WHERE codint = (SELECT codint FROM tabla3 WHERE id = ?) ORDER BY id',
+        (animal_id,)
+    )]
+
+
+def cargar_novilla(conn, entrada):
+    """
+    Datos completos de la novilla de una entrada del listado. Para tabla3 usa
+    la fila de tabla3 como base y sobrescribe servicio/parto con su copia en
+    tabla2 (si existe).
+    """
+    if entrada['tabla'] == 'tabla2':
+        return dict(conn.execute('SELECT * FROM tabla2 WHERE id = ?', (entrada['fila_id'],)).fetchone())
+
+    animal = dict(conn.execute('SELECT * FROM tabla3 WHERE id = ?', (entrada['fila_id'],)).fetchone())
+    if entrada['t2_id'] is not None:
+        animal_t2 = conn.execute(
+            f'SELECT {", ".join(CAMPOS_DESDE_TABLA2)} FROM tabla2 WHERE id = ?',
+            (entrada['t2_id'],)
+        ).fetchone()
+        if animal_t2:
+            for key in CAMPOS_DESDE_TABLA2:
+                animal[key] = animal_t2[key]
+    return animal
@@ -0,0 +1,69 @@
+"""
+services/produccion.py
+Consultas sobre la cohorte de animales en produccion (misma definicion que la
+columna generada tabla2.en_produccion): planilla de ordeños y validacion
+previa a exportar. Cada orden de la planilla se sirve desde un indice parcial
+que la cubre; verificar_planes() lo comprueba con EXPLAIN QUERY PLAN.
+"""
+from models.database import EN_PRODUCCION, OREJERA_NUM
+
+# Orden de la planilla de ordeños -> ORDER BY
+ORDEN_ORDENOS = {
+    'nombre_asc': 'nombre ASC',
+    'nombre_desc': 'nombre DESC',
+    'orejera_asc': f'{OREJERA_NUM} ASC',
+    'orejera_desc': f'{OREJERA_NUM} DESC',
+}
+
+ORDEN_DEFECTO = 'nombre_asc'
+
+_SQL_ORDENOS = f'''
+    SELECT id, codint, orejera, nombre, estado, fecest, fecparto, dialec, ultlec, ord1, ord2, ord3
+    FROM tabla2
+    WHERE {EN_PRODUCCION}
+    ORDER BY {{orden}}
+'''
+
+_SQL_SIN_PESAJE = f'''
+    SELECT orejera, nombre
+    FROM tabla2
+    WHERE {EN_PRODUCCION}
+      AND (ord1 IS NULL OR ord1 = 0)
+      AND (ord2 IS NULL OR ord2 = 0)
+      AND (ord3 IS NULL OR ord3 = 0)
+    ORDER BY nombre ASC
+'''
+
+
+def listar_en_produccion(conn, orden=ORDEN_DEFECTO):
+    """Animales en produccion para la planilla de ordeños, en el orden pedido."""
+    order_clause = ORDEN_ORDENOS.get(orden, ORDEN_ORDENOS[ORDEN_DEFECTO])
+    return conn.execute(_SQL_ORDENOS.format(orden=order_clause)).fetchall()
+
+
+def sin_pesaje(conn):
+    """Animales en produccion sin ningun ordeño registrado."""
+    return conn.execute(_SQL_SIN_PESAJE).fetchall()
+
+
+def consultas_produccion():
+    """Consultas de la cohorte que deben resolverse sin B-tree temporal."""
+    consultas = [(f'ordenos {orden}', _SQL_ORDENOS.format(orden=clausula))
+                 for orden, clausula in ORDEN_ORDENOS.items()]
+    consultas.append(('validar_exportacion', _SQL_SIN_PESAJE))
+    return consultas
+
+
+def verificar_planes(conn):
+    """
+    Ejecuta EXPLAIN QUERY PLAN sobre las consultas de la cohorte.
+    Retorna [(nombre, detalle_plan, ok)]: ok si el plan usa como cubriente un
+    indice parcial de produccion y no ordena con un B-tree temporal.
+    """
+    resultados = []
+    for nombre, sql in consultas_produccion():
+        detalle = [r['detail'] for r in conn.execute(f'EXPLAIN QUERY PLAN {sql}')]
+        ok = (not any('TEMP B-TREE' in d for d in detalle)
+              and any('COVERING INDEX idx_produccion_' in d for d in detalle))
+        resultados.append((nombre, detalle, ok))
+    return resultados
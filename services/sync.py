@@ -0,0 +1,14 @@
+"""
+services/sync.py
+Version de los datos de la sesion: los triggers de models/database.py
+incrementan sync_version con cada fila insertada, modificada o eliminada en
+tabla1/2/3. La usan los ETag de los fragmentos de Captura, el cache
+compartido (services/cache.py) y la exportacion masiva para saber si algo
+cambio sin releer las tablas.
+"""
+
+
+def version_datos(conn):
+    """Version actual de los datos de la sesion (0 si no hay cambios)."""
+    row = conn.execute('SELECT version FROM sync_version WHERE id = 1').fetchone()
+    return row['version'] if row else 0
@@ -0,0 +1,830 @@
+// CAPRE - Pantalla de Captura (principal.html)
+// ========== MODAL DE ERRORES DE VALIDACION ==========
+function mostrarModalError(titulo, errores) {
+    // Eliminar modal anterior si existe
+    var modalAnterior = document.getElementById('modalErrorValidacion');
+    if (modalAnterior) modalAnterior.remove();
+
+    // Crear modal
+    var modalHtml = '<div class="modal fade" id="modalErrorValidacion" tabindex="-1" aria-hidden="true">' +
+        '<div class="modal-dialog modal-dialog-centered">' +
+        '<div class="modal-content border-danger">' +
+        '<div class="modal-header bg-danger text-white py-2">' +
+        '<h5 class="modal-title"><i class="bi bi-exclamation-triangle-fill"></i> ' + titulo + '</h5>' +
+        '<button type="button" class="btn-close btn-close-white" data-bs-dismiss="modal"></button>' +
+        '</div>' +
+        '<div class="modal-body">' +
+        '<ul class="mb-0">' + errores.map(function(err) { return '<li>' + err + '</li>'; }).join('') + '</ul>' +
+        '</div>' +
+        '<div class="modal-footer py-2">' +
+        '<button type="button" class="btn btn-secondary" data-bs-dismiss="modal">Cerrar</button>' +
+        '</div>' +
+        '</div></div></div>';
+
+    document.body.insertAdjacentHTML('beforeend', modalHtml);
+    var modal = new bootstrap.Modal(document.getElementById('modalErrorValidacion'));
+    modal.show();
+}
+
+// ========== VALIDACION FECHA DE VALIDACION DEL HATO ==========
+function validarFechaValidacion(form, inputFecha, inputFecultprb) {
+    var fecprbact = inputFecha.value;
+    var fecultprb = inputFecultprb.value;
+    var hoy = new Date();
+    hoy.setHours(0, 0, 0, 0);
+
+    var errores = [];
+
+    if (!fecprbact) {
+        errores.push('La <strong>Fecha de Validacion</strong> es obligatoria.');
+        return errores;
+    }
+
+    var fechaValidacion = new Date(fecprbact + 'T00:00:00');
+
+    // 1. No puede ser mayor a hoy
+    if (fechaValidacion > hoy) {
+        errores.push('La <strong>Fecha de Validacion</strong> no puede ser mayor a la fecha de hoy.');
+    }
+
+    // Validaciones que dependen de fecultprb
+    if (fecultprb) {
+        var fechaUltPrueba = new Date(fecultprb + 'T00:00:00');
+
+        // 2. No puede ser inferior a la fecha de la ultima prueba
+        if (fechaValidacion < fechaUltPrueba) {
+            errores.push('La <strong>Fecha de Validacion</strong> no puede ser anterior a la Ultima Prueba (' + formatoFechaPartos(fecultprb) + ').');
+        }
+
+        // 3. No puede ser mayor a 45 dias despues de la ultima prueba
+        var fechaLimite = new Date(fechaUltPrueba);
+        fechaLimite.setDate(fechaLimite.getDate() + 45);
+        if (fechaValidacion > fechaLimite) {
+            errores.push('La <strong>Fecha de Validacion</strong> no puede ser mayor a 45 dias despues de la Ultima Prueba (limite: ' + formatoFechaPartos(fechaLimite.toISOString().split('T')[0]) + ').');
+        }
+    }
+
+    return errores;
+}
+
+// Vincular validacion a formularios del hato
+(function() {
+    // Formulario editar (cuando ya existe fecprbact)
+    var formEditar = document.getElementById('form-hato-editar');
+    if (formEditar) {
+        formEditar.addEventListener('submit', function(e) {
+            var inputFecha = document.getElementById('fecprbact');
+            var inputFecultprb = document.getElementById('fecultprb-edit');
+            var errores = validarFechaValidacion(formEditar, inputFecha, inputFecultprb);
+            if (errores.length > 0) {
+                e.preventDefault();
+                mostrarModalError('Error en Fecha de Validacion', errores);
+            }
+        });
+    }
+
+    // Formulario nuevo (primera vez)
+    var formNuevo = document.getElementById('form-hato-nuevo');
+    if (formNuevo) {
+        formNuevo.addEventListener('submit', function(e) {
+            var inputFecha = document.getElementById('fecprbact-nuevo');
+            var inputFecultprb = document.getElementById('fecultprb-nuevo');
+            var errores = validarFechaValidacion(formNuevo, inputFecha, inputFecultprb);
+            if (errores.length > 0) {
+                e.preventDefault();
+                mostrarModalError('Error en Fecha de Validacion', errores);
+            }
+        });
+    }
+})();
+
+// ===== BUSQUEDA DE ANIMALES (servidor, /principal/api/buscar) =====
+// Delegado en document porque el card del animal se reemplaza al navegar.
+(function() {
+    var timeoutBusqueda = null;
+
+    function escapar(texto) {
+        var div = document.createElement('div');
+        div.textContent = texto;
+        return div.innerHTML;
+    }
+
+    function mostrarResultados(lista, resultados) {
+        if (!resultados.length) {
+            lista.innerHTML = '<div class="text-muted small px-2">Sin resultados.</div>';
+            return;
+        }
+        lista.innerHTML = resultados.map(function(r) {
+            var texto = '<strong>' + escapar(r.orejera) + '</strong> — ' + escapar(r.nombre);
+            if (r.tabla === 'tabla2') {
+                return '<button type="button" class="dropdown-item animal-item small" data-idx="' + r.idx + '" data-id="' + r.id + '">' + texto + '</button>';
+            }
+            if (r.url) {
+                return '<a class="dropdown-item animal-item small" href="' + r.url + '">' + texto +
+                       ' <span class="badge bg-secondary">Novilla</span></a>';
+            }
+            return '<span class="dropdown-item small text-muted">' + texto + ' (tabla3)</span>';
+        }).join('');
+    }
+
+    function buscar(input) {
+        var lista = document.getElementById('lista-animales');
+        var q = input.value.trim();
+        if (!lista) return;
+        if (!q) {
+            lista.innerHTML = '<div class="text-muted small px-2">Escriba al menos 1 caracter...</div>';
+            return;
+        }
+        fetch(lista.dataset.url + '?q=' + encodeURIComponent(q), {
+            headers: { 'X-Requested-With': 'XMLHttpRequest' }
+        })
+        .then(function(resp) {
+            if (!resp.ok) throw new Error('Error del servidor: ' + resp.status);
+            return resp.json();
+        })
+        .then(function(data) {
+            // Ignorar respuestas de busquedas anteriores
+            if (input.value.trim() === q) mostrarResultados(lista, data.resultados || []);
+        })
+        .catch(function(err) {
+            console.error('Error buscando animales:', err);
+        });
+    }
+
+    document.addEventListener('input', function(e) {
+        if (e.target.id !== 'buscar-animal') return;
+        clearTimeout(timeoutBusqueda);
+        timeoutBusqueda = setTimeout(function() { buscar(e.target); }, 250);
+    });
+
+    // Enfocar el input de búsqueda al abrir el dropdown
+    document.addEventListener('shown.bs.dropdown', function(e) {
+        if (!e.target.closest('.nav-search-dropdown')) return;
+        var input = document.getElementById('buscar-animal');
+        if (input) {
+            input.value = '';
+            input.focus();
+            buscar(input);
+        }
+    });
+
+    document.addEventListener('click', function(e) {
+        var item = e.target.closest('#lista-animales button.animal-item');
+        if (!item) return;
+        var idx = parseInt(item.dataset.idx);
+        if (!isNaN(idx) && typeof window.cargarAnimal === 'function') {
+            window.cargarAnimal(idx, item.dataset.id);
+            var toggle = item.closest('.dropdown-menu').previousElementSibling;
+            var bsDropdown = bootstrap.Dropdown.getInstance(toggle);
+            if (bsDropdown) bsDropdown.hide();
+        }
+    });
+})();
+
+// Chequeo Preñez: Botones para rechequear animal ya preñado
+document.getElementById('btn-rechequear-si')?.addEventListener('click', function() {
+    document.getElementById('alerta-ya-prenada').style.display = 'none';
+    document.getElementById('form-chequeo').style.display = '';
+});
+document.getElementById('btn-rechequear-no')?.addEventListener('click', function() {
+    document.getElementById('alerta-ya-prenada').innerHTML =
+        '<i class="bi bi-info-circle"></i> El animal mantiene su diagnostico de <strong>Preñada</strong>.';
+    document.getElementById('alerta-ya-prenada').className = 'alert alert-info';
+});
+
+// Servicios: Calor perdido bloquea campo toro
+(function() {
+    var form = document.getElementById('form-servicios');
+    if (!form) return;
+
+    var selectCalor = form.querySelector('[name="calor"]');
+    var inputToro = form.querySelector('[name="toro"]');
+
+    function actualizarCampoToro() {
+        if (selectCalor.value === 'S') {
+            inputToro.value = 'CALOR PER';
+            inputToro.readOnly = true;
+            inputToro.classList.add('bg-light');
+        } else {
+            if (inputToro.value === 'CALOR PER') {
+                inputToro.value = '';
+            }
+            inputToro.readOnly = false;
+            inputToro.classList.remove('bg-light');
+        }
+    }
+
+    // Ejecutar al cargar la página
+    actualizarCampoToro();
+
+    // Ejecutar cuando cambie la selección
+    selectCalor.addEventListener('change', actualizarCampoToro);
+})();
+
+// Partos: Si/No buttons for animals without service
+document.getElementById('btn-parto-si')?.addEventListener('click', function() {
+    document.getElementById('alerta-sin-servicio').style.display = 'none';
+    document.getElementById('form-partos').style.display = '';
+});
+document.getElementById('btn-parto-no')?.addEventListener('click', function() {
+    document.getElementById('alerta-sin-servicio').innerHTML =
+        '<i class="bi bi-info-circle"></i> No se registrara el parto. Puede agregar un servicio primero desde la pestana <strong>Servicios</strong>.';
+    document.getElementById('alerta-sin-servicio').className = 'alert alert-info';
+});
+
+// Partos: Aborto option for animals in non-permitted states
+document.getElementById('btn-aborto-si')?.addEventListener('click', function() {
+    document.getElementById('alerta-estado-parto').style.display = 'none';
+    document.getElementById('form-partos').style.display = '';
+    document.getElementById('forzar_aborto').value = '1';
+    // Pre-seleccionar tipo parto = Aborto y bloquear cambio
+    var sel = document.getElementById('sel-tipoparto');
+    if (sel) { sel.value = 'A'; sel.disabled = true; }
+    // Agregar hidden para que el valor se envie aunque este disabled
+    var hidden = document.createElement('input');
+    hidden.type = 'hidden'; hidden.name = 'tipoparto'; hidden.value = 'A';
+    document.getElementById('form-partos').querySelector('form').appendChild(hidden);
+});
+document.getElementById('btn-aborto-no')?.addEventListener('click', function() {
+    document.getElementById('alerta-estado-parto').innerHTML =
+        '<i class="bi bi-info-circle"></i> No se registrara el parto para este animal.';
+});
+
+// Funcion auxiliar para formatear fechas
+function formatoFechaPartos(fechaStr) {
+    var meses = ['ENE', 'FEB', 'MAR', 'ABR', 'MAY', 'JUN', 'JUL', 'AGO', 'SEP', 'OCT', 'NOV', 'DIC'];
+    var d = new Date(fechaStr);
+    var dia = String(d.getDate()).padStart(2, '0');
+    var mes = meses[d.getMonth()];
+    var anio = d.getFullYear();
+    return dia + '/' + mes + '/' + anio;
+}
+
+// Obtener fecultser desde el DOM
+function getFecultser() {
+    var el = document.getElementById('current-fecultser');
+    return el ? el.value : '';
+}
+
+// Partos: Validar 152 dias entre fecultser (ultimo servicio) y fecparto para abortos forzados
+function initValidacion152Dias() {
+    var forzar = document.getElementById('forzar_aborto');
+    var inputFecha = document.querySelector('#form-partos input[name="fecparto"]');
+    var btnGrabar = document.querySelector('#form-partos button[type="submit"]');
+    if (!inputFecha || !forzar || inputFecha.dataset.val152Init) return;
+    inputFecha.dataset.val152Init = 'true';
+
+    inputFecha.addEventListener('change', function() {
+        var fecultser = getFecultser();
+        if (forzar.value !== '1' || !fecultser) return;
+        var dServicio = new Date(fecultser);
+        var dParto = new Date(this.value);
+        var dias = Math.floor((dParto - dServicio) / (1000 * 60 * 60 * 24));
+
+        var alertaExistente = document.getElementById('alerta-152-dias');
+        if (alertaExistente) alertaExistente.remove();
+
+        if (dias < 152) {
+            btnGrabar.disabled = true;
+            var alerta = document.createElement('div');
+            alerta.id = 'alerta-152-dias';
+            alerta.className = 'alert alert-danger mt-3';
+            alerta.innerHTML = '<i class="bi bi-x-circle"></i> No se puede registrar el aborto. ' +
+                'Deben transcurrir al menos <strong>152 dias</strong> desde la Fec. Ult. Serv. (' + formatoFechaPartos(fecultser) + '). ' +
+                'Dias transcurridos: <strong>' + dias + '</strong>. Esto se reporta como <strong>Abierta</strong> en <strong>Chequeo de Preñez</strong>.';
+            inputFecha.closest('.row').after(alerta);
+        } else {
+            btnGrabar.disabled = false;
+        }
+    });
+}
+initValidacion152Dias();
+
+// Partos: Validar 265 dias entre fecultser (ultimo servicio) y fecparto
+function initValidacion265Dias() {
+    var inputFecha = document.querySelector('#form-partos input[name="fecparto"]');
+    if (!inputFecha || inputFecha.dataset.val265Init) return;
+    inputFecha.dataset.val265Init = 'true';
+
+    inputFecha.addEventListener('change', function() {
+        var fecultser = getFecultser();
+        if (!fecultser) return;
+
+        var alertaExistente = document.getElementById('alerta-265-dias');
+        if (alertaExistente) alertaExistente.remove();
+
+        var dServicio = new Date(fecultser);
+        var dParto = new Date(this.value);
+        var dias = Math.floor((dParto - dServicio) / (1000 * 60 * 60 * 24));
+
+        if (dias < 265) {
+            var alerta = document.createElement('div');
+            alerta.id = 'alerta-265-dias';
+            alerta.className = 'alert alert-warning mt-3';
+            alerta.innerHTML = '<i class="bi bi-exclamation-triangle"></i> ' +
+                'Solo hay <strong>' + dias + ' dias</strong> entre el ultimo servicio (' + formatoFechaPartos(fecultser) + ') y la fecha de parto. ' +
+                '¿Se trata de un <strong>aborto</strong> o un <strong>parto normal</strong>?';
+            inputFecha.closest('.row').after(alerta);
+        }
+    });
+}
+initValidacion265Dias();
+
+// ========== NAVEGACION AJAX ==========
+(function() {
+    var currentIdx = parseInt(document.getElementById('current-animal-idx')?.value || 0);
+    var totalAnimales = parseInt(document.getElementById('total-animales')?.value || 0);
+    var currentTab = document.getElementById('current-tab')?.value || 'servicios';
+    var pageBaseUrl = document.getElementById('page-base-url')?.value || '/principal';
+    var isLoading = false;
+
+    // Reinicializar scripts del formulario despues de actualizar el DOM
+    function reinitFormScripts() {
+        // Re-vincular botones de navegacion
+        document.querySelectorAll('.nav-animal').forEach(function(btn) {
+            btn.addEventListener('click', function(e) {
+                e.preventDefault();
+                var idx = parseInt(this.dataset.idx);
+                if (!isNaN(idx)) {
+                    loadAnimal(idx, this.dataset.id);
+                    var dropdown = this.closest('.dropdown-menu');
+                    if (dropdown) {
+                        var bsDropdown = bootstrap.Dropdown.getInstance(dropdown.previousElementSibling);
+                        if (bsDropdown) bsDropdown.hide();
+                    }
+                }
+            });
+        });
+
+        // Re-vincular botones de rechequeo prenez
+        var btnRechequearSi = document.getElementById('btn-rechequear-si');
+        if (btnRechequearSi) {
+            btnRechequearSi.addEventListener('click', function() {
+                document.getElementById('alerta-ya-prenada').style.display = 'none';
+                document.getElementById('form-chequeo').style.display = '';
+            });
+        }
+        var btnRechequearNo = document.getElementById('btn-rechequear-no');
+        if (btnRechequearNo) {
+            btnRechequearNo.addEventListener('click', function() {
+                document.getElementById('alerta-ya-prenada').innerHTML =
+                    '<i class="bi bi-info-circle"></i> El animal mantiene su diagnostico de <strong>Prenada</strong>.';
+                document.getElementById('alerta-ya-prenada').className = 'alert alert-info';
+            });
+        }
+
+        // Re-vincular logica de calor perdido en servicios
+        var formServicios = document.getElementById('form-servicios');
+        if (formServicios) {
+            var selectCalor = formServicios.querySelector('[name="calor"]');
+            var inputToro = formServicios.querySelector('[name="toro"]');
+            if (selectCalor && inputToro) {
+                function actualizarCampoToro() {
+                    if (selectCalor.value === 'S') {
+                        inputToro.value = 'CALOR PER';
+                        inputToro.readOnly = true;
+                        inputToro.classList.add('bg-light');
+                    } else {
+                        if (inputToro.value === 'CALOR PER') inputToro.value = '';
+                        inputToro.readOnly = false;
+                        inputToro.classList.remove('bg-light');
+                    }
+                }
+                actualizarCampoToro();
+                selectCalor.addEventListener('change', actualizarCampoToro);
+            }
+        }
+
+        // Re-vincular botones de parto sin servicio
+        var btnPartoSi = document.getElementById('btn-parto-si');
+        if (btnPartoSi) {
+            btnPartoSi.addEventListener('click', function() {
+                document.getElementById('alerta-sin-servicio').style.display = 'none';
+                document.getElementById('form-partos').style.display = '';
+            });
+        }
+        var btnPartoNo = document.getElementById('btn-parto-no');
+        if (btnPartoNo) {
+            btnPartoNo.addEventListener('click', function() {
+                document.getElementById('alerta-sin-servicio').innerHTML =
+                    '<i class="bi bi-info-circle"></i> No se registrara el parto. Puede agregar un servicio primero desde la pestana <strong>Servicios</strong>.';
+                document.getElementById('alerta-sin-servicio').className = 'alert alert-info';
+            });
+        }
+
+        // Re-vincular botones de aborto
+        var btnAbortoSi = document.getElementById('btn-aborto-si');
+        if (btnAbortoSi) {
+            btnAbortoSi.addEventListener('click', function() {
+                document.getElementById('alerta-estado-parto').style.display = 'none';
+                document.getElementById('form-partos').style.display = '';
+                document.getElementById('forzar_aborto').value = '1';
+                var sel = document.getElementById('sel-tipoparto');
+                if (sel) { sel.value = 'A'; sel.disabled = true; }
+                var hidden = document.createElement('input');
+                hidden.type = 'hidden'; hidden.name = 'tipoparto'; hidden.value = 'A';
+                document.getElementById('form-partos').querySelector('form').appendChild(hidden);
+            });
+        }
+        var btnAbortoNo = document.getElementById('btn-aborto-no');
+        if (btnAbortoNo) {
+            btnAbortoNo.addEventListener('click', function() {
+                document.getElementById('alerta-estado-parto').innerHTML =
+                    '<i class="bi bi-info-circle"></i> No se registrara el parto para este animal.';
+            });
+        }
+
+        // Reinicializar validaciones especiales de partos
+        initValidacion152Dias();
+        initValidacion265Dias();
+    }
+
+    // idx es la posicion mostrada; id (de los botones o la busqueda) es el
+    // animal a cargar, asi el servidor no recorre el hato hasta idx
+    function loadAnimal(idx, id) {
+        if (isLoading || idx < 0 || idx >= totalAnimales) return;
+        isLoading = true;
+
+        var url = pageBaseUrl + '?idx=' + idx + (id ? '&id=' + id : '') + '&tab=' + currentTab;
+
+        fetch(url, {
+            headers: { 'X-Requested-With': 'XMLHttpRequest' }
+        })
+        .then(function(response) {
+            if (!response.ok) throw new Error('Error de red');
+            return response.text();
+        })
+        .then(function(html) {
+            // Parsear el HTML recibido
+            var parser = new DOMParser();
+            var doc = parser.parseFromString(html, 'text/html');
+
+            // Extraer y reemplazar el card del animal
+            var newCardAnimal = doc.getElementById('card-animal');
+            var oldCardAnimal = document.getElementById('card-animal');
+            if (newCardAnimal && oldCardAnimal) {
+                oldCardAnimal.outerHTML = newCardAnimal.outerHTML;
+            }
+
+            // Extraer y reemplazar el card de tabs (novedades)
+            var newCardTabs = doc.querySelector('.card.border-secondary');
+            var oldCardTabs = document.querySelector('.card.border-secondary');
+            if (newCardTabs && oldCardTabs) {
+                oldCardTabs.outerHTML = newCardTabs.outerHTML;
+            }
+
+            // Actualizar campos hidden
+            var newIdx = doc.getElementById('current-animal-idx');
+            var newAnimalId = doc.getElementById('current-animal-id');
+            var newFecultser = doc.getElementById('current-fecultser');
+            if (newIdx) {
+                document.getElementById('current-animal-idx').value = newIdx.value;
+                currentIdx = parseInt(newIdx.value);
+            }
+            if (newAnimalId) {
+                document.getElementById('current-animal-id').value = newAnimalId.value;
+            }
+            if (newFecultser) {
+                document.getElementById('current-fecultser').value = newFecultser.value;
+            }
+
+            // Actualizar URL sin recargar la pagina
+            history.pushState({ idx: currentIdx, id: id, tab: currentTab }, '', url);
+
+            // Reinicializar scripts
+            reinitFormScripts();
+            reinitTabListeners();
+
+            // Vincular formularios AJAX (importante despues de cargar animal)
+            if (typeof window.bindFormsNovedades === 'function') {
+                window.bindFormsNovedades();
+            }
+
+            isLoading = false;
+        })
+        .catch(function(error) {
+            console.error('Error cargando animal:', error);
+            window.location.href = url;
+        });
+    }
+
+    // Expuesta para los resultados de la busqueda de animales
+    window.cargarAnimal = loadAnimal;
+
+    // Event listeners para botones de navegacion
+    document.querySelectorAll('.nav-animal').forEach(function(btn) {
+        btn.addEventListener('click', function(e) {
+            e.preventDefault();
+            var idx = parseInt(this.dataset.idx);
+            if (!isNaN(idx)) {
+                loadAnimal(idx, this.dataset.id);
+                // Cerrar dropdown si esta abierto
+                var dropdown = this.closest('.dropdown-menu');
+                if (dropdown) {
+                    var bsDropdown = bootstrap.Dropdown.getInstance(dropdown.previousElementSibling);
+                    if (bsDropdown) bsDropdown.hide();
+                }
+            }
+        });
+    });
+
+    // Manejar navegacion con teclas
+    document.addEventListener('keydown', function(e) {
+        // Solo si no estamos en un input/textarea
+        if (e.target.tagName === 'INPUT' || e.target.tagName === 'TEXTAREA' || e.target.tagName === 'SELECT') return;
+
+        var btn = null;
+        if (e.key === 'ArrowLeft' || e.key === 'a') {
+            btn = document.getElementById('btn-anterior');
+        } else if (e.key === 'ArrowRight' || e.key === 'd') {
+            btn = document.getElementById('btn-proximo');
+        }
+        if (btn && !btn.disabled) loadAnimal(parseInt(btn.dataset.idx), btn.dataset.id);
+    });
+
+    // Manejar boton atras del navegador
+    window.addEventListener('popstate', function(e) {
+        if (e.state && typeof e.state.idx !== 'undefined') {
+            currentIdx = e.state.idx;
+            currentTab = e.state.tab || currentTab;
+            loadAnimal(e.state.idx, e.state.id);
+        }
+    });
+
+    // Guardar estado inicial en el historial
+    history.replaceState({ idx: currentIdx, id: document.getElementById('current-animal-id')?.value, tab: currentTab }, '', window.location.href);
+
+    // Funcion para cargar tab via AJAX: solo se pide el fragmento de la
+    // pestaña (/principal/tab/<tab>/<animal_id>); el navegador lo revalida
+    // con ETag y mientras no cambien los datos de la sesion recibe un 304
+    function loadTab(tabName) {
+        if (isLoading || tabName === currentTab) return;
+        isLoading = true;
+
+        var animalId = document.getElementById('current-animal-id').value;
+        var url = pageBaseUrl + '?idx=' + currentIdx + '&id=' + animalId + '&tab=' + tabName;
+        var fragmentoUrl = document.getElementById('tab-fragmento-url').value
+            .replace('__tab__', tabName)
+            .replace(/\/0$/, '/' + animalId) + '?idx=' + currentIdx;
+
+        fetch(fragmentoUrl, {
+            headers: { 'X-Requested-With': 'XMLHttpRequest' }
+        })
+        .then(function(response) {
+            if (!response.ok) throw new Error('Error de red');
+            return response.text();
+        })
+        .then(function(html) {
+            // Reemplazar solo el contenido de la pestaña
+            document.querySelector('.card.border-secondary > .card-body').innerHTML = html;
+            document.querySelectorAll('.nav-tab').forEach(function(tab) {
+                tab.classList.toggle('active', tab.dataset.tab === tabName);
+            });
+
+            // Actualizar tab actual
+            currentTab = tabName;
+            document.getElementById('current-tab').value = tabName;
+
+            // Actualizar URL
+            history.pushState({ idx: currentIdx, id: animalId, tab: currentTab }, '', url);
+
+            // Reinicializar scripts
+            reinitFormScripts();
+
+            // Vincular formularios AJAX (importante despues de cambiar tab)
+            if (typeof window.bindFormsNovedades === 'function') {
+                window.bindFormsNovedades();
+            }
+
+            isLoading = false;
+        })
+        .catch(function(error) {
+            console.error('Error cargando tab:', error);
+            window.location.href = url;
+        });
+    }
+
+    // Vincular eventos a los tabs
+    function reinitTabListeners() {
+        document.querySelectorAll('.nav-tab').forEach(function(tab) {
+            tab.addEventListener('click', function(e) {
+                e.preventDefault();
+                var tabName = this.dataset.tab;
+                if (tabName) loadTab(tabName);
+            });
+        });
+    }
+
+    // Inicializar listeners de tabs
+    reinitTabListeners();
+})();
+
+// ===== AJAX PARA FORMULARIOS DE NOVEDADES =====
+(function() {
+    // Formularios que usaran AJAX
+    var formIds = [
+        'form-servicios',
+        'form-secas',
+        'form-chequeo-submit',
+        'form-partos-submit',
+        'form-salidas',
+        'form-sanitario'
+    ];
+
+    // Funcion para mostrar mensaje de exito/error
+    function showMessage(message, isSuccess) {
+        // Buscar o crear contenedor de mensajes
+        var container = document.getElementById('ajax-message');
+        if (!container) {
+            container = document.createElement('div');
+            container.id = 'ajax-message';
+            container.style.cssText = 'position:fixed;top:70px;right:20px;z-index:9999;max-width:300px;';
+            document.body.appendChild(container);
+        }
+
+        var alert = document.createElement('div');
+        alert.className = 'alert alert-' + (isSuccess ? 'success' : 'danger') + ' alert-dismissible fade show';
+        alert.innerHTML = '<i class="bi bi-' + (isSuccess ? 'check-circle' : 'exclamation-circle') + '"></i> ' +
+                          message +
+                          '<button type="button" class="btn-close btn-close-sm" data-bs-dismiss="alert"></button>';
+        container.appendChild(alert);
+
+        // Auto-cerrar despues de 3 segundos
+        setTimeout(function() {
+            if (alert.parentNode) {
+                alert.classList.remove('show');
+                setTimeout(function() { alert.remove(); }, 150);
+            }
+        }, 3000);
+    }
+
+    // Funcion para validar formulario antes de enviar
+    function validarFormulario(form) {
+        var errores = [];
+        var formId = form.id || '';
+
+        // Validacion de Servicios
+        if (formId === 'form-servicios' || form.action.includes('/servicios')) {
+            var fecser = form.querySelector('[name="fecser"]')?.value || '';
+            var toro = (form.querySelector('[name="toro"]')?.value || '').trim();
+            var calor = form.querySelector('[name="calor"]')?.value || '';
+
+            if (!fecser) {
+                errores.push('La <strong>Fecha de Servicio</strong> es obligatoria.');
+            }
+            if (!toro && !calor) {
+                errores.push('Debe ingresar el <strong>Nombre o Codigo del Toro</strong> o seleccionar <strong>Calor perdido</strong>.');
+            }
+        }
+
+        // Validacion de Secas
+        if (formId === 'form-secas' || form.action.includes('/secas')) {
+            var fecseca = form.querySelector('[name="fecseca"]')?.value || '';
+            if (!fecseca) {
+                errores.push('La <strong>Fecha de Seca</strong> es obligatoria.');
+            }
+        }
+
+        // Validacion de Chequeo
+        if (formId === 'form-chequeo-submit' || form.action.includes('/chequeo')) {
+            var fecchp = form.querySelector('[name="fecchp"]')?.value || '';
+            var panew = form.querySelector('[name="panew"]')?.value || '';
+
+            if (!fecchp) {
+                errores.push('La <strong>Fecha de Chequeo</strong> es obligatoria.');
+            }
+            if (!panew) {
+                errores.push('El <strong>Diagnostico</strong> es obligatorio.');
+            }
+        }
+
+        // Validacion de Salidas
+        if (formId === 'form-salidas' || form.action.includes('/salidas')) {
+            var fecsale = form.querySelector('[name="fecsale"]')?.value || '';
+            var motsale = form.querySelector('[name="motsale"]')?.value || '';
+
+            if (!fecsale) {
+                errores.push('La <strong>Fecha de Salida</strong> es obligatoria.');
+            }
+            if (!motsale) {
+                errores.push('El <strong>Motivo de Salida</strong> es obligatorio.');
+            }
+        }
+
+        // Validacion de Sanitario
+        if (formId === 'form-sanitario' || form.action.includes('/sanitario')) {
+            var cart = form.querySelector('[name="cart"]')?.value || '';
+            if (!cart) {
+                errores.push('Debe seleccionar una <strong>Novedad Sanitaria</strong>.');
+            }
+        }
+
+        // Validacion de Partos
+        if (formId === 'form-partos-submit' || form.action.includes('/partos')) {
+            var fecparto = form.querySelector('[name="fecparto"]')?.value || '';
+            var tipoparto = form.querySelector('[name="tipoparto"]')?.value || '';
+            var hacer1 = form.querySelector('[name="hacer1"]')?.value || '';
+            var sexcria1 = form.querySelector('[name="sexcria1"]')?.value || '';
+            var hacer2 = form.querySelector('[name="hacer2"]')?.value || '';
+            var sexcria2 = form.querySelector('[name="sexcria2"]')?.value || '';
+
+            if (!fecparto) {
+                errores.push('La <strong>Fecha de Parto</strong> es obligatoria.');
+            }
+            if (!tipoparto) {
+                errores.push('El <strong>Tipo de Parto</strong> es obligatorio.');
+            }
+            if (tipoparto === 'P' && hacer1 === 'D' && !sexcria1) {
+                errores.push('Si el destino de la <strong>Cria 1</strong> es "Dejar", debe seleccionar el <strong>Sexo</strong>.');
+            }
+            if (tipoparto === 'P' && hacer2 === 'D' && !sexcria2) {
+                errores.push('Si el destino de la <strong>Cria 2</strong> es "Dejar", debe seleccionar el <strong>Sexo</strong>.');
+            }
+        }
+
+        return errores;
+    }
+
+    function mostrarErroresValidacion(form, errores) {
+        // Eliminar alertas anteriores
+        var alertaAnterior = form.querySelector('.alerta-validacion-ajax');
+        if (alertaAnterior) alertaAnterior.remove();
+
+        if (errores.length > 0) {
+            var alerta = document.createElement('div');
+            alerta.className = 'alert alert-danger mt-3 alerta-validacion-ajax';
+            alerta.innerHTML = '<i class="bi bi-x-circle"></i> <strong>Errores de validacion:</strong><ul class="mb-0 mt-2">' +
+                errores.map(function(err) { return '<li>' + err + '</li>'; }).join('') + '</ul>';
+            var btn = form.querySelector('button[type="submit"]');
+            if (btn) btn.before(alerta);
+            return false;
+        }
+        return true;
+    }
+
+    // Funcion para enviar formulario via AJAX
+    function submitFormAjax(form, e) {
+        e.preventDefault();
+
+        // Validar antes de enviar
+        var errores = validarFormulario(form);
+        if (!mostrarErroresValidacion(form, errores)) {
+            return; // No enviar si hay errores
+        }
+
+        var submitBtn = form.querySelector('button[type="submit"]');
+        var originalText = submitBtn.innerHTML;
+        submitBtn.disabled = true;
+        submitBtn.innerHTML = '<span class="spinner-border spinner-border-sm"></span> Guardando...';
+
+        var formData = new FormData(form);
+
+        fetch(form.action, {
+            method: 'POST',
+            body: formData,
+            headers: {
+                'X-Requested-With': 'XMLHttpRequest'
+            }
+        })
+        .then(function(response) {
+            return response.json().then(function(data) {
+                return { ok: response.ok, data: data };
+            });
+        })
+        .then(function(result) {
+            showMessage(result.data.message, result.ok);
+            if (result.ok) {
+                // Actualizar texto del boton a "Actualizar"
+                submitBtn.innerHTML = '<i class="bi bi-arrow-repeat"></i> Actualizar';
+            } else {
+                submitBtn.innerHTML = originalText;
+            }
+            submitBtn.disabled = false;
+        })
+        .catch(function(error) {
+            console.error('Error:', error);
+            showMessage('Error de conexion', false);
+            submitBtn.innerHTML = originalText;
+            submitBtn.disabled = false;
+        });
+    }
+
+    // Vincular formularios existentes
+    function bindForms() {
+        formIds.forEach(function(formId) {
+            var form = document.getElementById(formId);
+            if (form && !form.dataset.ajaxBound) {
+                form.dataset.ajaxBound = 'true';
+                form.addEventListener('submit', function(e) {
+                    submitFormAjax(form, e);
+                });
+            }
+        });
+    }
+
+    // Vincular al cargar y despues de cada cambio de tab/animal
+    bindForms();
+
+    // Exponer funcion globalmente para que pueda ser llamada desde loadTab
+    window.bindFormsNovedades = bindForms;
+})();
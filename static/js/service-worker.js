@@ -1,6 +1,6 @@
 // CAPRE - Service Worker para PWA
-const CACHE_NAME = 'capre-cache-v2';
-const STATIC_CACHE = 'capre-static-v2';
+const CACHE_NAME = 'capre-cache-v5';
+const STATIC_CACHE = 'capre-static-v5';
 
 // Archivos estaticos a cachear (cache-first)
 // Rutas relativas al scope del SW (se resuelven dinamicamente)
@@ -10,6 +10,7 @@ const STATIC_ASSETS = [
     '../css/vendor/bootstrap-icons.min.css',
     '../css/vendor/fonts/bootstrap-icons.woff2',
     '../js/vendor/bootstrap.bundle.min.js',
+    '../js/captura.js',
     '../img/logo_small.png',
     '../img/logo_vaca.png',
     '../img/vaca_hero.jpg',
@@ -25,7 +26,8 @@ const API_ROUTES = [
 // Rutas que no se deben cachear
 const NO_CACHE_ROUTES = [
     '/upload',
-    '/principal/exportar'
+    '/principal/exportar',
+    '/principal/api/grid/'
 ];
 
 // Instalar service worker
@@ -0,0 +1,63 @@
+"""
+tests/conftest.py
+Cada prueba trabaja en un DATA_FOLDER temporal: nada toca data/ ni uploads/.
+"""
+import os
+import sys
+
+os.environ.setdefault('SECRET_KEY', 'pruebas')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+import config
+
+
+@pytest.fixture
+def datos(tmp_path, monkeypatch):
+    """DATA_FOLDER y UPLOAD_FOLDER temporales, sin mantenimiento al cerrar respuestas."""
+    monkeypatch.setattr(config, 'DATA_FOLDER', str(tmp_path / 'data'))
+    monkeypatch.setattr(config, 'UPLOAD_FOLDER', str(tmp_path / 'uploads'))
+    monkeypatch.setattr(config, 'MANTENIMIENTO_ACTIVO', False)
+    os.makedirs(config.DATA_FOLDER)
+    return tmp_path
+
+
+def crear_sesion(session_id, animales=40, novillas=10):
+    """Sesion con tabla1, `animales` vacas en tabla2 y `novillas` en tabla3."""
+    from models.database import init_db
+    conn = init_db(session_id)
+    conn.execute(
+        "INSERT INTO tabla1 (hato, nombre, propieta, fecultprb, fecprbact, sumlec) "
+        "VALUES ('05_0111', 'FINCA', 'PROPIETARIO', '2024-01-01', '2024-01-20', 100)")
+    conn.execute(
+        "INSERT INTO session_meta (id, prefix_code, farm_name, device_id) "
+        "VALUES (1, '05_0111', 'FINCA', 'dispositivo')")
+    for tabla, total in (('tabla2', animales), ('tabla3', novillas)):
+        for i in range(total):
+            conn.execute(
+                f'INSERT INTO {tabla} (codint, orejera, nombre, registro, estado, fecest, numser, pac) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (f'C{tabla[-1]}{i:04d}', str(i + 1), f'VACA {i % 7} {i}', f'R{i}',
+                 str(i % 7) if tabla == 'tabla2' else '0', '2023-01-01', i % 4, 'AP '[i % 3]))
+    conn.commit()
+    conn.close()
+    return session_id
+
+
+@pytest.fixture
+def sesion(datos):
+    return crear_sesion('prueba')
+
+
+@pytest.fixture
+def cliente(sesion):
+    """Cliente de prueba con la sesion de ejemplo activa."""
+    from app import create_app
+    app = create_app()
+    app.testing = True
+    c = app.test_client()
+    with c.session_transaction() as s:
+        s['device_id'] = 'dispositivo'
+        s['active_session_id'] = sesion
+    return c
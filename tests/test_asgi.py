@@ -0,0 +1,68 @@
+"""Puente ASGI (middleware/asgi.py) con aplicaciones WSGI minimas."""
+import asyncio
+import io
+
+import pytest
+from flask import Flask
+
+from middleware.asgi import PuenteASGI, _entorno
+
+
+def _puente(wsgi):
+    flask_app = Flask(__name__)  # solo aporta url_map para clasificar
+    puente = PuenteASGI(flask_app, 1, 1, 1)
+    puente.app = wsgi
+    return puente
+
+
+def _llamar(puente):
+    enviados = []
+
+    async def send(mensaje):
+        enviados.append(mensaje)
+
+    scope = {'type': 'http', 'method': 'GET', 'path': '/', 'headers': []}
+    asyncio.run(puente._responder(puente.pools['general'], _entorno(scope, io.BytesIO(), 0), send))
+    puente.cerrar()
+    return enviados
+
+
+def test_respuesta_completa():
+    def wsgi(environ, start_response):
+        start_response('200 OK', [('Content-Type', 'text/plain')])
+        return [b'uno', b'dos']
+
+    enviados = _llamar(_puente(wsgi))
+    assert enviados[0]['status'] == 200
+    assert b''.join(m['body'] for m in enviados[1:]) == b'unodos'
+    assert not enviados[-1].get('more_body')
+
+
+@pytest.mark.parametrize('falla_en', [0, 2])
+def test_error_despues_de_los_encabezados_cierra_el_cuerpo(falla_en, caplog):
+    cerrado = []
+
+    class Cuerpo:
+        def __iter__(self):
+            for i in range(3):
+                if i == falla_en:
+                    raise RuntimeError('fallo al generar')
+                yield b'bloque'
+
+        def close(self):
+            cerrado.append(True)
+
+    def wsgi(environ, start_response):
+        start_response('200 OK', [('Content-Type', 'text/plain'), ('Content-Length', '18')])
+        return Cuerpo()
+
+    enviados = _llamar(_puente(wsgi))
+    if falla_en == 0:
+        # Fallo en el primer bloque: aun no se enviaron encabezados
+        assert enviados[0]['status'] == 500
+    else:
+        assert enviados[0]['status'] == 200
+    assert enviados[-1]['type'] == 'http.response.body'
+    assert not enviados[-1].get('more_body')
+    assert cerrado == [True]
+    assert 'fallo al generar' in caplog.text
@@ -0,0 +1,102 @@
+"""Busqueda y navegacion de Captura (services/busqueda.py)."""
+import re
+
+import pytest
+
+from models.database import get_db
+from services.busqueda import (
+    _tramos_vecino, animal_captura, buscar_animales, navegacion_captura,
+    posiciones_captura, vecino_captura,
+)
+
+
+@pytest.fixture
+def conn(sesion):
+    conn = get_db(sesion)
+    # Nombres repetidos y vacios: el orden depende del desempate por id
+    conn.executemany('INSERT INTO tabla2 (codint, orejera, nombre) VALUES (?, ?, ?)',
+                     [('N1', '901', None), ('N2', '902', None),
+                      ('D1', '903', 'VACA 3 3'), ('D2', '904', 'VACA 3 3')])
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def _orden(conn):
+    return [r[0] for r in conn.execute('SELECT id FROM tabla2 ORDER BY nombre, id')]
+
+
+def _fila(conn, animal_id):
+    return conn.execute('SELECT * FROM tabla2 WHERE id = ?', (animal_id,)).fetchone()
+
+
+def test_vecinos_recorren_el_orden_de_captura(conn):
+    orden = _orden(conn)
+    adelante = [orden[0]]
+    while (siguiente := vecino_captura(conn, _fila(conn, adelante[-1]), 1)) is not None:
+        adelante.append(siguiente)
+    assert adelante == orden
+
+    atras = [orden[-1]]
+    while (anterior := vecino_captura(conn, _fila(conn, atras[-1]), -1)) is not None:
+        atras.append(anterior)
+    assert atras == orden[::-1]
+
+
+def test_navegacion_en_los_bordes(conn):
+    orden = _orden(conn)
+    primero = navegacion_captura(conn, _fila(conn, orden[0]))
+    assert primero == {'primero': orden[0], 'anterior': None,
+                       'siguiente': orden[1], 'ultimo': orden[-1]}
+    ultimo = navegacion_captura(conn, _fila(conn, orden[-1]))
+    assert ultimo['anterior'] == orden[-2] and ultimo['siguiente'] is None
+
+
+@pytest.mark.parametrize('nombre', [None, 'VACA 3 3'])
+@pytest.mark.parametrize('paso', [1, -1])
+def test_vecinos_buscan_en_el_indice(conn, nombre, paso):
+    conn.execute('ANALYZE')
+    for where, params, orden in _tramos_vecino({'nombre': nombre, 'id': 5}, paso):
+        plan = ' '.join(r['detail'] for r in conn.execute(
+            f'EXPLAIN QUERY PLAN SELECT id FROM tabla2 WHERE {where} ORDER BY {orden} LIMIT 1',
+            params))
+        assert 'SEARCH tabla2 USING COVERING INDEX idx_tabla2_nombre' in plan, plan
+        assert 'TEMP B-TREE' not in plan
+
+
+def test_animal_por_id_o_por_posicion(conn):
+    orden = _orden(conn)
+    assert animal_captura(conn, 0, orden[5])['id'] == orden[5]
+    assert animal_captura(conn, 5)['id'] == orden[5]
+    # Un id que ya no existe cae a la posicion
+    assert animal_captura(conn, 2, 99999)['id'] == orden[2]
+
+
+def test_posiciones_en_una_consulta(conn):
+    orden = _orden(conn)
+    assert posiciones_captura(conn, orden[::3]) == {i: orden.index(i) for i in orden[::3]}
+
+    sentencias = []
+    conn.set_trace_callback(sentencias.append)
+    resultados = buscar_animales(conn, 'vaca')
+    conn.set_trace_callback(None)
+    de_tabla2 = [r for r in resultados if r['tabla'] == 'tabla2']
+    assert len(de_tabla2) > 1
+    for r in de_tabla2:
+        assert r['idx'] == orden.index(r['id'])
+    # Una pasada para las posiciones de Captura y otra para las de Novillas
+    assert sum('ROW_NUMBER()' in s and 'FROM tabla2' in s for s in sentencias) == 1
+    assert sum('ROW_NUMBER()' in s and 'FROM roster_novillas' in s for s in sentencias) == 1
+    assert not any(re.search(r'COUNT\(', s) for s in sentencias)
+
+
+def test_pagina_navega_por_id(cliente, conn):
+    orden = _orden(conn)
+    html = cliente.get(f'/principal?idx=7&id={orden[7]}').get_data(as_text=True)
+    assert f'id="current-animal-id" value="{orden[7]}"' in html
+    assert f'data-idx="8" data-id="{orden[8]}" id="btn-proximo"' in html
+    assert f'data-idx="6" data-id="{orden[6]}" id="btn-anterior"' in html
+
+    datos = cliente.get(f'/principal/api/animal/8?id={orden[8]}').get_json()
+    assert datos['animal']['id'] == orden[8]
+    assert datos['navegacion']['siguiente'] == orden[9]
@@ -0,0 +1,75 @@
+"""Captura grupal de secas, chequeos y sanitario (routes/principal.py)."""
+import pytest
+
+from models.database import get_db
+
+
+@pytest.fixture
+def registrados(sesion):
+    """Animales 1 y 2 con secado, chequeo y novedad sanitaria registrados."""
+    conn = get_db(sesion)
+    conn.execute("UPDATE tabla2 SET estado = '1', numser = 1, fecseca = '2024-01-05', "
+                 "fecchp = '2024-01-06', panew = 'P', cart = 'M' WHERE id IN (1, 2)")
+    conn.commit()
+    conn.close()
+    return sesion
+
+
+def _fila(sesion, animal_id):
+    conn = get_db(sesion)
+    try:
+        return dict(conn.execute('SELECT fecseca, fecchp, panew, cart FROM tabla2 WHERE id = ?',
+                                 (animal_id,)).fetchone())
+    finally:
+        conn.close()
+
+
+def _anotadas(sesion):
+    conn = get_db(sesion)
+    try:
+        return [tuple(r) for r in conn.execute('SELECT animal_id, evento FROM bitacora ORDER BY seq')]
+    finally:
+        conn.close()
+
+
+def test_vista_muestra_el_valor_registrado(cliente, registrados):
+    html = cliente.get('/principal/grupal/sanitario').get_data(as_text=True)
+    assert '<input type="hidden" name="original_1" value="M">' in html
+    assert '<option value="M" selected>' in html
+
+
+def test_sin_novedad_borra_el_valor(cliente, registrados):
+    cliente.post('/principal/grupal/sanitario/guardar', data={
+        'animal_id': ['1', '2', '3'],
+        'valor_1': '', 'original_1': 'M',   # borrado
+        'valor_2': 'M', 'original_2': 'M',  # sin cambios
+        'valor_3': 'S', 'original_3': '',   # nuevo
+    })
+    assert _fila(registrados, 1)['cart'] is None
+    assert _fila(registrados, 2)['cart'] == 'M'
+    assert _fila(registrados, 3)['cart'] == 'S'
+    assert sorted(_anotadas(registrados)) == [(1, 'sanitario'), (3, 'sanitario')]
+
+
+def test_borrar_chequeo_sin_fecha(cliente, registrados):
+    # Solo borrados: no hace falta fecha y se limpian todas las columnas del evento
+    cliente.post('/principal/grupal/chequeo/guardar', data={
+        'animal_id': ['1'], 'valor_1': '', 'original_1': 'P',
+    })
+    fila = _fila(registrados, 1)
+    assert fila['panew'] is None and fila['fecchp'] is None
+
+
+def test_nuevo_valor_exige_fecha(cliente, registrados):
+    cliente.post('/principal/grupal/chequeo/guardar', data={
+        'animal_id': ['1'], 'valor_1': 'A', 'original_1': 'P',
+    })
+    assert _fila(registrados, 1)['panew'] == 'P'
+
+
+def test_secas_marcar_y_borrar(cliente, registrados):
+    cliente.post('/principal/grupal/secas/guardar', data={
+        'fecha': '2024-01-10', 'animal_id': ['2'], 'borrar': ['1'],
+    })
+    assert _fila(registrados, 1)['fecseca'] is None
+    assert _fila(registrados, 2)['fecseca'] == '2024-01-10'
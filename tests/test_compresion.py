@@ -0,0 +1,168 @@
+"""Middleware de compresion (middleware/compresion.py)."""
+import gzip
+import json
+import zlib
+
+from middleware.compresion import CompresionMiddleware
+
+CUERPO = json.dumps([{'id': i, 'nombre': f'VACA {i}'} for i in range(200)]).encode()
+
+
+def _app(cuerpo=CUERPO, tipo='application/json', largo=True, etag=None, cerrados=None):
+    """Aplicacion WSGI que responde `cuerpo` en fragmentos de 512 bytes."""
+    def app(environ, start_response):
+        headers = [('Content-Type', tipo)]
+        if largo:
+            headers.append(('Content-Length', str(len(cuerpo))))
+        if etag:
+            headers.append(('ETag', etag))
+        start_response('200 OK', headers)
+        return _Cuerpo([cuerpo[i:i + 512] for i in range(0, len(cuerpo), 512)], cerrados)
+    return app
+
+
+def _app_perezosa(cuerpo=CUERPO, largo=False, cerrados=None):
+    """Aplicacion generadora: llama a start_response recien al iterar."""
+    def app(environ, start_response):
+        def generar():
+            headers = [('Content-Type', 'text/html; charset=utf-8')]
+            if largo:
+                headers.append(('Content-Length', str(len(cuerpo))))
+            start_response('200 OK', headers)
+            yield from (cuerpo[i:i + 512] for i in range(0, len(cuerpo), 512))
+        return _CuerpoGenerado(generar(), cerrados)
+    return app
+
+
+class _Cuerpo(list):
+    def __init__(self, fragmentos, cerrados):
+        super().__init__(fragmentos)
+        self._cerrados = cerrados
+
+    def close(self):
+        if self._cerrados is not None:
+            self._cerrados.append(True)
+
+
+class _CuerpoGenerado:
+    def __init__(self, generador, cerrados):
+        self._generador = generador
+        self._cerrados = cerrados
+
+    def __iter__(self):
+        return self._generador
+
+    def close(self):
+        if self._cerrados is not None:
+            self._cerrados.append(True)
+
+
+def _pedir(app, accept='gzip, deflate', metodo='GET', minimo=1024):
+    respuesta = {}
+
+    def start_response(status, headers, exc_info=None):
+        respuesta['status'], respuesta['headers'] = status, dict(headers)
+
+    environ = {'REQUEST_METHOD': metodo, 'HTTP_ACCEPT_ENCODING': accept}
+    iterable = CompresionMiddleware(app, minimo=minimo)(environ, start_response)
+    try:
+        fragmentos = list(iterable)
+    finally:
+        if hasattr(iterable, 'close'):
+            iterable.close()
+    return respuesta['status'], respuesta['headers'], fragmentos
+
+
+def test_cuerpo_completo_con_content_length():
+    cerrados = []
+    status, headers, fragmentos = _pedir(_app(etag='"v1"', cerrados=cerrados))
+    datos = b''.join(fragmentos)
+    assert status == '200 OK'
+    assert headers['Content-Encoding'] == 'gzip'
+    assert headers['Vary'] == 'Accept-Encoding'
+    assert headers['ETag'] == 'W/"v1"'
+    assert int(headers['Content-Length']) == len(datos) < len(CUERPO)
+    assert gzip.decompress(datos) == CUERPO
+    assert cerrados == [True]
+
+
+def test_vary_existente_y_etag_debil():
+    def app(environ, start_response):
+        start_response('200 OK', [('Content-Type', 'text/html'), ('Content-Length', str(len(CUERPO))),
+                                  ('Vary', 'Cookie'), ('ETag', 'W/"v2"')])
+        return [CUERPO]
+    _, headers, _ = _pedir(app)
+    assert headers['Vary'] == 'Cookie, Accept-Encoding'
+    assert headers['ETag'] == 'W/"v2"'
+
+
+def test_bajo_el_minimo_no_se_comprime():
+    _, headers, fragmentos = _pedir(_app(CUERPO[:100]))
+    assert 'Content-Encoding' not in headers
+    assert headers['Vary'] == 'Accept-Encoding'
+    assert b''.join(fragmentos) == CUERPO[:100]
+
+
+def test_tipo_no_comprimible_o_cliente_sin_gzip():
+    _, headers, fragmentos = _pedir(_app(tipo='application/zip'))
+    assert 'Content-Encoding' not in headers and 'Vary' not in headers
+    assert b''.join(fragmentos) == CUERPO
+
+    _, headers, fragmentos = _pedir(_app(), accept='identity')
+    assert 'Content-Encoding' not in headers
+    assert headers['Vary'] == 'Accept-Encoding'
+    assert b''.join(fragmentos) == CUERPO
+
+    _, headers, _ = _pedir(_app(), accept='gzip;q=0')
+    assert 'Content-Encoding' not in headers
+
+    _, headers, _ = _pedir(_app(), metodo='HEAD')
+    assert 'Content-Encoding' not in headers
+
+
+def test_streaming_sin_content_length():
+    cerrados = []
+    _, headers, fragmentos = _pedir(_app(largo=False, cerrados=cerrados), minimo=10 ** 9)
+    assert headers['Content-Encoding'] == 'gzip'
+    assert 'Content-Length' not in headers
+    # Cada fragmento sale con flush: se descomprime sin esperar al resto
+    d = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    assert d.decompress(fragmentos[0]) == CUERPO[:512]
+    assert len(fragmentos) == len(range(0, len(CUERPO), 512)) + 1
+    assert gzip.decompress(b''.join(fragmentos)) == CUERPO
+    assert cerrados == [True]
+
+
+def test_start_response_al_iterar_sin_content_length():
+    cerrados = []
+    _, headers, fragmentos = _pedir(_app_perezosa(cerrados=cerrados))
+    assert headers['Content-Encoding'] == 'gzip'
+    assert 'Content-Length' not in headers
+    assert gzip.decompress(b''.join(fragmentos)) == CUERPO
+    assert cerrados == [True]
+
+
+def test_start_response_al_iterar_con_content_length():
+    cerrados = []
+    _, headers, fragmentos = _pedir(_app_perezosa(largo=True, cerrados=cerrados))
+    datos = b''.join(fragmentos)
+    assert headers['Content-Encoding'] == 'gzip'
+    assert int(headers['Content-Length']) == len(datos)
+    assert gzip.decompress(datos) == CUERPO
+    assert cerrados == [True]
+
+
+def test_start_response_al_iterar_sin_comprimir():
+    cerrados = []
+    _, headers, fragmentos = _pedir(_app_perezosa(CUERPO[:100], largo=True, cerrados=cerrados))
+    assert 'Content-Encoding' not in headers
+    assert b''.join(fragmentos) == CUERPO[:100]
+    assert cerrados == [True]
+
+
+def test_respuesta_de_la_aplicacion(cliente):
+    respuesta = cliente.get('/principal', headers={'Accept-Encoding': 'gzip'})
+    assert respuesta.status_code == 200
+    assert respuesta.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in respuesta.headers['Vary']
+    assert b'</html>' in gzip.decompress(respuesta.data)
@@ -0,0 +1,187 @@
+"""Turnos de escritura (models/escritura.py)."""
+import sqlite3
+import threading
+import time
+
+import pytest
+
+import config
+from models import escritura
+from models.database import get_db, get_db_path
+from models.escritura import EscrituraOcupada, _es_escritura
+
+# Cada forma de escribir desde una conexion de get_db
+ESCRITURAS = {
+    'conn.execute': lambda conn, n: conn.execute('INSERT INTO orden (n) VALUES (?)', (n,)),
+    'cursor.execute': lambda conn, n: conn.cursor().execute('INSERT INTO orden (n) VALUES (?)', (n,)),
+    'executemany': lambda conn, n: conn.executemany('INSERT INTO orden (n) VALUES (?)', [(n,)]),
+    'with': lambda conn, n: conn.execute(
+        'WITH v(n) AS (SELECT ?) INSERT INTO orden (n) SELECT n FROM v', (n,)),
+    'executescript': lambda conn, n: conn.executescript(f'INSERT INTO orden (n) VALUES ({int(n)});'),
+}
+
+
+@pytest.fixture
+def sesion_orden(sesion):
+    conn = get_db(sesion)
+    conn.executescript('CREATE TABLE orden (n INTEGER);')
+    conn.close()
+    return sesion
+
+
+def _esperar(condicion, limite=5):
+    fin = time.monotonic() + limite
+    while not condicion():
+        assert time.monotonic() < fin, 'la condicion no se cumplio a tiempo'
+        time.sleep(0.005)
+
+
+@pytest.mark.parametrize('sql, esperado', [
+    ('INSERT INTO t VALUES (1)', True),
+    ('  update t SET a = 1', True),
+    ('REPLACE INTO t VALUES (1)', True),
+    ('SELECT * FROM t', False),
+    ('PRAGMA user_version', False),
+    ('WITH x AS (SELECT 1) SELECT * FROM x', False),
+    ('WITH x(a) AS (SELECT 1) INSERT INTO t SELECT a FROM x', True),
+    ('WITH RECURSIVE x(a) AS (SELECT 1 UNION ALL SELECT a + 1 FROM x WHERE a < 3) '
+     'DELETE FROM t WHERE a IN (SELECT a FROM x)', True),
+    ("WITH x AS (SELECT 'insert' AS c, \"update\" FROM t) SELECT * FROM x", False),
+    ('WITH x AS (SELECT 1) /* delete */ UPDATE t SET a = (SELECT * FROM x)', True),
+])
+def test_es_escritura(sql, esperado):
+    assert _es_escritura(sql) is esperado
+
+
+def test_busy_timeout_corto(sesion):
+    conn = get_db(sesion)
+    try:
+        assert conn.execute('PRAGMA busy_timeout').fetchone()[0] == int(config.ESCRITURA_INTENTO_MS)
+    finally:
+        conn.close()
+
+
+def test_fila_fifo_para_todas_las_escrituras(sesion_orden):
+    fila = escritura._fila(get_db_path(sesion_orden))
+    primera = get_db(sesion_orden)
+    primera.execute('INSERT INTO orden (n) VALUES (-1)')  # toma el turno
+
+    formas = list(ESCRITURAS.values()) * 2
+    errores = []
+
+    def escribir(n, forma):
+        conn = get_db(sesion_orden)
+        try:
+            forma(conn, n)
+            conn.commit()
+        except Exception as e:  # pragma: no cover - se informa abajo
+            errores.append(e)
+        finally:
+            conn.close()
+
+    hilos = []
+    for n, forma in enumerate(formas):
+        hilo = threading.Thread(target=escribir, args=(n, forma))
+        hilo.start()
+        hilos.append(hilo)
+        # El siguiente hilo entra a la fila recien cuando este ya espera
+        _esperar(lambda: len(fila._espera) == n + 1)
+
+    primera.commit()
+    primera.close()
+    for hilo in hilos:
+        hilo.join(10)
+    assert not errores
+
+    conn = get_db(sesion_orden)
+    try:
+        orden = [r[0] for r in conn.execute('SELECT n FROM orden ORDER BY rowid')]
+    finally:
+        conn.close()
+    assert orden == [-1] + list(range(len(formas)))
+    assert not fila._ocupada and not fila._espera
+
+
+@pytest.mark.parametrize('forma', list(ESCRITURAS))
+def test_ocupada_por_otro_proceso(sesion_orden, monkeypatch, forma):
+    monkeypatch.setattr(config, 'ESCRITURA_ESPERA_MAX_SEG', 0.3)
+    # Otra conexion fuera de get_db hace de otro proceso con el bloqueo tomado
+    otro = sqlite3.connect(get_db_path(sesion_orden), isolation_level=None)
+    otro.execute('BEGIN IMMEDIATE')
+    conn = get_db(sesion_orden)
+    try:
+        inicio = time.monotonic()
+        with pytest.raises(EscrituraOcupada):
+            ESCRITURAS[forma](conn, 1)
+        assert time.monotonic() - inicio < 2
+        assert not conn.in_transaction
+    finally:
+        otro.execute('ROLLBACK')
+        otro.close()
+    # El turno quedo libre: la misma conexion puede escribir
+    ESCRITURAS[forma](conn, 2)
+    conn.commit()
+    conn.close()
+    fila = escritura._fila(get_db_path(sesion_orden))
+    assert not fila._ocupada
+
+
+def test_vence_esperando_en_la_fila(sesion_orden, monkeypatch):
+    monkeypatch.setattr(config, 'ESCRITURA_ESPERA_MAX_SEG', 0.2)
+    primera = get_db(sesion_orden)
+    primera.execute('INSERT INTO orden (n) VALUES (1)')
+    resultado = []
+
+    def escribir():
+        conn = get_db(sesion_orden)
+        try:
+            conn.execute('INSERT INTO orden (n) VALUES (2)')
+        except EscrituraOcupada as e:
+            resultado.append(e)
+        finally:
+            conn.close()
+
+    hilo = threading.Thread(target=escribir)
+    hilo.start()
+    hilo.join(5)
+    primera.commit()
+    primera.close()
+    assert len(resultado) == 1
+    assert not escritura._fila(get_db_path(sesion_orden))._espera
+
+
+def test_commit_como_sentencia_suelta_el_turno(sesion_orden):
+    conn = get_db(sesion_orden)
+    conn.execute('BEGIN')
+    conn.execute('INSERT INTO orden (n) VALUES (1)')
+    conn.execute('COMMIT')
+    assert not conn._turno
+    assert not escritura._fila(get_db_path(sesion_orden))._ocupada
+    conn.close()
+
+
+def test_script_con_su_propia_transaccion(sesion_orden):
+    conn = get_db(sesion_orden)
+    conn.executescript('BEGIN; INSERT INTO orden (n) VALUES (1); COMMIT; INSERT INTO orden (n) VALUES (2);')
+    assert not conn.in_transaction and not conn._turno
+    assert [r[0] for r in conn.execute('SELECT n FROM orden ORDER BY n')] == [1, 2]
+    conn.close()
+
+
+def test_solicitud_responde_503(cliente, sesion, monkeypatch):
+    monkeypatch.setattr(config, 'ESCRITURA_ESPERA_MAX_SEG', 0.2)
+    otro = sqlite3.connect(get_db_path(sesion), isolation_level=None)
+    otro.execute('BEGIN IMMEDIATE')
+    try:
+        respuesta = cliente.post('/principal/ordenos/auto-guardar',
+                                 json={'animal_id': 1, 'campo': 'ord1', 'valor': '5.5'})
+    finally:
+        otro.execute('ROLLBACK')
+        otro.close()
+    assert respuesta.status_code == 503
+    assert respuesta.headers['Retry-After'] == '1'
+    assert respuesta.get_json()['success'] is False
+
+    respuesta = cliente.post('/principal/ordenos/auto-guardar',
+                             json={'animal_id': 1, 'campo': 'ord1', 'valor': '5.5'})
+    assert respuesta.status_code == 200
@@ -0,0 +1,68 @@
+"""Mantenimiento en segundo plano (services/mantenimiento.py)."""
+import os
+import sqlite3
+import time
+
+import pytest
+
+import config
+from models.database import get_db, get_db_path
+from services import archivo, mantenimiento
+from tests.conftest import crear_sesion
+
+
+@pytest.fixture
+def inactivas(datos, monkeypatch):
+    monkeypatch.setattr(config, 'MANTENIMIENTO_INACTIVIDAD_MIN', 0)
+    monkeypatch.setattr(mantenimiento, '_proxima_revision', 0.0)
+    crear_sesion('vieja', animales=300)
+    crear_sesion('fria')
+    # Base anterior a auto_vacuum=INCREMENTAL
+    conn = sqlite3.connect(get_db_path('vieja'))
+    conn.execute('PRAGMA auto_vacuum = NONE')
+    conn.execute('VACUUM')
+    conn.close()
+    hace_90_dias = time.time() - 90 * 86400
+    archivo.registrar_acceso('fria')
+    os.utime(archivo._ruta_acceso('fria'), (hace_90_dias, hace_90_dias))
+
+
+def test_revision_corre_en_un_hilo(inactivas):
+    hilo = mantenimiento.revisar_mantenimiento()
+    assert hilo is not None
+    assert mantenimiento.revisar_mantenimiento() is None  # ya revisado
+    hilo.join(30)
+    registro = mantenimiento.leer_registro()
+    assert registro['vieja']['completo']
+    assert not registro['vieja']['conversion_pendiente']
+    # La sesion fria se archivo en la misma pasada, sin cron
+    assert not os.path.exists(get_db_path('fria'))
+    assert os.path.exists(archivo.get_archive_path('fria'))
+
+
+def test_libera_todas_las_paginas_por_tandas(sesion, monkeypatch):
+    monkeypatch.setattr(config, 'MANTENIMIENTO_PAGINAS_TANDA', 3)
+    conn = get_db(sesion)
+    conn.execute('CREATE TABLE relleno (x)')
+    conn.executemany('INSERT INTO relleno VALUES (?)', [('x' * 2000,)] * 200)
+    conn.commit()
+    conn.execute('DROP TABLE relleno')
+    conn.commit()
+    assert conn.execute('PRAGMA freelist_count').fetchone()[0] > 3
+    conn.close()
+
+    resultado = mantenimiento.mantener_sesion(sesion)
+    assert resultado['completo']
+    conn = get_db(sesion)
+    try:
+        assert conn.execute('PRAGMA freelist_count').fetchone()[0] == 0
+    finally:
+        conn.close()
+
+
+def test_presupuesto_agotado_queda_pendiente(inactivas):
+    resultado = mantenimiento.mantener_sesion('vieja', hasta=time.monotonic())
+    assert not resultado['completo']
+    assert resultado['conversion_pendiente']
+    registro = {'vieja': {**resultado, 'epoch': time.time()}}
+    assert 'vieja' in mantenimiento.pendientes(registro)
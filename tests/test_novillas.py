@@ -0,0 +1,96 @@
+"""Listado de novillas (roster_novillas) y sus copias en tabla2 (services/novillas.py)."""
+import pytest
+
+from models.database import _migrar, get_db
+from services.novillas import ids_en_tabla2, listar_novillas, posiciones_novillas
+
+# El orden de navegacion calculado desde las tablas de origen
+ORDEN_ESPERADO = '''
+    SELECT tabla, id FROM (
+        SELECT 'tabla2' AS tabla, id, COALESCE(nombre, '') AS nombre FROM tabla2 WHERE estado = '0'
+        UNION ALL
+        SELECT 'tabla3', id, COALESCE(nombre, '') FROM tabla3 WHERE estado = '0'
+    ) ORDER BY nombre, tabla, id
+'''
+
+
+@pytest.fixture
+def conn(sesion):
+    conn = get_db(sesion)
+    yield conn
+    conn.close()
+
+
+def _listado(conn):
+    return [(r['tabla'], r['fila_id']) for r in listar_novillas(conn)]
+
+
+def test_listado_sigue_a_las_tablas(conn):
+    conn.execute("INSERT INTO tabla2 (codint, nombre, estado) VALUES ('X1', 'AAAA', '0')")
+    conn.execute("INSERT INTO tabla3 (codint, nombre, estado) VALUES ('X2', NULL, '0')")
+    conn.execute("UPDATE tabla3 SET nombre = 'ZZZZ' WHERE id = 2")
+    conn.execute("UPDATE tabla2 SET estado = '1' WHERE estado = '0' AND id < 10")
+    conn.execute('DELETE FROM tabla3 WHERE id = 3')
+    conn.commit()
+    assert _listado(conn) == [tuple(r) for r in conn.execute(ORDEN_ESPERADO)]
+
+
+def test_alta_no_renumera_el_listado(conn):
+    """Altas y bajas que ordenan primero no tocan las demas filas del listado."""
+    conn.execute('CREATE TEMP TABLE tocadas (n INTEGER)')
+    conn.execute('''CREATE TEMP TRIGGER contar AFTER UPDATE ON roster_novillas
+                    BEGIN INSERT INTO tocadas VALUES (1); END''')
+    conn.execute("INSERT INTO tabla3 (codint, nombre, estado) VALUES ('X3', 'AAAA', '0')")
+    conn.execute("INSERT INTO tabla2 (codint, nombre, estado) VALUES ('X4', 'AAAB', '0')")
+    conn.execute("DELETE FROM tabla3 WHERE codint = 'X3'")
+    assert conn.execute('SELECT COUNT(*) FROM tocadas').fetchone()[0] == 0
+    conn.commit()
+
+
+def test_posiciones_al_leer(conn):
+    listado = _listado(conn)
+    ids = [fila_id for tabla, fila_id in listado if tabla == 'tabla3']
+    assert posiciones_novillas(conn, 'tabla3', ids) == {
+        fila_id: listado.index(('tabla3', fila_id)) for fila_id in ids}
+
+
+def test_migracion_reconstruye_el_listado(conn):
+    antes = _listado(conn)
+    conn.execute('PRAGMA user_version = 7')
+    conn.commit()
+    _migrar(conn)
+    assert _listado(conn) == antes
+    assert 'posicion' not in [r['name'] for r in conn.execute('PRAGMA table_info(roster_novillas)')]
+    # Los triggers quedaron recreados
+    conn.execute("INSERT INTO tabla3 (codint, nombre, estado) VALUES ('X5', 'AAAA', '0')")
+    assert _listado(conn)[0][0] == 'tabla3'
+
+
+def test_novedad_en_todas_las_copias(cliente, conn):
+    """Como antes del listado: la novedad de una novilla de tabla3 se guarda
+    en cada fila de tabla2 con su codint, no solo en la primera."""
+    codint = conn.execute('SELECT codint FROM tabla3 WHERE id = 2').fetchone()['codint']
+    conn.executemany("INSERT INTO tabla2 (codint, nombre, estado) VALUES (?, 'COPIA', '1')",
+                     [(codint,), (codint,)])
+    conn.commit()
+    copias = ids_en_tabla2(conn, 'tabla3', 2)
+    assert len(copias) == 2
+
+    def fechas():
+        return [r['fecser'] for r in conn.execute(
+            f"SELECT fecser FROM tabla2 WHERE id IN ({', '.join('?' * len(copias))})", copias)]
+
+    cliente.post('/principal/novillas/servicio/2',
+                 data={'tabla': 'tabla3', 'idx': 0, 'fecser': '2024-01-10', 'toro': 'T1'})
+    assert fechas() == ['2024-01-10', '2024-01-10']
+
+    cliente.post('/principal/novillas/borrar/servicio/2', data={'tabla': 'tabla3', 'idx': 0})
+    assert fechas() == [None, None]
+
+
+def test_pagina_y_api_por_posicion(cliente, conn):
+    listado = listar_novillas(conn)
+    html = cliente.get('/principal/novillas?idx=3').get_data(as_text=True)
+    assert f'4 de {len(listado)}' in html
+    datos = cliente.get('/principal/api/novilla/3').get_json()
+    assert (datos['tabla_origen'], datos['animal']['id']) == (listado[3]['tabla'], listado[3]['fila_id'])
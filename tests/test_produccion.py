@@ -0,0 +1,62 @@
+"""Planes de las consultas de produccion (services/produccion.py)."""
+import pytest
+
+from models.database import get_db
+from services.produccion import (
+    ORDEN_ORDENOS, consultas_produccion, listar_en_produccion, sin_pesaje, verificar_planes,
+)
+
+# Consulta -> indice parcial que debe cubrirla
+INDICE_ESPERADO = {
+    'ordenos nombre_asc': 'idx_produccion_nombre',
+    'ordenos nombre_desc': 'idx_produccion_nombre',
+    'ordenos orejera_asc': 'idx_produccion_orejera',
+    'ordenos orejera_desc': 'idx_produccion_orejera',
+    'validar_exportacion': 'idx_produccion_nombre',
+}
+
+
+@pytest.fixture
+def conn(sesion):
+    conn = get_db(sesion)
+    yield conn
+    conn.close()
+
+
+def _plan(conn, sql):
+    return [r['detail'] for r in conn.execute(f'EXPLAIN QUERY PLAN {sql}')]
+
+
+def test_todas_las_consultas_tienen_indice_esperado():
+    assert {nombre for nombre, _ in consultas_produccion()} == set(INDICE_ESPERADO)
+    assert len(ORDEN_ORDENOS) == 4
+
+
+@pytest.mark.parametrize('analizada', [False, True], ids=['sin_estadisticas', 'con_analyze'])
+def test_planes_usan_indices_cubrientes(conn, analizada):
+    if analizada:
+        # El mantenimiento corre PRAGMA optimize: el plan no debe cambiar
+        conn.execute('ANALYZE')
+    for nombre, sql in consultas_produccion():
+        plan = _plan(conn, sql)
+        esperado = f'SCAN tabla2 USING COVERING INDEX {INDICE_ESPERADO[nombre]}'
+        assert esperado in plan, (nombre, plan)
+        assert not any('TEMP B-TREE' in d for d in plan), (nombre, plan)
+    assert all(ok for _, _, ok in verificar_planes(conn))
+
+
+def test_consultas_usadas_por_las_vistas(conn):
+    # Las funciones que usan las rutas ejecutan exactamente las consultas verificadas
+    ejecutadas = []
+    conn.set_trace_callback(ejecutadas.append)
+    for orden in ORDEN_ORDENOS:
+        listar_en_produccion(conn, orden)
+    sin_pesaje(conn)
+    conn.set_trace_callback(None)
+    verificadas = {' '.join(sql.split()) for _, sql in consultas_produccion()}
+    assert {' '.join(sql.split()) for sql in ejecutadas} == verificadas
+
+
+def test_orden_desconocido_usa_el_predeterminado(conn):
+    assert [r['id'] for r in listar_en_produccion(conn, 'otro')] == \
+        [r['id'] for r in listar_en_produccion(conn, 'nombre_asc')]
@@ -0,0 +1,33 @@
+"""Version de datos de la sesion (services/sync.py)."""
+from models.database import _migrar, get_db
+from services.sync import version_datos
+
+
+def test_cada_escritura_sube_la_version(sesion):
+    conn = get_db(sesion)
+    try:
+        antes = version_datos(conn)
+        conn.execute("UPDATE tabla2 SET cart = 'M' WHERE id = 1")
+        conn.execute("INSERT INTO tabla3 (codint, estado) VALUES ('X1', '0')")
+        conn.execute('DELETE FROM tabla3 WHERE id = 1')
+        conn.commit()
+        assert version_datos(conn) == antes + 3
+    finally:
+        conn.close()
+
+
+def test_sin_registro_por_fila(sesion, cliente):
+    conn = get_db(sesion)
+    try:
+        conn.execute('PRAGMA user_version = 8')
+        conn.commit()
+        _migrar(conn)
+        assert not conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'sync_cambios'").fetchone()
+        antes = version_datos(conn)
+        conn.execute("UPDATE tabla1 SET nombre = 'OTRA'")
+        conn.commit()
+        assert version_datos(conn) == antes + 1
+    finally:
+        conn.close()
+    assert cliente.get('/principal/api/changes?since=0').status_code == 404